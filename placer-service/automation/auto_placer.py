@@ -3,105 +3,366 @@ Module: auto_placer.py
 Description: Automates the placement of machines in Fly.io regions based on traffic patterns.
 """
 
+import asyncio
 import logging
 import os
 import subprocess
 import yaml
 import json
+import threading
 from datetime import datetime, timezone
-from monitoring.traffic_monitor import collect_region_traffic
-from utils.history_manager import update_traffic_history
-from prediction.placement_predictor import PlacementPredictor
-from utils.state_manager import load_deployment_state, save_deployment_state
+from monitoring.traffic_monitor import collect_region_traffic_async
+from utils.history_manager import update_traffic_history, get_history_store
+from utils.state_manager import get_state_store, load_deployment_state, record_placement_results, save_deployment_state
 from utils.fancy_logger import get_logger
-from utils.history_manager import load_traffic_history
-from dateutil.parser import isoparse
 from utils.config_loader import Config
 from logging.handlers import RotatingFileHandler
-from utils.metrics_fetcher import MetricsFetcher
-from metrics.metrics_client import MetricsClient
-
-# Load configuration
-config = Config.get_config()
+from utils.metrics_fetcher import AsyncMetricsFetcher
+from metrics.metrics_client import TICK_DURATION, MetricsClient
+from automation.placement_executor import PlacementExecutor
+from automation.reconciler import Reconciler
+from automation.cooldown import CooldownScheduler
+from utils.tracing import DEFAULT_TRACE_HISTORY, TickTracer
+from automation.backfill import backfill_apps, backfill_history, backfill_settings
 
 # Set up logging
 logger = get_logger(__name__)
 
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
+LOG_DIR = os.path.join('data', 'logs')
+LOG_FILE = os.path.join(LOG_DIR, 'auto_placer.log')
+
+_TICK_SUCCESS = TICK_DURATION.labels('success')
+_TICK_ERROR = TICK_DURATION.labels('error')
+
+_init_lock = threading.Lock()
+_logging_configured = False
+
+def _configure_logging():
+    """Attach the console and rotating file handlers; safe to call repeatedly."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    with _init_lock:
+        if _logging_configured:
+            return
+        os.makedirs(LOG_DIR, exist_ok=True)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        file_handler = RotatingFileHandler(
+            LOG_FILE,
+            maxBytes=1024 * 1024,  # 1 MB
+            backupCount=5
+        )
+        file_handler.setLevel(logging.INFO)
+
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        console_handler.setFormatter(formatter)
+        file_handler.setFormatter(formatter)
+
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
+        _logging_configured = True
+
+class PlacerSettings:
+    """
+    Config-derived settings of the module-level placement helpers, read on demand.
+
+    Nothing is read at import, so importing this module (and main.py) stays
+    cheap on cold start. dry_run and fly_app_name are fixed the first time
+    they are read; switching them needs a restart. The cooldown and region
+    lists follow config reloads. Tests override a setting by patching it on
+    the class.
+    """
+
+    def __init__(self):
+        self._fixed = None
+
+    def load(self):
+        """Read the settings that are fixed for the life of the process, once."""
+        if self._fixed is None:
+            with _init_lock:
+                if self._fixed is None:
+                    dry_run = Config.get_config()['dry_run']
+                    fly_app_name = os.getenv("FLY_APP_NAME")
+                    # If it's a dry run, don't actually deploy or remove machines
+                    if dry_run:
+                        logger.info("Dry run mode is enabled. No changes will be applied.")
+                        # set the app name to the current directory name
+                        fly_app_name = os.path.basename(os.getcwd())
+                    self._fixed = {'dry_run': dry_run, 'fly_app_name': fly_app_name}
+        return self._fixed
+
+    @property
+    def dry_run(self):
+        return self.load()['dry_run']
 
-# Create console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
+    @property
+    def fly_app_name(self):
+        return self.load()['fly_app_name']
 
-# Create file handler
-file_handler = RotatingFileHandler(
-    'data/logs/auto_placer.log',
-    maxBytes=1024 * 1024,  # 1 MB
-    backupCount=5
-)
-file_handler.setLevel(logging.INFO)
+    @property
+    def cooldown_period(self):
+        return int(Config.get_config()['cooldown_period'])
 
-# Create formatter and add it to the handlers
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
+    @property
+    def allowed_regions(self):
+        return Config.get_config().get('allowed_regions', [])
 
-# Add the handlers to the logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+    @property
+    def excluded_regions(self):
+        return Config.get_config().get('excluded_regions', [])
 
-DRY_RUN = config['dry_run']
-COOLDOWN_PERIOD = int(config['cooldown_period'])
-ALLOWED_REGIONS = config.get('allowed_regions', [])
-EXCLUDED_REGIONS = config.get('excluded_regions', [])
-ALWAYS_RUNNING_REGIONS = config.get('always_running_regions', [])
+    @property
+    def always_running_regions(self):
+        return Config.get_config().get('always_running_regions', [])
 
-FLY_APP_NAME = os.getenv("FLY_APP_NAME")
+settings = PlacerSettings()
 
-# If it's a dry run, don't actually deploy or remove machines
-if DRY_RUN:
-    logger.info("Dry run mode is enabled. No changes will be applied.")
-    # set the app name to the current directory name
-    FLY_APP_NAME = os.path.basename(os.getcwd())
+def placement_key(app, region):
+    """Predictor key for an app's region; single-app mode keys by region alone."""
+    return region if app is None else f"{app}:{region}"
+
+def split_placement_key(key):
+    app, _, region = key.rpartition(':')
+    return (app or None), region
 
 class AutoPlacer:
-    def __init__(self, config):
+    def __init__(self, config, metrics_fetcher=None, traffic_cache=None, metrics_client=None, ingest=None):
+        _configure_logging()
+        settings.load()
         self.dry_run = config.get('dry_run', True)
         self.excluded_regions = config.get('excluded_regions', [])
         self.allowed_regions = config.get('allowed_regions', [])  # Add this line
         self.always_running_regions = config.get('always_running_regions', [])
-        self.predictor = PlacementPredictor(config)
+        self.config = config
+        # Apps managed from this process; [None] is the single FLY_APP_NAME app
+        self.apps = list(config.get('apps') or []) or [None]
+        self._predictor = None
+        self.executors = {}
+        self.reconcilers = {}
+        self.cooldowns = {}
+        # Called with the seconds until the earliest held-back action becomes eligible (see PlacerScheduler.wake_in)
+        self.wakeup = None
+        # Shared, long-lived fetcher when provided (e.g. by the FastAPI lifespan)
+        self.metrics_fetcher = metrics_fetcher or AsyncMetricsFetcher(dry_run=self.dry_run)
+        # Each tick's snapshot also warms the /metrics response cache
+        self.traffic_cache = traffic_cache
+        # Windows of pushed traffic (POST /ingest), read instead of Prometheus when traffic_source is 'ingest'
+        self.ingest = ingest
+        # Decision gauges and counters served on /metrics/prometheus
+        self.metrics_client = metrics_client or MetricsClient()
+        # Per-stage timings of recent ticks, and on-demand profiling of the next one
+        self.tracer = TickTracer.from_config(config)
         self.logger = get_logger(__name__)
+        self._warm = False
+        self._config_version = Config.version()
+
+    @property
+    def multi_app(self):
+        return self.apps != [None]
+
+    @property
+    def predictor(self):
+        """The PlacementPredictor, built (and NumPy imported) on first use."""
+        if self._predictor is None:
+            from prediction.placement_predictor import PlacementPredictor
+            self._predictor = PlacementPredictor(self.config, self.metrics_client)
+        return self._predictor
+
+    @property
+    def executor(self):
+        return self.executor_for(None)
+
+    def executor_for(self, app):
+        """The PlacementExecutor scaling `app` (None: the FLY_APP_NAME app), created on first use."""
+        executor = self.executors.get(app)
+        if executor is None:
+            executor = PlacementExecutor.from_config(self.config, dry_run=self.dry_run, app=app)
+            self.executors[app] = executor
+        return executor
+
+    def reconciler_for(self, app):
+        """
+        The Reconciler holding `app`'s cached machine inventory, created on first use.
+
+        Live placers list machines through the app's placement backend. In
+        dry-run nothing is ever scaled, so the recorded deployment state stands
+        in for the inventory.
+        """
+        reconciler = self.reconcilers.get(app)
+        if reconciler is None:
+            backend = self.executor_for(app).backend
+            if not self.dry_run and hasattr(backend, 'inventory'):
+                source = backend.inventory
+            else:
+                async def source():
+                    return dict.fromkeys(load_deployment_state(dry_run=self.dry_run, app=app), 1)
+            reconciler = Reconciler.from_config(self.config, source)
+            self.reconcilers[app] = reconciler
+        return reconciler
+
+    def cooldown_for(self, app):
+        """`app`'s CooldownScheduler, rebuilt from its state store on first use."""
+        cooldown = self.cooldowns.get(app)
+        if cooldown is None:
+            cooldown = CooldownScheduler.from_store(get_state_store(self.dry_run, app),
+                                                    float(self.config.get('cooldown_period', settings.cooldown_period)))
+            self.cooldowns[app] = cooldown
+        return cooldown
+
+    def _refresh_config(self):
+        """Apply a reloaded config snapshot; called at the start of every tick."""
+        version = Config.version()
+        if version == self._config_version:
+            return
+        config = Config.get_config()
+        self.config = config
+        if config.get('dry_run', True) != self.dry_run:
+            self.logger.warning("dry_run changed in config.yml; restart the placer to apply it")
+        self.excluded_regions = config.get('excluded_regions', [])
+        self.allowed_regions = config.get('allowed_regions', [])
+        self.always_running_regions = config.get('always_running_regions', [])
+        apps = list(config.get('apps') or []) or [None]
+        if apps != self.apps:
+            # New apps need their stored history replayed into the predictor
+            self.apps = apps
+            self._warm = False
+        if self._predictor is not None:
+            self._predictor.update_config(config)
+        self.tracer.resize(int(config.get('trace_history', DEFAULT_TRACE_HISTORY)))
+        for executor in self.executors.values():
+            executor.concurrency = int(config.get('placement_concurrency', executor.concurrency))
+            executor.timeout = float(config.get('placement_timeout', executor.timeout))
+        for reconciler in self.reconcilers.values():
+            reconciler.ttl = float(config.get('inventory_ttl', reconciler.ttl))
+        if any(cooldown.period != float(config['cooldown_period']) for cooldown in self.cooldowns.values()):
+            # Expired deadlines were dropped, so a longer period needs them rebuilt from the journal
+            self.cooldowns.clear()
+        self._config_version = version
+        self.logger.info(f"Auto-placer picked up configuration version {version}")
+
+    async def _backfill(self, stores):
+        """Top up stored history from Prometheus before the first decision."""
+        if not self.config.get('backfill_enabled', True):
+            return
+        samples, step = backfill_settings(self.config)
+        try:
+            if self.multi_app:
+                await backfill_apps(self.metrics_fetcher, stores, samples, step)
+            else:
+                await backfill_history(self.metrics_fetcher, stores[None], samples, step)
+        except Exception as e:
+            self.logger.warning(f"History backfill failed, starting from stored history: {e}")
+
+    def _warm_start(self, stores):
+        """Rebuild the predictor's smoothing state from stored history, all apps in one pass."""
+        import numpy as np
+        samples = self.predictor.warm_start_samples
+        keys, matrices, timestamps = [], [], []
+        for app, history_store in stores.items():
+            regions = history_store.regions()
+            keys.extend(placement_key(app, region) for region in regions)
+            stamps, values = history_store.matrix(regions, samples, with_timestamps=True)
+            timestamps.append(stamps)
+            matrices.append(values)
+        self.predictor.warm_start(keys, np.vstack(matrices), np.vstack(timestamps))
+        self._warm = True
+
+    async def _collect_traffic(self):
+        """Return {app: {region: value}} for every managed app."""
+        if self.config.get('traffic_source', 'prometheus') == 'ingest':
+            if self.ingest is not None and self.ingest.ready():
+                traffic = self.ingest.snapshot()
+                return {app: traffic.get(app, {}) for app in self.apps}
+            self.logger.info("Pushed traffic doesn't cover a full window yet, polling Prometheus")
+        if self.multi_app:
+            return await self.metrics_fetcher.fetch_apps_traffic(self.apps)
+        return {None: await collect_region_traffic_async(self.metrics_fetcher)}
 
     async def process_traffic_data(self):
         """Main processing loop"""
-        metrics_fetcher = MetricsFetcher(dry_run=self.dry_run)
-        app_name = metrics_fetcher.get_app_name()
-        
-        self.logger.info(f"Starting auto-placer execution for app: {app_name}")
-        
+        trace = self.tracer.start()
+        status, latency = 'error', _TICK_ERROR
+        try:
+            result = await self._tick(trace)
+            status, latency = 'success', _TICK_SUCCESS
+            return result
+        finally:
+            latency.observe(self.tracer.finish(trace, status))
+
+    async def _tick(self, trace):
+        with trace.span('refresh_config'):
+            self._refresh_config()
+        if self.multi_app:
+            self.logger.info(f"Starting auto-placer execution for {len(self.apps)} apps")
+        else:
+            self.logger.info(f"Starting auto-placer execution for app: {self.metrics_fetcher.get_app_name()}")
+
+        if not self._warm:
+            stores = {app: get_history_store(dry_run=self.dry_run, app=app) for app in self.apps}
+            with trace.span('backfill'):
+                await self._backfill(stores)
+            with trace.span('warm_start'):
+                self._warm_start(stores)
+
         # Collect and process traffic data
-        current_data = collect_region_traffic()
-        update_traffic_history(current_data, dry_run=self.dry_run)
-        
-        # Get current state
-        current_state = load_deployment_state(dry_run=self.dry_run)
-        current_regions = list(current_state.keys())
-        
-        # Load traffic history
-        traffic_history = load_traffic_history(dry_run=self.dry_run)
-        
-        # Process each region
-        actions_needed = []
-        for region, traffic_stats in traffic_history.items():
-            if self._should_process_region(region):
-                action = self.predictor.predict_placement_actions(region, traffic_stats)
-                if action:
-                    actions_needed.append((region, action))
-
-        # Execute the needed actions
-        return await self._execute_actions(actions_needed, current_state)
+        with trace.span('fetch_traffic'):
+            traffic = await self._collect_traffic()
+        if self.traffic_cache is not None:
+            self.traffic_cache.put(traffic if self.multi_app else traffic[None])
+        with trace.span('update_history'):
+            for app, current_data in traffic.items():
+                update_traffic_history(current_data, dry_run=self.dry_run, app=app)
+
+        # Predict actions for every app's eligible regions in one vectorized pass
+        with trace.span('predict'):
+            snapshot = {
+                placement_key(app, region): value
+                for app, current_data in traffic.items()
+                for region, value in current_data.items()
+            }
+            if self.ingest is not None and self.ingest.clients is not None:
+                summaries = {
+                    placement_key(app, region): summary
+                    for app, regions in self.ingest.clients.summaries().items()
+                    for region, summary in regions.items()
+                }
+                snapshot = self.predictor.weight_by_clients(snapshot, summaries)
+            managed = set(self.apps)
+            # A region that drops out of the traffic query has stopped serving requests: count it as 0
+            # so its average decays and it can scale down, instead of keeping its last value forever
+            for key in self.predictor.smoother.keys():
+                if key not in snapshot and split_placement_key(key)[0] in managed:
+                    snapshot[key] = 0.0
+            self.predictor.observe(snapshot)
+            from prediction.placement_predictor import ACTION_NAMES
+            keys = [
+                key for key in self.predictor.smoother.keys()
+                if split_placement_key(key)[0] in managed and self._should_process_region(split_placement_key(key)[1])
+            ]
+            decisions = self.predictor.predict_smoothed(keys)
+            actions_needed = {app: [] for app in self.apps}
+            for decision in decisions:
+                if decision['action']:
+                    app, region = split_placement_key(str(decision['region']))
+                    actions_needed[app].append((region, ACTION_NAMES[int(decision['action'])]))
+
+        with trace.span('load_state'):
+            states = {app: load_deployment_state(dry_run=self.dry_run, app=app) for app in self.apps}
+
+        # Execute the needed actions, apps in parallel
+        with trace.span('update_placements'):
+            results = await asyncio.gather(*(
+                self._execute_actions(actions_needed[app], states[app], app)
+                for app in self.apps
+            ))
+        if not self.multi_app:
+            return results[0]
+        return {
+            "apps": dict(zip(self.apps, results)),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
 
     def _should_process_region(self, region: str) -> bool:
         """Determine if a region should be processed based on configuration."""
@@ -111,43 +372,77 @@ class AutoPlacer:
             return False
         return True
 
-    async def _execute_actions(self, actions_needed, current_state):
-        """Execute the required placement actions."""
-        regions_to_deploy = []
-        regions_to_remove = []
-        
+    async def _inventory(self, app, current_state):
+        """The app's machines per region; falls back to the recorded state if they can't be listed."""
+        try:
+            return await self.reconciler_for(app).inventory()
+        except Exception as e:
+            self.logger.warning(f"Could not list machines for {app or 'the app'}, using recorded state: {e}")
+            return dict.fromkeys(current_state, 1)
+
+    async def _execute_actions(self, actions_needed, current_state, app=None):
+        """
+        Execute the placement actions that would change the app's running
+        machines and aren't held back by a cooldown.
+        """
+        wanted_deploy = [region for region, action in actions_needed if action == 'scale_up']
+        wanted_remove = []
+        skipped = []
         for region, action in actions_needed:
-            if action == 'scale_up' and region not in current_state:
-                regions_to_deploy.append(region)
-            elif action == 'scale_down' and region in current_state:
-                regions_to_remove.append(region)
-        
-        updated_regions, action_results = update_placements(
-            regions_to_deploy, 
+            if action != 'scale_down':
+                continue
+            if region in self.always_running_regions:
+                skipped.append({"region": region, "action": "remove", "reason": "always running"})
+            else:
+                wanted_remove.append(region)
+
+        reconciler = self.reconciler_for(app)
+        cooldown = self.cooldown_for(app)
+        regions_to_deploy, regions_to_remove = [], []
+        if wanted_deploy or wanted_remove:
+            inventory = await self._inventory(app, current_state)
+            regions_to_deploy, regions_to_remove, noops = reconciler.plan(wanted_deploy, wanted_remove, inventory)
+            regions_to_deploy, regions_to_remove, held = cooldown.hold(regions_to_deploy, regions_to_remove)
+            skipped += noops + held
+            if held and self.wakeup is not None:
+                self.wakeup(min(entry["eligible_at"] for entry in held) - cooldown.clock())
+
+        updated_regions, action_results = await self.executor_for(app).execute(
+            regions_to_deploy,
             regions_to_remove
         )
-        
+        action_results["skipped"].extend(skipped)
+        reconciler.apply(action_results)
+
+        now = datetime.now(timezone.utc)
+        cooldown.record_results(action_results, now.timestamp())
+        if regions_to_deploy or regions_to_remove:
+            # State change and journal entries are committed together
+            record_placement_results(action_results, dry_run=self.dry_run, app=app, timestamp=now)
+
         return {
             "actions_taken": action_results,
             "updated_regions": updated_regions,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": now.isoformat()
         }
 
-    def _is_in_cooldown(self, region: str, current_state: dict) -> bool:
-        """Check if a region is in cooldown period"""
-        last_action_time_str = current_state.get(region)
-        if not last_action_time_str:
-            return False
+    def _is_in_cooldown(self, region: str, action: str, app=None) -> bool:
+        """Check if `action` ('deploy' or 'remove') on a region is held back by its cooldown"""
+        return not self.cooldown_for(app).ready(region, action)
 
-        last_action_time = isoparse(last_action_time_str)
-        if last_action_time.tzinfo is None:
-            last_action_time = last_action_time.replace(tzinfo=timezone.utc)
-        
-        elapsed_time = (datetime.now(timezone.utc) - last_action_time).total_seconds()
-        return elapsed_time < self.cooldown_period
+def update_placements(regions_to_deploy, regions_to_remove, machines_client=None):
+    """
+    Update machine placements in Fly.io regions, one region at a time.
 
-def update_placements(regions_to_deploy, regions_to_remove):
-    """Update machine placements in Fly.io regions."""
+    Blocking; async callers should use `PlacementExecutor.execute` instead.
+    When a `MachinesClient` is given, all regions are scaled through the
+    Machines API in one batch instead of shelling out to flyctl. Regions
+    acted on within the last cooldown_period seconds and removals of
+    always_running_regions are skipped, and the deployment state is saved if
+    anything changed.
+    """
+    dry_run = settings.dry_run
+    always_running = settings.always_running_regions
     action_results = {
         "deployed": [],
         "removed": [],
@@ -156,10 +451,34 @@ def update_placements(regions_to_deploy, regions_to_remove):
     }
     updated_regions = []
 
+    state = load_deployment_state(dry_run=dry_run)
+    cooldown = CooldownScheduler(settings.cooldown_period)
+    cooldown.load_state(state)
+    for region in regions_to_remove:
+        if region in always_running:
+            action_results["skipped"].append({"region": region, "action": "remove", "reason": "always running"})
+    regions_to_remove = [region for region in regions_to_remove if region not in always_running]
+    regions_to_deploy, regions_to_remove, held = cooldown.hold(regions_to_deploy, regions_to_remove)
+    action_results["skipped"].extend(held)
+
+    if machines_client is not None:
+        targets = {region: 1 for region in regions_to_deploy}
+        targets.update({region: 0 for region in regions_to_remove})
+        errors = {} if dry_run else machines_client.scale_regions(targets)
+        for region, count in targets.items():
+            action = "deploy" if count else "remove"
+            if errors.get(region):
+                action_results["errors"].append({"region": region, "action": action, "error": errors[region]})
+            else:
+                action_results["deployed" if count else "removed"].append(region)
+                updated_regions.append(region)
+        _save_placement_state(state, action_results, dry_run)
+        return updated_regions, action_results
+
     # Process deployments
     for region in regions_to_deploy:
         try:
-            if not DRY_RUN:
+            if not dry_run:
                 subprocess.run(['fly', 'scale', 'count', '1', '--region', region], check=True)
             action_results["deployed"].append(region)
             updated_regions.append(region)
@@ -169,19 +488,29 @@ def update_placements(regions_to_deploy, regions_to_remove):
     # Process removals
     for region in regions_to_remove:
         try:
-            if not DRY_RUN:
+            if not dry_run:
                 subprocess.run(['fly', 'scale', 'count', '0', '--region', region], check=True)
             action_results["removed"].append(region)
             updated_regions.append(region)
         except Exception as e:
             action_results["errors"].append({"region": region, "action": "remove", "error": str(e)})
 
+    _save_placement_state(state, action_results, dry_run)
     return updated_regions, action_results
 
+def _save_placement_state(state, action_results, dry_run):
+    if not (action_results["deployed"] or action_results["removed"]):
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    state = {region: last_action for region, last_action in state.items() if region not in action_results["removed"]}
+    state.update({region: now for region in action_results["deployed"]})
+    save_deployment_state(state, dry_run=dry_run)
+
 def main():
+    _configure_logging()
     config = Config.get_config()
     metrics_client = MetricsClient()
-    auto_placer = AutoPlacer(config, metrics_client)
+    auto_placer = AutoPlacer(config, metrics_client=metrics_client)
     
     try:
         action_results = auto_placer.process_traffic_data()
@@ -0,0 +1,93 @@
+"""
+Module: backfill.py
+Description: Fills the traffic history from one Prometheus range query so the placer starts warm.
+"""
+
+import math
+import time
+from utils.config_loader import DEFAULT_ALPHA_LONG, DEFAULT_LONG_TERM_WINDOW
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_TICK_INTERVAL = 60  # seconds; backfill samples at the placer's tick resolution
+
+
+def backfill_settings(config):
+    """
+    Return (samples, step) for the startup backfill.
+
+    By default enough samples are fetched to fill the volatility window
+    (`long_term_window`) with converged long-term averages, i.e. the window
+    plus the ~1/alpha_long samples the EWMA needs to settle.
+    """
+    step = float(config.get('tick_interval', DEFAULT_TICK_INTERVAL))
+    samples = config.get('backfill_samples')
+    if samples is None:
+        long_window = int(config.get('long_term_window', DEFAULT_LONG_TERM_WINDOW))
+        samples = long_window + math.ceil(1 / float(config.get('alpha_long', DEFAULT_ALPHA_LONG)))
+    return int(samples), step
+
+
+def _load(history_store, series, latest):
+    """Append {region: [(ts, value), ...]} points newer than `latest`; return the count."""
+    loaded = 0
+    for region, points in series.items():
+        points = [(ts, value) for ts, value in points if latest is None or ts > latest]
+        if not points:
+            continue
+        timestamps, values = zip(*points)
+        history_store.extend(region, timestamps, values)
+        loaded += len(points)
+    history_store.flush()
+    return loaded
+
+
+def _query_start(history_store, samples, step, end):
+    start = end - (samples - 1) * step
+    latest = history_store.latest_timestamp()
+    if latest is not None:
+        start = max(start, latest + step)
+    return start, latest
+
+
+async def backfill_history(fetcher, history_store, samples, step, now=None):
+    """
+    Load up to `samples` points per region, `step` seconds apart, ending at `now`.
+
+    Only the part of the window newer than what the store already holds is
+    queried, so a restart after a short outage fetches just the gap. Returns
+    the number of samples written.
+    """
+    end = time.time() if now is None else now
+    start, latest = _query_start(history_store, samples, step, end)
+    if start > end:
+        logger.info("Traffic history is up to date, skipping backfill")
+        return 0
+
+    series = await fetcher.fetch_region_traffic_range(start, end, step)
+    loaded = _load(history_store, series, latest)
+    logger.info(f"Backfilled {loaded} samples for {len(series)} regions from Prometheus")
+    return loaded
+
+
+async def backfill_apps(fetcher, stores, samples, step, now=None):
+    """
+    Multi-app backfill: `stores` maps app name to its HistoryStore.
+
+    All apps are fetched with one range query starting at the earliest gap;
+    each store only keeps the points newer than its own history.
+    """
+    end = time.time() if now is None else now
+    starts = {app: _query_start(store, samples, step, end) for app, store in stores.items()}
+    pending = [app for app, (start, _) in starts.items() if start <= end]
+    if not pending:
+        logger.info("Traffic history is up to date for every app, skipping backfill")
+        return 0
+
+    start = min(starts[app][0] for app in pending)
+    series = await fetcher.fetch_apps_traffic_range(pending, start, end, step)
+    loaded = sum(_load(stores[app], series.get(app, {}), starts[app][1]) for app in pending)
+    logger.info(f"Backfilled {loaded} samples for {len(pending)} apps from Prometheus")
+    return loaded
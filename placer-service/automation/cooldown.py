@@ -0,0 +1,154 @@
+"""
+Module: cooldown.py
+Description: Per-region, per-action cooldown deadlines kept in a min-heap and rebuilt from the state store.
+
+A successful action on a region starts a cooldown on both of its actions, so
+a deploy can't be undone (or redone) until `period` seconds have passed. This
+is the same rule the replay engine applies. A failed action only holds back
+a retry of that action. Deadlines are derived from action timestamps: the
+deployment state and the action journal already persist those, so the
+cooldowns survive restarts without a store of their own.
+"""
+
+import heapq
+import math
+import time
+from datetime import timezone
+from dateutil.parser import isoparse
+from utils.fancy_logger import get_logger
+from utils.state_store import RESULT_SUCCESS
+
+# Set up logging
+logger = get_logger(__name__)
+
+ACTIONS = ('deploy', 'remove')
+
+
+def parse_timestamp(value):
+    """Epoch seconds of an ISO timestamp from the deployment state (naive means UTC)."""
+    moment = isoparse(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class CooldownScheduler:
+    """
+    Eligibility deadlines for (region, action) pairs.
+
+    `_started` maps each pair to the timestamp of the action that started its
+    cooldown, so `ready` is a dict lookup. The same timestamps sit in a
+    min-heap, which gives the next deadline and drops expired pairs without
+    scanning. A later action on the same pair leaves a stale heap entry
+    behind; it is skipped when it reaches the top. Every deadline is
+    `timestamp + period`, so the heap order doesn't depend on the period and
+    the period can change at runtime.
+    """
+
+    def __init__(self, period, clock=time.time):
+        self.period = float(period)
+        self.clock = clock
+        self._started = {}
+        self._heap = []
+
+    @classmethod
+    def from_config(cls, config, clock=time.time):
+        return cls(float(config['cooldown_period']), clock=clock)
+
+    @classmethod
+    def from_store(cls, store, period, clock=time.time):
+        """Rebuild the deadlines still running from a StateStore's state and journal."""
+        cooldown = cls(period, clock=clock)
+        cooldown.load_state(store.load_state())
+        cooldown.load_journal(store.recent_actions(since=clock() - cooldown.period))
+        return cooldown
+
+    def record(self, region, action, timestamp, succeeded=True):
+        """Start the cooldowns that follow `action` on `region` at `timestamp` (epoch seconds)."""
+        for held in (ACTIONS if succeeded else (action,)):
+            key = (region, held)
+            if timestamp > self._started.get(key, -math.inf):
+                self._started[key] = timestamp
+                heapq.heappush(self._heap, (timestamp, region, held))
+
+    def record_results(self, action_results, timestamp):
+        """Start cooldowns for one batch of executed actions (`update_placements` result shape)."""
+        for region in action_results.get('deployed', []):
+            self.record(region, 'deploy', timestamp)
+        for region in action_results.get('removed', []):
+            self.record(region, 'remove', timestamp)
+        for error in action_results.get('errors', []):
+            self.record(error['region'], error['action'], timestamp, succeeded=False)
+
+    def load_state(self, state):
+        """Seed from {region: ISO timestamp of its last action}; the action itself isn't known."""
+        for region, last_action in state.items():
+            if not last_action:
+                continue
+            try:
+                timestamp = parse_timestamp(last_action)
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring unreadable last action time for {region}: {last_action!r}")
+                continue
+            self.record(region, None, timestamp)
+
+    def load_journal(self, entries):
+        """Seed from journal entries ({'region', 'action', 'timestamp', 'result'})."""
+        for entry in entries:
+            self.record(entry['region'], entry['action'], entry['timestamp'],
+                        succeeded=entry['result'] == RESULT_SUCCESS)
+
+    def deadline(self, region, action):
+        """When `action` on `region` becomes eligible (epoch seconds), or None if it never waited."""
+        started = self._started.get((region, action))
+        return None if started is None else started + self.period
+
+    def ready(self, region, action, now=None):
+        started = self._started.get((region, action))
+        return started is None or (self.clock() if now is None else now) >= started + self.period
+
+    def _prune(self, now):
+        heap = self._heap
+        while heap:
+            started, region, action = heap[0]
+            key = (region, action)
+            if self._started.get(key) != started:
+                heapq.heappop(heap)
+            elif started + self.period <= now:
+                heapq.heappop(heap)
+                del self._started[key]
+            else:
+                break
+
+    def next_deadline(self, now=None):
+        """The earliest deadline still in the future, or None when nothing is cooling down."""
+        self._prune(self.clock() if now is None else now)
+        return self._heap[0][0] + self.period if self._heap else None
+
+    def hold(self, regions_to_deploy, regions_to_remove, now=None):
+        """
+        Split planned actions into the eligible ones and those still cooling
+        down. Returns (deploy, remove, held) where held is
+        [{'region', 'action', 'reason', 'eligible_at'}].
+        """
+        now = self.clock() if now is None else now
+        self._prune(now)
+        eligible = {'deploy': [], 'remove': []}
+        held = []
+        for action, regions in (('deploy', regions_to_deploy), ('remove', regions_to_remove)):
+            for region in regions:
+                started = self._started.get((region, action))
+                if started is None:
+                    eligible[action].append(region)
+                else:
+                    held.append({"region": region, "action": action, "reason": "cooldown",
+                                 "eligible_at": started + self.period})
+        return eligible['deploy'], eligible['remove'], held
+
+    def status(self, now=None):
+        next_deadline = self.next_deadline(now)
+        return {
+            "period": self.period,
+            "cooling_down": sorted(f"{region}:{action}" for region, action in self._started),
+            "next_deadline": next_deadline,
+        }
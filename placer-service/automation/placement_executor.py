@@ -0,0 +1,208 @@
+"""
+Module: placement_executor.py
+Description: Runs region scale operations concurrently without blocking the event loop.
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from metrics.metrics_client import FLY_API_DURATION, SCALE_ACTIONS
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 120  # seconds per region operation
+
+
+class PlacementError(Exception):
+    """Raised when a scale operation for a region fails."""
+
+
+class FlyctlBackend:
+    """Scales regions by running `fly scale count` as an async subprocess."""
+
+    name = 'flyctl'
+
+    def __init__(self, binary='fly', app=None):
+        self.binary = binary
+        self.app = app
+        self._latency = FLY_API_DURATION.labels(self.name, 'scale')
+        self._list_latency = FLY_API_DURATION.labels(self.name, 'list_machines')
+
+    def _with_app(self, command):
+        if self.app:
+            command += ['--app', self.app]
+        return command
+
+    def command(self, region, count):
+        return self._with_app([self.binary, 'scale', 'count', str(count), '--region', region])
+
+    async def scale(self, region, count):
+        start = time.perf_counter()
+        try:
+            await self._run(self.command(region, count))
+        finally:
+            self._latency.observe(time.perf_counter() - start)
+
+    async def inventory(self):
+        """{region: active machines}, from one `fly machines list --json`."""
+        from utils.machines_client import INACTIVE_STATES  # deferred: pulls in requests
+        start = time.perf_counter()
+        try:
+            output = await self._run(self._with_app([self.binary, 'machines', 'list', '--json']))
+        finally:
+            self._list_latency.observe(time.perf_counter() - start)
+        machines = json.loads(output or b'[]')
+        return dict(Counter(machine['region'] for machine in machines if machine.get('state') not in INACTIVE_STATES))
+
+    async def _run(self, command):
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            # Timeouts and shutdown cancel us; don't leave flyctl running behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0:
+            message = stderr.decode(errors='replace').strip()
+            raise PlacementError(f"{self.binary} exited with status {process.returncode}: {message}")
+        return stdout
+
+
+class MachinesApiBackend:
+    """Scales regions through the Machines API; the app's machines are listed once per batch."""
+
+    name = 'machines_api'
+
+    def __init__(self, client):
+        self.client = client
+        self._machines = None
+        self._list_latency = FLY_API_DURATION.labels(self.name, 'list_machines')
+        self._scale_latency = FLY_API_DURATION.labels(self.name, 'scale')
+
+    async def _timed(self, latency, fn, *args):
+        # The client blocks, so it runs in a worker thread; it is timed here on the event loop
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            latency.observe(time.perf_counter() - start)
+
+    async def prepare(self, operations):
+        self._machines = await self._timed(self._list_latency, self.client.list_machines)
+
+    async def inventory(self):
+        """{region: active machines}, from one listing of the app's machines."""
+        machines = await self._timed(self._list_latency, self.client.list_machines)
+        return dict(Counter(machine['region'] for machine in machines))
+
+    async def scale(self, region, count):
+        machines = self._machines
+        if machines is None:
+            machines = await self._timed(self._list_latency, self.client.list_machines)
+        errors = await self._timed(self._scale_latency, self.client.scale_regions, {region: count}, machines)
+        if errors.get(region):
+            raise PlacementError(errors[region])
+
+
+def backend_from_config(config, app=None):
+    """Build the placement backend selected by `placement_backend` in config, optionally for another app."""
+    name = config.get('placement_backend', 'flyctl')
+    if name == 'flyctl':
+        return FlyctlBackend(app=app)
+    if name == 'machines_api':
+        from utils.machines_client import MachinesClient  # deferred: pulls in requests
+        return MachinesApiBackend(MachinesClient.from_config(config, app_name=app))
+    raise ValueError(f"Unknown placement_backend: {name}")
+
+
+class PlacementExecutor:
+    """
+    Executes deploy/remove operations for many regions at once.
+
+    At most `concurrency` operations run at the same time and each one is
+    cancelled after `timeout` seconds. Results use the same shape as
+    `update_placements`.
+    """
+
+    def __init__(self, backend=None, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, dry_run=False,
+                 app=None):
+        if concurrency < 1:
+            raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+        self.backend = backend or FlyctlBackend()
+        self.concurrency = int(concurrency)
+        self.timeout = timeout
+        self.dry_run = dry_run
+        # App label on the scale action counters; '' is the single FLY_APP_NAME app
+        self.app = app
+
+    @classmethod
+    def from_config(cls, config, backend=None, dry_run=None, app=None):
+        dry_run = config.get('dry_run', True) if dry_run is None else dry_run
+        if backend is None and not dry_run:
+            backend = backend_from_config(config, app)
+        return cls(
+            backend=backend,
+            concurrency=int(config.get('placement_concurrency', DEFAULT_CONCURRENCY)),
+            timeout=float(config.get('placement_timeout', DEFAULT_TIMEOUT)),
+            dry_run=dry_run,
+            app=app,
+        )
+
+    async def _run(self, semaphore, region, count):
+        async with semaphore:
+            if self.dry_run:
+                return
+            try:
+                await asyncio.wait_for(self.backend.scale(region, count), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise PlacementError(f"Timed out after {self.timeout}s")
+
+    async def execute(self, regions_to_deploy, regions_to_remove):
+        """Deploy to and remove from the given regions; returns (updated_regions, action_results)."""
+        action_results = {
+            "deployed": [],
+            "removed": [],
+            "skipped": [],
+            "errors": []
+        }
+        updated_regions = []
+
+        operations = [(region, 'deploy', 1) for region in regions_to_deploy]
+        operations += [(region, 'remove', 0) for region in regions_to_remove]
+        prepare = getattr(self.backend, 'prepare', None)
+        outcomes = None
+        if operations and prepare and not self.dry_run:
+            try:
+                await prepare(operations)
+            except Exception as e:
+                outcomes = [e] * len(operations)
+        if outcomes is None:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            outcomes = await asyncio.gather(
+                *(self._run(semaphore, region, count) for region, _, count in operations),
+                return_exceptions=True,
+            )
+
+        for (region, action, _), outcome in zip(operations, outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to {action} region {region}: {outcome}")
+                action_results["errors"].append({"region": region, "action": action, "error": str(outcome)})
+                SCALE_ACTIONS.labels(self.app or '', region, action, 'error').inc()
+                continue
+            SCALE_ACTIONS.labels(self.app or '', region, action, 'dry_run' if self.dry_run else 'success').inc()
+            action_results["deployed" if action == 'deploy' else "removed"].append(region)
+            updated_regions.append(region)
+
+        return updated_regions, action_results
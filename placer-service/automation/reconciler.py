@@ -0,0 +1,119 @@
+"""
+Module: reconciler.py
+Description: Cached per-region machine inventory, diffed against desired placements so only real changes run.
+"""
+
+import time
+from metrics.metrics_client import REGISTRY
+from utils.fancy_logger import get_logger
+from utils.single_flight import SingleFlight
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_INVENTORY_TTL = 300  # seconds an inventory listing is trusted
+
+NOOPS_SUPPRESSED = REGISTRY.counter(
+    'placer_noop_actions_suppressed_total', 'Scale actions dropped because the inventory already matched',
+    ('action',))
+INVENTORY_REFRESHES = REGISTRY.counter(
+    'placer_inventory_refreshes_total', 'Machine inventory listings', ('outcome',))
+
+_SUPPRESSED = {'deploy': NOOPS_SUPPRESSED.labels('deploy'), 'remove': NOOPS_SUPPRESSED.labels('remove')}
+_REFRESH_SUCCESS = INVENTORY_REFRESHES.labels('success')
+_REFRESH_ERROR = INVENTORY_REFRESHES.labels('error')
+
+
+class Reconciler:
+    """
+    Keeps one app's machine count per region and turns desired placements into
+    the operations that actually change something.
+
+    `source` is an async callable returning {region: running machines} from
+    one batched listing. Its result is cached for `ttl` seconds, and
+    concurrent refreshes share one listing. Successful operations are applied
+    to the cached counts, so the next tick within the TTL sees them. A failed
+    operation leaves the real state unknown, so it drops the cache.
+    """
+
+    def __init__(self, source, ttl=DEFAULT_INVENTORY_TTL, clock=time.monotonic):
+        self.source = source
+        self.ttl = float(ttl)
+        self.clock = clock
+        self._counts = None
+        self._fetched_at = None
+        self._refresh = SingleFlight(self._fetch)
+        self.refreshes = 0
+        self.suppressed = 0
+
+    @classmethod
+    def from_config(cls, config, source):
+        return cls(source, ttl=float(config.get('inventory_ttl', DEFAULT_INVENTORY_TTL)))
+
+    @property
+    def fresh(self):
+        return self._counts is not None and self.clock() - self._fetched_at < self.ttl
+
+    async def _fetch(self):
+        try:
+            counts = await self.source()
+        except Exception:
+            _REFRESH_ERROR.inc()
+            raise
+        _REFRESH_SUCCESS.inc()
+        self._counts = {region: int(count) for region, count in counts.items() if count}
+        self._fetched_at = self.clock()
+        self.refreshes += 1
+        return self._counts
+
+    async def inventory(self, force=False):
+        """{region: running machines}, listed again if the cache is stale or `force` is set."""
+        if force or not self.fresh:
+            await self._refresh.run()
+        return dict(self._counts)
+
+    def invalidate(self):
+        self._counts = None
+
+    def plan(self, regions_to_deploy, regions_to_remove, inventory):
+        """
+        Keep the deploys to regions without machines and the removals from
+        regions that have some; returns (deploy, remove, skipped) with skipped
+        as [{'region', 'action', 'reason'}].
+        """
+        deploy, remove, skipped = [], [], []
+        for region in regions_to_deploy:
+            if inventory.get(region, 0) > 0:
+                skipped.append({"region": region, "action": "deploy", "reason": "already running"})
+            else:
+                deploy.append(region)
+        for region in regions_to_remove:
+            if inventory.get(region, 0) == 0:
+                skipped.append({"region": region, "action": "remove", "reason": "not running"})
+            else:
+                remove.append(region)
+        for entry in skipped:
+            _SUPPRESSED[entry["action"]].inc()
+        self.suppressed += len(skipped)
+        return deploy, remove, skipped
+
+    def apply(self, action_results):
+        """Fold executed operations (`update_placements` result shape) into the cached inventory."""
+        if self._counts is None:
+            return
+        if action_results.get('errors'):
+            self.invalidate()
+            return
+        for region in action_results.get('deployed', []):
+            self._counts[region] = max(self._counts.get(region, 0), 1)
+        for region in action_results.get('removed', []):
+            self._counts.pop(region, None)
+
+    def status(self):
+        return {
+            "regions": dict(self._counts) if self._counts is not None else None,
+            "age": self.clock() - self._fetched_at if self._fetched_at is not None else None,
+            "ttl": self.ttl,
+            "refreshes": self.refreshes,
+            "suppressed": self.suppressed,
+        }
@@ -0,0 +1,515 @@
+"""
+Module: replay.py
+Description: Offline replay of recorded traffic through the placer's decision logic.
+
+A recorded per-region time series is run through the same decisions the
+PlacementPredictor makes each tick (long-term EWMA confirmed by the short-term
+one, or Holt-Winters forecast; volatility-adjusted thresholds, warm-up) and the
+placer's action rules (allowed/excluded regions, always_running_regions,
+cooldown_period), on a virtual clock taken from the recording's timestamps.
+Nothing is scaled and nothing sleeps, and the work is vectorized over ticks,
+so months of per-minute history replay in seconds.
+
+The report covers every action taken, flaps (an action reversing the
+previous one for the same region within `flap_window` seconds), time each
+region was deployed, total machine-hours and under-provisioned minutes
+(traffic at or above traffic_threshold in a managed region without a
+machine).
+
+Recordings can be a legacy traffic_history*.json file, a columnar history
+store directory (data/traffic_history*/) or an .npz export written by
+`TrafficSeries.save`.
+
+Usage:
+    python -m automation.replay data/traffic_history_dry_run.json
+    python -m automation.replay data/traffic_history --config config/config.yml --json report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from prediction.placement_predictor import ACTION_SCALE_DOWN, ACTION_SCALE_UP, adaptive_thresholds
+from prediction.forecast import HoltWinters
+from utils.config_loader import (DEFAULT_ALPHA_LONG, DEFAULT_ALPHA_SHORT, DEFAULT_LONG_TERM_WINDOW,
+                                 DEFAULT_SHORT_TERM_WINDOW)
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_FLAP_WINDOW = 3600  # seconds; a reversal within this long of the previous action is a flap
+
+# Settings that shape a Holt-Winters forecast; configs agreeing on all of them share one
+FORECAST_SETTINGS = ('forecast_alpha', 'forecast_beta', 'forecast_gamma', 'season_period', 'tick_interval',
+                     'deploy_latency')
+
+# Upper bound on the elements materialized at once when computing window stats
+WINDOW_BLOCK_ELEMENTS = 1 << 22
+
+
+class TrafficSeries:
+    """
+    A ticks x regions traffic matrix with one epoch timestamp per tick.
+
+    Missing samples are NaN; a region that is missing at a tick is simply not
+    observed by the predictor at that tick, as in the live placer.
+    """
+
+    def __init__(self, timestamps, regions, traffic):
+        self.timestamps = np.asarray(timestamps, dtype=float)
+        self.regions = list(regions)
+        self.traffic = np.asarray(traffic, dtype=float).reshape(len(self.timestamps), len(self.regions))
+        order = np.argsort(self.timestamps, kind='stable')
+        if (np.diff(order) < 0).any():
+            self.timestamps = self.timestamps[order]
+            self.traffic = self.traffic[order]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Align {region: (timestamps, values)} columns on the union of their timestamps."""
+        regions = sorted(columns)
+        stamps = [np.asarray(columns[region][0], dtype=float) for region in regions]
+        timestamps = np.unique(np.concatenate(stamps)) if stamps else np.empty(0)
+        traffic = np.full((len(timestamps), len(regions)), np.nan)
+        for column, (region, region_stamps) in enumerate(zip(regions, stamps)):
+            traffic[np.searchsorted(timestamps, region_stamps), column] = columns[region][1]
+        return cls(timestamps, regions, traffic)
+
+    @classmethod
+    def from_snapshots(cls, history):
+        """Build from a legacy {iso timestamp: {region: value}} history dict."""
+        from utils.history_store import _parse_legacy_timestamp
+        timestamps = np.fromiter((_parse_legacy_timestamp(key).timestamp() for key in history),
+                                 dtype=float, count=len(history))
+        regions = sorted({region for snapshot in history.values() for region in snapshot})
+        index = {region: column for column, region in enumerate(regions)}
+        traffic = np.full((len(history), len(regions)), np.nan)
+        for row, snapshot in enumerate(history.values()):
+            for region, value in snapshot.items():
+                traffic[row, index[region]] = value
+        return cls(timestamps, regions, traffic)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r') as f:
+            content = f.read().strip()
+        return cls.from_snapshots(json.loads(content) if content else {})
+
+    @classmethod
+    def from_store(cls, path):
+        """Read every retained sample of a columnar history store directory."""
+        from utils.history_store import HistoryStore
+        store = HistoryStore(path, window=None)
+        try:
+            return cls.from_columns({region: store.window(region) for region in store.regions()})
+        finally:
+            store.close()
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['timestamps'], data['regions'].tolist(), data['traffic'])
+
+    @classmethod
+    def load(cls, path):
+        """Load a history store directory, an .npz export or a legacy JSON history."""
+        if os.path.isdir(path):
+            return cls.from_store(path)
+        if path.endswith('.npz'):
+            return cls.from_npz(path)
+        return cls.from_json(path)
+
+    def save(self, path):
+        """Write the series as a compressed .npz columnar export."""
+        np.savez_compressed(path, timestamps=self.timestamps,
+                            regions=np.array(self.regions, dtype=str), traffic=self.traffic)
+
+    def step(self):
+        """Median spacing between ticks, in seconds (0 for fewer than two ticks)."""
+        return float(np.median(np.diff(self.timestamps))) if len(self) > 1 else 0.0
+
+    def durations(self):
+        """Seconds each tick's decisions stay in effect; the last tick lasts one median step."""
+        if not len(self):
+            return np.empty(0)
+        return np.append(np.diff(self.timestamps), self.step())
+
+
+class ReplayReport:
+    """Outcome of a replay: the action log plus per-region and total cost figures."""
+
+    action_dtype = np.dtype([('timestamp', 'f8'), ('region', 'i4'), ('action', 'i1'), ('flap', '?')])
+
+    def __init__(self, series, actions, deployed_seconds, under_provisioned_seconds, skipped_cooldown,
+                 final_regions):
+        self.series = series
+        self.regions = series.regions
+        self.actions = actions
+        self.deployed_seconds = deployed_seconds
+        self.under_provisioned_seconds = under_provisioned_seconds
+        self.skipped_cooldown = skipped_cooldown
+        self.final_regions = final_regions
+
+    @property
+    def flaps(self):
+        return int(self.actions['flap'].sum())
+
+    @property
+    def machine_hours(self):
+        return float(self.deployed_seconds.sum() / 3600)
+
+    @property
+    def under_provisioned_minutes(self):
+        return float(self.under_provisioned_seconds.sum() / 60)
+
+    def _count(self, action=None, flap=None):
+        selected = np.ones(len(self.actions), dtype=bool)
+        if action is not None:
+            selected &= self.actions['action'] == action
+        if flap is not None:
+            selected &= self.actions['flap'] == flap
+        return np.bincount(self.actions['region'][selected], minlength=len(self.regions))
+
+    def summary(self):
+        """JSON-friendly totals and per-region figures."""
+        timestamps = self.series.timestamps
+        deploys = self._count(ACTION_SCALE_UP)
+        removals = self._count(ACTION_SCALE_DOWN)
+        flaps = self._count(flap=True)
+        return {
+            "ticks": len(self.series),
+            "start": float(timestamps[0]) if len(timestamps) else None,
+            "end": float(timestamps[-1]) if len(timestamps) else None,
+            "hours": float(self.series.durations().sum() / 3600),
+            "actions": len(self.actions),
+            "deploys": int(deploys.sum()),
+            "removals": int(removals.sum()),
+            "flaps": self.flaps,
+            "skipped_cooldown": self.skipped_cooldown,
+            "machine_hours": round(self.machine_hours, 3),
+            "under_provisioned_minutes": round(self.under_provisioned_minutes, 3),
+            "final_regions": self.final_regions,
+            "regions": {
+                region: {
+                    "deploys": int(deploys[column]),
+                    "removals": int(removals[column]),
+                    "flaps": int(flaps[column]),
+                    "hours_deployed": round(float(self.deployed_seconds[column] / 3600), 3),
+                    "under_provisioned_minutes": round(float(self.under_provisioned_seconds[column] / 60), 3),
+                }
+                for column, region in enumerate(self.regions)
+            },
+        }
+
+    def action_log(self):
+        """The actions as [{'timestamp', 'region', 'action', 'flap'}], oldest first."""
+        names = {ACTION_SCALE_UP: 'scale_up', ACTION_SCALE_DOWN: 'scale_down'}
+        return [
+            {"timestamp": float(action['timestamp']), "region": self.regions[action['region']],
+             "action": names[int(action['action'])], "flap": bool(action['flap'])}
+            for action in self.actions
+        ]
+
+
+def _params(configs, name, default, dtype=float):
+    return np.array([config.get(name, default) for config in configs], dtype=dtype)
+
+
+def region_masks(regions, configs):
+    """Return (managed, always_running) configs x regions boolean masks."""
+    managed = np.zeros((len(configs), len(regions)), dtype=bool)
+    always = np.zeros_like(managed)
+    for row, config in enumerate(configs):
+        allowed = set(config.get('allowed_regions') or [])
+        excluded = set(config.get('excluded_regions') or [])
+        always_running = set(config.get('always_running_regions') or [])
+        managed[row] = [region not in excluded and (not allowed or region in allowed) for region in regions]
+        always[row] = [region in always_running for region in regions]
+    return managed, always
+
+
+def smoothed(traffic, presence, alpha):
+    """
+    EWMA of every region for every alpha, as a ticks x alphas x regions array.
+
+    Same update as SmoothingEngine.update: the step is 1/n until 1/alpha
+    samples have been seen, and a region only moves on ticks with a sample.
+    """
+    steps = 1.0 / np.maximum(np.cumsum(presence, axis=0), 1)
+    alpha = np.asarray(alpha, dtype=float)[:, None]
+    averages = np.zeros((len(traffic), len(alpha), traffic.shape[1]))
+    current = np.zeros(averages.shape[1:])
+    dense = presence.all(axis=1)
+    for tick, row in enumerate(traffic):
+        updated = current + np.maximum(alpha, steps[tick]) * (row - current)
+        current = updated if dense[tick] else np.where(presence[tick], updated, current)
+        averages[tick] = current
+    return averages
+
+
+def window_stats(values, window):
+    """
+    Mean and population std over each sample's trailing `window` samples.
+
+    `values` is a samples x columns array; the first window - 1 samples use
+    the shorter windows available so far. This is what RollingStats.stats
+    reports after each push.
+    """
+    values = np.asarray(values, dtype=float)
+    mean = np.empty(values.shape)
+    std = np.empty(values.shape)
+    head = min(window - 1, len(values))
+    if head:
+        padded = np.vstack([np.full((window - 1, values.shape[1]), np.nan), values[:head]])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+        mean[:head] = np.nanmean(windows, axis=2)
+        std[:head] = np.nanstd(windows, axis=2)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        block = max(1, WINDOW_BLOCK_ELEMENTS // (window * values.shape[1]))
+        for first in range(0, len(windows), block):
+            chunk = windows[first:first + block]
+            mean[head + first:head + first + len(chunk)] = chunk.mean(axis=2)
+            std[head + first:head + first + len(chunk)] = chunk.std(axis=2)
+    return mean, std
+
+
+def forecasts(series, presence, config):
+    """
+    Holt-Winters forecast (deploy_latency ahead) of every region at every tick,
+    as a ticks x regions array, from the same HoltWinters the predictor uses.
+    """
+    forecaster = HoltWinters.from_config(config)
+    result = np.full(series.traffic.shape, np.nan)
+    regions = series.regions
+    keys = np.array(regions, dtype=object)
+    dense = presence.all(axis=1)
+    for tick, (timestamp, row) in enumerate(zip(series.timestamps.tolist(), series.traffic)):
+        if dense[tick]:
+            forecaster.update(regions, row, timestamp)
+        elif presence[tick].any():
+            present = presence[tick]
+            forecaster.update(list(keys[present]), row[present], timestamp)
+        result[tick] = forecaster.forecast(regions)
+    return result
+
+
+def apply_rules(codes, timestamps, deployed, always_running, cooldown, flap_window=DEFAULT_FLAP_WINDOW):
+    """
+    Apply the placer's action rules to one region's per-tick decision codes.
+
+    A scale_up only acts on an undeployed region, a scale_down only on a
+    deployed one that is not always-running, and an action is held back while
+    the region is within `cooldown` seconds of its previous action. Only runs
+    of identical decisions are visited, so the cost follows the number of
+    decision changes rather than the number of ticks. Returns (ticks, codes,
+    flaps, skipped) for the actions taken, where `skipped` counts ticks an
+    action waited out the cooldown.
+    """
+    ticks, actions, flaps = [], [], []
+    skipped = 0
+    last_at, last_code = -np.inf, 0
+    decided = np.flatnonzero(codes)
+    run_codes = codes[decided]
+    starts = np.flatnonzero(np.r_[True, run_codes[1:] != run_codes[:-1]]) if len(decided) else decided
+    for start, end in zip(starts.tolist(), np.r_[starts[1:], len(decided)].astype(int).tolist()):
+        code = int(run_codes[start])
+        if (code == ACTION_SCALE_UP) == deployed or (code == ACTION_SCALE_DOWN and always_running):
+            continue
+        run = decided[start:end]
+        ready = timestamps[run] - last_at >= cooldown
+        if not ready.any():
+            skipped += len(run)
+            continue
+        first = int(ready.argmax())
+        skipped += first
+        tick = int(run[first])
+        timestamp = timestamps[tick]
+        ticks.append(tick)
+        actions.append(code)
+        flaps.append(last_code == -code and timestamp - last_at < flap_window)
+        deployed = code == ACTION_SCALE_UP
+        last_at, last_code = timestamp, code
+    return np.array(ticks, dtype=np.int64), np.array(actions, dtype=np.int8), np.array(flaps, dtype=bool), skipped
+
+
+def simulate(series, configs, initial_regions=None, flap_window=DEFAULT_FLAP_WINDOW):
+    """
+    Replay `series` under several configs at once and return one ReplayReport each.
+
+    Regions are independent, so after one sequential EWMA pass (per distinct
+    alpha_long and alpha_short) the window stats and decisions are computed for
+    all ticks at once, region by region, and the action rules only visit ticks where a
+    decision changes.
+    The decisions are the ones PlacementPredictor.predict_smoothed makes on
+    the same samples (up to floating-point rounding in the window stats).
+    """
+    configs = list(configs)
+    always_running = {region for config in configs for region in config.get('always_running_regions') or []}
+    if always_running - set(series.regions):
+        # Always-running regions cost machine-hours even without recorded traffic
+        extra = sorted(always_running - set(series.regions))
+        traffic = np.hstack([series.traffic, np.full((len(series), len(extra)), np.nan)])
+        series = TrafficSeries(series.timestamps, series.regions + extra, traffic)
+    regions = series.regions
+    timestamps = series.timestamps
+
+    alpha = _params(configs, 'alpha_long', DEFAULT_ALPHA_LONG)
+    alpha_short = _params(configs, 'alpha_short', DEFAULT_ALPHA_SHORT)
+    for name, values in (('alpha_long', alpha), ('alpha_short', alpha_short)):
+        if ((values <= 0) | (values > 1)).any():
+            raise ValueError(f"{name} must be in (0, 1], got {values.tolist()}")
+    window = _params(configs, 'long_term_window', DEFAULT_LONG_TERM_WINDOW, np.int64)
+    warmup = _params(configs, 'short_term_window', DEFAULT_SHORT_TERM_WINDOW, np.int64)
+    traffic_threshold = _params(configs, 'traffic_threshold', 100)
+    deployment_threshold = _params(configs, 'deployment_threshold', 50)
+    cooldown = _params(configs, 'cooldown_period', 0)
+    managed, always = region_masks(regions, configs)
+    initial = np.isin(np.array(regions, dtype=object), list(initial_regions or []))
+
+    # Averages depend only on alpha, window stats only on (alpha, window): compute each once
+    alphas, alpha_index = np.unique(alpha, return_inverse=True)
+    alpha_index = alpha_index.ravel()
+    pairs, pair_index = np.unique(np.stack([alpha_index, window], axis=1), axis=0, return_inverse=True)
+    pair_index = pair_index.ravel()
+    presence = ~np.isnan(series.traffic)
+    averages = smoothed(series.traffic, presence, alphas)
+    short_alphas, short_index = np.unique(np.maximum(alpha_short, alpha), return_inverse=True)
+    short_index = short_index.ravel()
+    short_averages = smoothed(series.traffic, presence, short_alphas)
+    durations = series.durations()
+
+    # Configs with forecasting decide on the forecast instead; one pass per distinct forecast setup
+    forecast_setups = {}
+    setup_configs = []
+    forecast_index = np.full(len(configs), -1)
+    for config_row, config in enumerate(configs):
+        if config.get('forecast_enabled', False):
+            setup = tuple(config.get(name) for name in FORECAST_SETTINGS)
+            if setup not in forecast_setups:
+                forecast_setups[setup] = len(setup_configs)
+                setup_configs.append(config)
+            forecast_index[config_row] = forecast_setups[setup]
+    uses_forecast = forecast_index >= 0
+    if setup_configs:
+        predicted = np.stack([forecasts(series, presence, config) for config in setup_configs], axis=1)
+
+    events = [[] for _ in configs]
+    deployed_seconds = np.zeros(managed.shape)
+    under_provisioned_seconds = np.zeros(managed.shape)
+    skipped_cooldown = np.zeros(len(configs), dtype=np.int64)
+    final = np.zeros(managed.shape, dtype=bool)
+    for column, region in enumerate(regions):
+        # Window stats at each of the region's samples, carried forward over ticks without one
+        present = np.flatnonzero(presence[:, column])
+        samples = averages[present, :, column]
+        pair_mean = np.empty((len(present), len(pairs)))
+        pair_std = np.empty((len(present), len(pairs)))
+        for size in np.unique(pairs[:, 1]).tolist():
+            group = np.flatnonzero(pairs[:, 1] == size)
+            pair_mean[:, group], pair_std[:, group] = window_stats(samples[:, pairs[group, 0]], size)
+        mean, std = pair_mean[:, pair_index], pair_std[:, pair_index]
+        count = np.cumsum(presence[:, column])
+        seen = (count > 0)[:, None]
+        latest = np.maximum(count - 1, 0)
+        current = np.where(seen, averages[:, alpha_index, column], np.nan)
+        if uses_forecast.any():
+            current[:, uses_forecast] = np.where(seen, predicted[:, forecast_index[uses_forecast], column], np.nan)
+        up_threshold, down_threshold = adaptive_thresholds(
+            np.where(seen, mean[latest], np.nan) if len(present) else np.full(current.shape, np.nan),
+            np.where(seen, std[latest], 0.0) if len(present) else np.zeros(current.shape),
+            traffic_threshold, deployment_threshold)
+        codes = np.where(current < down_threshold, ACTION_SCALE_DOWN,
+                         np.where(current > up_threshold, ACTION_SCALE_UP, 0)).astype(np.int8)
+        # Without a forecast, the short-term average must be past the same threshold
+        short = np.where(seen, short_averages[:, short_index, column], np.nan)
+        confirmed = np.where(codes == ACTION_SCALE_UP, short > up_threshold, short < down_threshold)
+        codes[~confirmed & ~uses_forecast] = 0
+        codes[~(managed[:, column] & (count[:, None] >= warmup))] = 0
+
+        starving = series.traffic[:, column, None] >= traffic_threshold
+        for config_row in range(len(configs)):
+            deployed = bool(always[config_row, column] or initial[column])
+            ticks, actions, flaps, skipped = apply_rules(
+                codes[:, config_row], timestamps, deployed, always[config_row, column],
+                cooldown[config_row], flap_window)
+            skipped_cooldown[config_row] += skipped
+            events[config_row].append((ticks, np.full(len(ticks), column), actions, flaps))
+
+            # Every action flips the region, so the deployed timeline is a running parity
+            toggles = np.zeros(len(timestamps), dtype=np.int64)
+            toggles[ticks] = 1
+            timeline = deployed ^ (np.cumsum(toggles) % 2 == 1)
+            deployed_seconds[config_row, column] = durations @ timeline
+            if managed[config_row, column]:
+                under_provisioned_seconds[config_row, column] = durations @ (starving[:, config_row] & ~timeline)
+            final[config_row, column] = timeline[-1] if len(timeline) else deployed
+
+    reports = []
+    for config_row, config_events in enumerate(events):
+        ticks, columns, codes, flaps = (np.concatenate(part) for part in zip(*config_events))
+        order = np.lexsort((columns, ticks))
+        actions = np.zeros(len(order), dtype=ReplayReport.action_dtype)
+        actions['timestamp'] = timestamps[ticks[order]]
+        actions['region'] = columns[order]
+        actions['action'] = codes[order]
+        actions['flap'] = flaps[order]
+        final_regions = [region for region, up in zip(regions, final[config_row]) if up]
+        reports.append(ReplayReport(series, actions, deployed_seconds[config_row],
+                                    under_provisioned_seconds[config_row], int(skipped_cooldown[config_row]),
+                                    final_regions))
+    return reports
+
+
+def replay(series, config, initial_regions=None, flap_window=DEFAULT_FLAP_WINDOW):
+    """
+    Run `series` through the placer's prediction and action rules under `config`.
+
+    `initial_regions` are deployed when the replay starts (always_running_regions
+    always are). Returns a ReplayReport.
+    """
+    return simulate(series, [config], initial_regions, flap_window)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded traffic through the placer's decision logic")
+    parser.add_argument('history', help="history store directory, .npz export or legacy traffic_history*.json")
+    parser.add_argument('--config', default=None, help="config.yml to replay with (default: the service config)")
+    parser.add_argument('--initial-regions', default='', help="comma-separated regions deployed at the start")
+    parser.add_argument('--flap-window', type=float, default=DEFAULT_FLAP_WINDOW,
+                        help="seconds within which a reversed action counts as a flap")
+    parser.add_argument('--actions', action='store_true', help="include the full action log in the output")
+    parser.add_argument('--export', default=None, help="also write the loaded series to this .npz file")
+    parser.add_argument('--json', default=None, help="write the report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    from utils.config_loader import Config, load_config
+    config = load_config(args.config) if args.config else Config.get_config()
+
+    series = TrafficSeries.load(args.history)
+    if args.export:
+        series.save(args.export)
+    initial = [region for region in args.initial_regions.split(',') if region]
+    report = replay(series, config, initial_regions=initial, flap_window=args.flap_window)
+
+    result = report.summary()
+    if args.actions:
+        result["action_log"] = report.action_log()
+    output = json.dumps(result, indent=2)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    logger.info(f"Replayed {len(series)} ticks: {result['actions']} actions, {result['flaps']} flaps, "
+                f"{result['machine_hours']} machine-hours")
+    return result
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,177 @@
+"""
+Module: scheduler.py
+Description: In-process periodic control loop that runs placer ticks on a fixed cadence.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from metrics.metrics_client import TICK_OVERRUNS, TICKS_SKIPPED
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_TICK_INTERVAL = 60  # seconds
+DEFAULT_TICK_JITTER = 0.1  # fraction of the interval
+DEFAULT_TICK_HISTORY = 100
+
+
+class PlacerScheduler:
+    """
+    Runs `tick` (an async callable) every `interval` seconds.
+
+    Each tick starts at a random offset of up to `jitter * interval` after its
+    slot so several placers don't hit Prometheus in lockstep. A tick whose slot
+    comes up while the previous one is still running is skipped rather than
+    queued, and ticks that take longer than the interval are counted as
+    overruns. `wake_in` asks for an extra tick before the next slot, e.g. when
+    a held-back action comes out of its cooldown. The loop sleeps until the
+    earlier of the two, and the regular cadence is kept.
+    """
+
+    def __init__(self, tick, interval=DEFAULT_TICK_INTERVAL, jitter=DEFAULT_TICK_JITTER,
+                 history=DEFAULT_TICK_HISTORY):
+        if interval <= 0:
+            raise ValueError(f"Tick interval must be positive, got {interval}")
+        self.tick = tick
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.ticks = deque(maxlen=history)
+        self.tick_count = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.wakeups = 0
+        self.last_result = None
+        self._task = None
+        self._current = None
+        self._wake_at = None
+        self._rescheduled = asyncio.Event()
+
+    @classmethod
+    def from_config(cls, config, tick):
+        return cls(
+            tick,
+            interval=float(config.get('tick_interval', DEFAULT_TICK_INTERVAL)),
+            jitter=float(config.get('tick_jitter', DEFAULT_TICK_JITTER)),
+        )
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    @property
+    def tick_in_progress(self):
+        return self._current is not None and not self._current.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._loop(), name='placer-scheduler')
+            logger.info(f"Placer scheduler started (interval {self.interval}s, jitter {self.jitter:.0%})")
+
+    def wake_in(self, delay):
+        """Run a tick `delay` seconds from now unless one is due sooner; the earliest request wins."""
+        wake_at = asyncio.get_running_loop().time() + max(0.0, delay)
+        if self._wake_at is None or wake_at < self._wake_at:
+            self._wake_at = wake_at
+            self._rescheduled.set()
+
+    async def _sleep_until(self, slot):
+        """Sleep until `slot` or an earlier wake-up; returns True if woken early."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._rescheduled.clear()
+            wake_at = self._wake_at
+            due = slot if wake_at is None else min(slot, wake_at)
+            try:
+                await asyncio.wait_for(self._rescheduled.wait(), max(0.0, due - loop.time()))
+            except asyncio.TimeoutError:
+                break
+        early = self._wake_at is not None and self._wake_at < slot
+        # A regular tick re-evaluates everything, so it also serves any wake-up due after it
+        self._wake_at = None
+        return early
+
+    async def stop(self):
+        for task in (self._task, self._current):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._current = None
+        logger.info("Placer scheduler stopped")
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        next_slot = loop.time()
+        while True:
+            offset = random.uniform(0, self.jitter * self.interval) if self.jitter else 0
+            early = await self._sleep_until(next_slot + offset)
+
+            if self.tick_in_progress:
+                self.skipped += 1
+                TICKS_SKIPPED.inc()
+                logger.warning("Previous placer tick still running, skipping this tick")
+            else:
+                self._current = asyncio.create_task(self._run_tick(), name='placer-tick')
+
+            if early:
+                self.wakeups += 1
+                continue
+            next_slot += self.interval
+            if next_slot < loop.time():
+                # We fell behind (e.g. the loop was blocked); don't fire a burst of catch-up ticks
+                next_slot = loop.time() + self.interval
+
+    async def _run_tick(self):
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        status = 'success'
+        error = None
+        try:
+            self.last_result = await self.tick()
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            status = 'error'
+            error = str(e)
+            logger.error(f"Placer tick failed: {e}", exc_info=True)
+        finally:
+            duration = time.perf_counter() - start
+            overrun = duration > self.interval
+            if overrun:
+                self.overruns += 1
+                TICK_OVERRUNS.inc()
+                logger.warning(f"Placer tick took {duration:.2f}s, longer than the {self.interval}s interval")
+            self.tick_count += 1
+            self.ticks.append({
+                "started_at": started_at.isoformat(),
+                "duration": duration,
+                "status": status,
+                "error": error,
+                "overrun": overrun,
+            })
+
+    def status(self):
+        durations = [tick["duration"] for tick in self.ticks]
+        return {
+            "running": self.running,
+            "tick_in_progress": self.tick_in_progress,
+            "interval": self.interval,
+            "jitter": self.jitter,
+            "ticks": self.tick_count,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "wakeups": self.wakeups,
+            "next_wakeup": self._wake_at - asyncio.get_running_loop().time() if self._wake_at is not None else None,
+            "last_tick": self.ticks[-1] if self.ticks else None,
+            "max_duration": max(durations) if durations else None,
+            "mean_duration": sum(durations) / len(durations) if durations else None,
+            "recent_ticks": list(self.ticks),
+        }
@@ -0,0 +1,261 @@
+"""
+Module: tuner.py
+Description: Multi-core parameter sweep that scores placer settings against recorded traffic.
+
+Candidate settings for traffic_threshold, deployment_threshold, alpha_short,
+alpha_long, cooldown_period, the two windows and, for forecasting configs,
+deploy_latency and the Holt-Winters smoothing factors are generated as a full grid
+or by random search. Each candidate is replayed over a traffic recording
+(see automation/replay.py). Candidates are split into batches spread over a
+process pool, and each worker replays a whole batch in one vectorized pass.
+Batches are formed from candidates that share alpha_long and alpha_short, so
+the EWMA passes are shared as well.
+
+The output is the Pareto front of scaling churn (scale actions) against
+under-provisioned minutes: every candidate for which no other candidate is at
+least as good on both and strictly better on one.
+
+Usage:
+    python -m automation.tuner data/traffic_history
+    python -m automation.tuner export.npz --param traffic_threshold=25,50,100 --param cooldown_period=0,300
+    python -m automation.tuner export.npz --param alpha_long=0.02:0.5 --param traffic_threshold=10:200 --samples 500
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from automation.replay import DEFAULT_FLAP_WINDOW, FORECAST_SETTINGS, TrafficSeries, simulate
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+TUNABLE_PARAMS = ('traffic_threshold', 'deployment_threshold', 'alpha_short', 'alpha_long',
+                  'cooldown_period', 'short_term_window', 'long_term_window',
+                  'deploy_latency', 'forecast_alpha', 'forecast_beta', 'forecast_gamma')
+FORECAST_PARAMS = ('forecast_alpha', 'forecast_beta', 'forecast_gamma')
+INTEGER_PARAMS = ('short_term_window', 'long_term_window')
+
+# Swept when no --param is given: 4 x 3 x 4 x 3 candidates around the shipped defaults
+DEFAULT_GRID = {
+    'traffic_threshold': [25, 50, 100, 200],
+    'deployment_threshold': [5, 10, 25],
+    'alpha_long': [0.05, 0.1, 0.2, 0.4],
+    'cooldown_period': [0, 300, 900],
+}
+
+# Configs replayed together by one worker; memory grows with ticks x batch x regions
+DEFAULT_BATCH_SIZE = 16
+
+OBJECTIVES = ('actions', 'under_provisioned_minutes')
+
+
+def _check_params(space):
+    unknown = sorted(set(space) - set(TUNABLE_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown parameter(s): {', '.join(unknown)}; choose from {', '.join(TUNABLE_PARAMS)}")
+
+
+def grid_candidates(space):
+    """Every combination of the {param: [values]} lists."""
+    _check_params(space)
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_candidates(space, samples, seed=None):
+    """
+    `samples` random combinations. A (low, high) tuple is sampled uniformly
+    (integers for the window sizes); a list is sampled from its values.
+    """
+    _check_params(space)
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            low, high = values
+            if name in INTEGER_PARAMS:
+                columns[name] = rng.integers(int(low), int(high), size=samples, endpoint=True).tolist()
+            else:
+                columns[name] = rng.uniform(low, high, size=samples).tolist()
+        else:
+            columns[name] = [values[i] for i in rng.integers(len(values), size=samples)]
+    return [{name: columns[name][i] for name in space} for i in range(samples)]
+
+
+def is_valid(config):
+    """Whether a candidate config would pass validate_config's range checks."""
+    if config.get('deployment_threshold', 0) > config.get('traffic_threshold', 0):
+        return False
+    if not all(0 < config.get(name, 0.1) <= 1 for name in ('alpha_short', 'alpha_long')):
+        return False
+    if not all(0 <= config.get(name, 0) <= 1 for name in FORECAST_PARAMS):
+        return False
+    if any(config.get(name, 1) < 1 for name in INTEGER_PARAMS):
+        return False
+    return min(config.get(name, 0) for name in ('cooldown_period', 'traffic_threshold', 'deployment_threshold',
+                                               'deploy_latency')) >= 0
+
+
+def pareto_front(results, objectives=OBJECTIVES):
+    """
+    The results no other result dominates on the two (minimized) objectives,
+    sorted by the first objective. Of several results with identical scores only
+    the first is kept.
+    """
+    first, second = objectives
+    ordered = sorted(results, key=lambda result: (result[first], result[second]))
+    front = []
+    for result in ordered:
+        if not front or result[second] < front[-1][second]:
+            front.append(result)
+    return front
+
+
+_worker_state = {}
+
+
+def _init_worker(series, base_config, initial_regions, flap_window):
+    _worker_state.update(series=series, base_config=base_config, initial_regions=initial_regions,
+                         flap_window=flap_window)
+
+
+def _evaluate(batch):
+    """Replay one batch of candidates in the worker's process; returns their scores in order."""
+    state = _worker_state
+    configs = [{**state['base_config'], **params} for params in batch]
+    reports = simulate(state['series'], configs, state['initial_regions'], state['flap_window'])
+    return [
+        {
+            "actions": len(report.actions),
+            "flaps": report.flaps,
+            "under_provisioned_minutes": round(report.under_provisioned_minutes, 3),
+            "machine_hours": round(report.machine_hours, 3),
+            "skipped_cooldown": report.skipped_cooldown,
+        }
+        for report in reports
+    ]
+
+
+def sweep(series, base_config, candidates, workers=None, batch_size=DEFAULT_BATCH_SIZE, initial_regions=None,
+          flap_window=DEFAULT_FLAP_WINDOW):
+    """
+    Score every valid candidate (a dict of parameter overrides for `base_config`).
+
+    Returns [{'params': {...}, 'actions': ..., 'under_provisioned_minutes': ...,
+    ...}] in candidate order. `workers=1` runs in this process, which is also
+    what a single batch does; otherwise batches go to a pool of `workers`
+    processes (default: one per CPU).
+    """
+    valid = [params for params in candidates if is_valid({**base_config, **params})]
+    if len(valid) < len(candidates):
+        logger.info(f"Skipping {len(candidates) - len(valid)} invalid candidates")
+
+    # Candidates sharing alpha_long (then the window) share the EWMA pass and window stats,
+    # those sharing alpha_short the short EWMA pass, and those sharing forecast settings
+    # the Holt-Winters pass
+    def share_key(index):
+        config = {**base_config, **valid[index]}
+        return (config.get('alpha_long', 0), config.get('long_term_window', 0), config.get('alpha_short', 0),
+                tuple(config.get(name, 0) for name in FORECAST_SETTINGS))
+    order = sorted(range(len(valid)), key=share_key)
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    payloads = [[valid[index] for index in batch] for batch in batches]
+
+    init_args = (series, base_config, list(initial_regions or []), flap_window)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) <= 1:
+        _init_worker(*init_args)
+        results = _collect(valid, batches, map(_evaluate, payloads))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=_init_worker,
+                                 initargs=init_args) as pool:
+            results = _collect(valid, batches, pool.map(_evaluate, payloads))
+    return results
+
+
+def _collect(valid, batches, scored):
+    results = [None] * len(valid)
+    done = 0
+    for batch, scores in zip(batches, scored):
+        for index, score in zip(batch, scores):
+            results[index] = {"params": valid[index], **score}
+        done += len(batch)
+        logger.info(f"Scored {done}/{len(valid)} candidates")
+    return results
+
+
+def _parse_value(name, text):
+    return int(text) if name in INTEGER_PARAMS else float(text)
+
+
+def parse_space(specs):
+    """Parse `name=v1,v2,...` (values) and `name=low:high` (range) specs into a search space."""
+    space = {}
+    for spec in specs:
+        name, sep, values = spec.partition('=')
+        if not sep or not values:
+            raise ValueError(f"Expected name=v1,v2 or name=low:high, got {spec!r}")
+        if ':' in values:
+            low, high = values.split(':', 1)
+            space[name] = (_parse_value(name, low), _parse_value(name, high))
+        else:
+            space[name] = [_parse_value(name, value) for value in values.split(',')]
+    _check_params(space)
+    return space
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep placer parameters over recorded traffic")
+    parser.add_argument('history', help="history store directory, .npz export or legacy traffic_history*.json")
+    parser.add_argument('--config', default=None, help="base config.yml (default: the service config)")
+    parser.add_argument('--param', action='append', default=[],
+                        help="name=v1,v2,... or name=low:high; repeatable (default: a built-in grid)")
+    parser.add_argument('--samples', type=int, default=None,
+                        help="random search with this many candidates instead of the full grid")
+    parser.add_argument('--seed', type=int, default=None, help="seed for random search")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="candidates each worker replays in one vectorized pass")
+    parser.add_argument('--initial-regions', default='', help="comma-separated regions deployed at the start")
+    parser.add_argument('--all', action='store_true', help="include every scored candidate in the output")
+    parser.add_argument('--json', default=None, help="write the result to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    from utils.config_loader import Config, load_config
+    base_config = load_config(args.config) if args.config else Config.get_config()
+    try:
+        space = parse_space(args.param) if args.param else DEFAULT_GRID
+    except ValueError as e:
+        parser.error(str(e))
+    if args.samples:
+        candidates = random_candidates(space, args.samples, args.seed)
+    elif any(isinstance(values, tuple) for values in space.values()):
+        parser.error("low:high ranges need --samples (random search)")
+    else:
+        candidates = grid_candidates(space)
+
+    series = TrafficSeries.load(args.history)
+    logger.info(f"Scoring {len(candidates)} candidates over {len(series)} ticks x {len(series.regions)} regions")
+    initial = [region for region in args.initial_regions.split(',') if region]
+    results = sweep(series, base_config, candidates, workers=args.workers, batch_size=args.batch_size,
+                    initial_regions=initial)
+
+    output = {"evaluated": len(results), "objectives": list(OBJECTIVES), "front": pareto_front(results)}
+    if args.all:
+        output["results"] = results
+    text = json.dumps(output, indent=2)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return output
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""
+Module: compare.py
+Description: Diffs two benchmark JSON files and flags regressions.
+
+Usage:
+    python benchmarks/compare.py baseline.json current.json [--threshold 0.1]
+
+Exits with status 1 when any benchmark's median got slower by more than the
+threshold (a fraction, default 10%).
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def load(path):
+    with open(path) as file:
+        document = json.load(file)
+    return {result["fullname"]: result for result in document["benchmarks"]}, document.get("commit")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Return rows of (fullname, old median, new median, relative change, regressed)."""
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        old = baseline.get(name, {}).get("stats", {}).get("median")
+        new = current.get(name, {}).get("stats", {}).get("median")
+        change = (new - old) / old if old and new is not None else None
+        rows.append((name, old, new, change, change is not None and change > threshold))
+    return rows
+
+
+def _format(seconds):
+    return '-' if seconds is None else f"{seconds * 1e6:.1f}us"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two benchmark JSON files.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    baseline, baseline_commit = load(args.baseline)
+    current, current_commit = load(args.current)
+    print(f"baseline {baseline_commit or args.baseline} -> current {current_commit or args.current}")
+
+    rows = compare(baseline, current, args.threshold)
+    width = max((len(row[0]) for row in rows), default=4)
+    regressions = 0
+    for name, old, new, change, regressed in rows:
+        delta = '' if change is None else f"{change:+.1%}"
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<{width}}  {_format(old):>12}  {_format(new):>12}  {delta:>8}{flag}")
+        regressions += regressed
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
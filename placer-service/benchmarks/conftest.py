@@ -0,0 +1,186 @@
+"""
+Module: conftest.py
+Description: Minimal pytest-benchmark style `benchmark` fixture with JSON output.
+
+Run from placer-service/:
+    python -m pytest benchmarks --bench-json bench.json
+    python benchmarks/compare.py old.json bench.json
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import pytest
+
+_RESULTS = pytest.StashKey()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('placer benchmarks')
+    group.addoption('--bench-json', metavar='PATH', help='write benchmark results to PATH as JSON')
+    group.addoption('--bench-min-time', type=float, default=0.25,
+                    help='minimum seconds spent timing each benchmark (default: 0.25)')
+    group.addoption('--bench-max-rounds', type=int, default=10000,
+                    help='maximum timed rounds per benchmark (default: 10000)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark(group): group name used in benchmark reports')
+    config.stash[_RESULTS] = []
+
+
+class Benchmark:
+    """
+    Times a callable like pytest-benchmark's fixture: `benchmark(fn, *args)` runs
+    fn repeatedly (after one warm-up call) until `min_time` has elapsed and
+    returns the result of the last call. `benchmark.pedantic` runs a setup
+    function before every round, outside the timed section.
+    """
+
+    def __init__(self, name, group, min_time, max_rounds):
+        self.name = name
+        self.group = group
+        self.min_time = min_time
+        self.max_rounds = max_rounds
+        self.extra_info = {}
+        self.stats = None
+
+    def __call__(self, fn, *args, **kwargs):
+        return self.pedantic(fn, args=args, kwargs=kwargs)
+
+    def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=None, warmup_rounds=1):
+        kwargs = kwargs or {}
+
+        def call():
+            call_args, call_kwargs = args, kwargs
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    call_args, call_kwargs = prepared
+            start = time.perf_counter()
+            result = fn(*call_args, **call_kwargs)
+            return result, time.perf_counter() - start
+
+        for _ in range(warmup_rounds):
+            result, _ = call()
+        timings = []
+        deadline = time.perf_counter() + self.min_time
+        max_rounds = rounds or self.max_rounds
+        while len(timings) < max_rounds:
+            result, elapsed = call()
+            timings.append(elapsed)
+            if rounds is None and time.perf_counter() >= deadline:
+                break
+        self._record(timings)
+        return result
+
+    def _record(self, timings):
+        mean = statistics.fmean(timings)
+        self.stats = {
+            "rounds": len(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "mean": mean,
+            "median": statistics.median(timings),
+            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "ops": 1 / mean if mean else None,
+        }
+
+
+@pytest.fixture
+def benchmark(request):
+    marker = request.node.get_closest_marker('benchmark')
+    group = marker.kwargs.get('group') if marker else request.node.module.__name__.rpartition('.')[2]
+    bench = Benchmark(
+        request.node.name,
+        group,
+        request.config.getoption('--bench-min-time'),
+        request.config.getoption('--bench-max-rounds'),
+    )
+    yield bench
+    if bench.stats is not None:
+        request.config.stash[_RESULTS].append({
+            "name": bench.name,
+            "fullname": request.node.nodeid,
+            "group": bench.group,
+            "params": getattr(request.node, 'callspec', None) and
+                      {key: repr(value) for key, value in request.node.callspec.params.items()},
+            "extra_info": bench.extra_info,
+            "stats": bench.stats,
+        })
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('--bench-json')
+    results = session.config.stash[_RESULTS]
+    if not path or not results:
+        return
+    import numpy as np
+    document = {
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "commit": _commit(),
+        "machine_info": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "numpy": np.__version__,
+        },
+        "benchmarks": results,
+    }
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash[_RESULTS]
+    if not results:
+        return
+    terminalreporter.section('benchmarks')
+    width = max(len(result["name"]) for result in results)
+    terminalreporter.write_line(f"{'name':<{width}}  {'median':>12}  {'mean':>12}  {'stddev':>12}  {'rounds':>7}")
+    for result in sorted(results, key=lambda result: (result["group"], result["name"])):
+        stats = result["stats"]
+        terminalreporter.write_line(
+            f"{result['name']:<{width}}  {stats['median'] * 1e6:>10.1f}us  {stats['mean'] * 1e6:>10.1f}us  "
+            f"{stats['stddev'] * 1e6:>10.1f}us  {stats['rounds']:>7}"
+        )
+
+
+# Region counts and history lengths shared by the benchmark modules: a typical
+# app, every Fly region, and a synthetic stress case.
+REGION_COUNTS = [8, 35, 500]
+HISTORY_POINTS = [20, 1000, 100_000]
+
+FLY_REGIONS = [
+    'ams', 'arn', 'atl', 'bog', 'bom', 'bos', 'cdg', 'den', 'dfw', 'ewr', 'eze', 'fra',
+    'gdl', 'gig', 'gru', 'hkg', 'iad', 'jnb', 'lax', 'lhr', 'mad', 'mia', 'nrt', 'ord',
+    'otp', 'phx', 'qro', 'scl', 'sea', 'sin', 'sjc', 'syd', 'waw', 'yul', 'yyz',
+]
+
+
+def region_names(count):
+    """The first `count` Fly regions, padded with synthetic names beyond the real 35."""
+    return FLY_REGIONS[:count] + [f'r{index:03d}' for index in range(count - len(FLY_REGIONS))]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point the state and history namespaces at a temporary directory."""
+    from utils.history_manager import close_history_stores
+    from utils.state_manager import close_state_stores
+    monkeypatch.setattr('utils.state_manager.DATA_DIR', str(tmp_path))
+    yield tmp_path
+    close_history_stores()
+    close_state_stores()
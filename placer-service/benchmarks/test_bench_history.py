@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from conftest import HISTORY_POINTS, region_names
+from utils.config_loader import Config
+from utils.history_manager import (
+    get_history_store, load_traffic_history, save_traffic_history, update_traffic_history,
+)
+
+# Full {datetime: snapshot} loads are only realistic for short histories; longer
+# ones are read back through the same tick-sized limit the legacy code used.
+LOAD_LIMIT = 1000
+
+CASES = [(8, 20), (35, 1000), (500, 1000), (35, 100_000)]
+assert {points for _, points in CASES} == set(HISTORY_POINTS)
+
+
+@pytest.fixture
+def history(data_dir, monkeypatch, request):
+    """A dry-run history store pre-filled with `points` samples for `region_count` regions."""
+    region_count, points = request.param
+    monkeypatch.setattr(Config, '_config', {**Config.get_config(), 'history_window': points})
+    regions = region_names(region_count)
+    store = get_history_store(dry_run=True)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    timestamps = start + 60.0 * np.arange(points)
+    values = np.random.default_rng(0).gamma(2.0, 30.0, size=(region_count, points))
+    for region, row in zip(regions, values):
+        store.extend(region, timestamps, row)
+    store.flush()
+    return regions, points
+
+
+@pytest.mark.parametrize('history', CASES, indirect=True, ids=lambda case: f'{case[0]}x{case[1]}')
+def test_update_traffic_history(benchmark, history):
+    regions, _ = history
+    snapshot = {region: 42.0 for region in regions}
+    benchmark(update_traffic_history, snapshot, True)
+
+
+@pytest.mark.parametrize('history', CASES, indirect=True, ids=lambda case: f'{case[0]}x{case[1]}')
+def test_load_traffic_history(benchmark, history):
+    _, points = history
+    benchmark(load_traffic_history, True, min(points, LOAD_LIMIT))
+
+
+@pytest.mark.parametrize('history', CASES, indirect=True, ids=lambda case: f'{case[0]}x{case[1]}')
+def test_save_traffic_history(benchmark, history):
+    regions, _ = history
+    clock = [datetime(2030, 1, 1, tzinfo=timezone.utc)]
+
+    def setup():
+        clock[0] += timedelta(minutes=1)
+        return (({clock[0]: {region: 42.0 for region in regions}}, True), {})
+
+    benchmark.pedantic(save_traffic_history, setup=setup)
+
+
+@pytest.mark.parametrize('history', CASES, indirect=True, ids=lambda case: f'{case[0]}x{case[1]}')
+def test_history_matrix_for_warm_start(benchmark, history):
+    regions, points = history
+    store = get_history_store(dry_run=True)
+    benchmark(store.matrix, regions, min(points, 256))
@@ -0,0 +1,42 @@
+import json
+import pytest
+from conftest import REGION_COUNTS, region_names
+from monitoring.ingest import TrafficWindows, parse_batch
+
+BATCH_SIZE = 10_000
+
+
+def event_batch(regions, size=BATCH_SIZE):
+    return [{'region': regions[index % len(regions)]} for index in range(size)]
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_ingest_event_batch(benchmark, region_count):
+    """Per-event cost of the push path; 10k events per call."""
+    windows = TrafficWindows(max_regions=region_count)
+    events = event_batch(region_names(region_count))
+    result = benchmark(windows.ingest, events)
+    assert result['dropped'] == 0
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_decode_and_ingest_ndjson(benchmark, region_count):
+    """Newline-delimited JSON decoding included, as a log shipper sends it."""
+    windows = TrafficWindows(max_regions=region_count)
+    body = '\n'.join(json.dumps(event) for event in event_batch(region_names(region_count))).encode()
+    benchmark(lambda: windows.ingest(parse_batch(body)))
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_ingest_counts(benchmark, region_count):
+    windows = TrafficWindows(max_regions=region_count)
+    payload = {'counts': {region: 3 for region in region_names(region_count)}}
+    benchmark(windows.ingest, payload)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_snapshot(benchmark, region_count):
+    windows = TrafficWindows(max_regions=region_count)
+    windows.ingest({'counts': {region: 3 for region in region_names(region_count)}})
+    traffic = benchmark(windows.snapshot)
+    assert len(traffic[None]) == region_count
@@ -0,0 +1,70 @@
+import json
+import pytest
+from conftest import REGION_COUNTS, region_names
+from metrics.metrics_client import MetricsClient, MetricsRegistry
+from utils.metrics_fetcher import AsyncMetricsFetcher
+
+APP_COUNTS = [1, 20]
+
+
+def prometheus_payload(regions, apps=(None,)):
+    """A decoded instant-query response as Prometheus returns it."""
+    result = []
+    for app in apps:
+        for index, region in enumerate(regions):
+            metric = {'region': region} if app is None else {'app': app, 'region': region}
+            result.append({'metric': metric, 'value': [1700000000.123, str(index * 1.5)]})
+    return {'status': 'success', 'data': {'resultType': 'vector', 'result': result}}
+
+
+@pytest.fixture(scope='module')
+def fetcher():
+    return AsyncMetricsFetcher(dry_run=True)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_parse_metrics(benchmark, fetcher, region_count):
+    payload = prometheus_payload(region_names(region_count))
+    parsed = benchmark(fetcher._parse_metrics, payload)
+    assert len(parsed) == region_count
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_decode_and_parse_metrics(benchmark, fetcher, region_count):
+    """JSON decoding included, as on the wire."""
+    body = json.dumps(prometheus_payload(region_names(region_count)))
+    benchmark(lambda: fetcher._parse_metrics(json.loads(body)))
+
+
+@pytest.mark.parametrize('app_count', APP_COUNTS)
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_parse_app_metrics(benchmark, fetcher, region_count, app_count):
+    payload = prometheus_payload(region_names(region_count), [f'app{index}' for index in range(app_count)])
+    parsed = benchmark(lambda: list(fetcher._parse_app_metrics(payload)))
+    assert len(parsed) == region_count * app_count
+
+
+def test_histogram_observe(benchmark):
+    child = MetricsRegistry().histogram('bench_seconds', 'Benchmark latency', ('op',)).labels('get')
+    benchmark(child.observe, 0.042)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_record_decisions(benchmark, region_count):
+    """Per-tick gauge updates for every region, as the predictor records them."""
+    client = MetricsClient(MetricsRegistry())
+    regions = region_names(region_count)
+    values = [float(index) for index in range(region_count)]
+    actions = [None] * region_count
+    benchmark(client.record_decisions, regions, values, values, values, actions)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_render_exposition(benchmark, region_count):
+    registry = MetricsRegistry()
+    client = MetricsClient(registry)
+    regions = region_names(region_count)
+    values = [float(index) for index in range(region_count)]
+    client.record_decisions(regions, values, values, values, ['scale_up'] * region_count)
+    text = benchmark(registry.render)
+    assert text.count('\n') >= 3 * region_count
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from conftest import REGION_COUNTS, region_names
+from prediction.placement_predictor import PlacementPredictor
+
+CONFIG = {'traffic_threshold': 50, 'deployment_threshold': 10, 'short_term_window': 5, 'long_term_window': 20}
+
+
+def warmed_predictor(regions, samples=40, seed=0):
+    rng = np.random.default_rng(seed)
+    predictor = PlacementPredictor(CONFIG)
+    predictor.warm_start(regions, rng.gamma(2.0, 30.0, size=(len(regions), samples)))
+    return predictor
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_predict_placement_actions(benchmark, region_count):
+    """One tick of the per-region scalar path: every region decided in turn."""
+    regions = region_names(region_count)
+    predictor = warmed_predictor(regions)
+    averages = [predictor.averages(region) for region in regions]
+
+    def tick():
+        return [predictor.predict_placement_actions(region, avg) for region, avg in zip(regions, averages)]
+
+    benchmark(tick)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_calculate_adaptive_thresholds(benchmark, region_count):
+    regions = region_names(region_count)
+    predictor = warmed_predictor(regions)
+    averages = [predictor.averages(region) for region in regions]
+
+    def tick():
+        return [predictor.calculate_adaptive_thresholds(region, avg, 50, 10)
+                for region, avg in zip(regions, averages)]
+
+    benchmark(tick)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_observe_and_predict_smoothed(benchmark, region_count):
+    """The vectorized path a placer tick actually runs."""
+    regions = region_names(region_count)
+    predictor = warmed_predictor(regions)
+    snapshot = dict(zip(regions, np.random.default_rng(1).gamma(2.0, 30.0, size=len(regions)).tolist()))
+
+    def tick():
+        predictor.observe(snapshot)
+        return predictor.predict_smoothed(regions)
+
+    benchmark(tick)
+
+
+@pytest.mark.parametrize('points', [20, 1000])
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_predict_all_from_history_matrix(benchmark, region_count, points):
+    regions = region_names(region_count)
+    traffic = np.random.default_rng(2).gamma(2.0, 30.0, size=(region_count, points))
+    predictor = PlacementPredictor(CONFIG)
+    benchmark(predictor.predict_all, regions, traffic)
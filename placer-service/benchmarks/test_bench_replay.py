@@ -0,0 +1,22 @@
+import pytest
+from conftest import region_names
+from automation.replay import TrafficSeries, replay
+from utils.traffic_simulator import TrafficSimulator
+
+CONFIG = {
+    'cooldown_period': 300, 'traffic_threshold': 50, 'deployment_threshold': 10,
+    'short_term_window': 5, 'long_term_window': 20, 'alpha_long': 0.1,
+    'always_running_regions': [region_names(1)[0]],
+}
+
+# (regions, ticks): one day, one week and 30 days of per-minute history
+CASES = [(8, 1440), (35, 10_080), (35, 43_200)]
+
+
+@pytest.mark.parametrize('region_count,ticks', CASES, ids=[f'{r}x{t}' for r, t in CASES])
+def test_replay(benchmark, region_count, ticks):
+    regions = region_names(region_count)
+    timestamps, counts = TrafficSimulator(regions, ['diurnal', 'flash_crowd'], seed=0).counts(ticks)
+    series = TrafficSeries(timestamps, regions, counts)
+    report = benchmark(replay, series, CONFIG)
+    assert report.summary()['ticks'] == ticks
@@ -0,0 +1,42 @@
+import pytest
+from conftest import REGION_COUNTS, region_names
+from monitoring.clients import ClientWindows
+from monitoring.ingest import TrafficWindows
+from utils.sketches import HyperLogLog, hash_array
+
+BATCH_SIZE = 10_000
+
+
+def client_batch(regions, size=BATCH_SIZE, clients=2000):
+    return [{'region': regions[index % len(regions)], 'ip': f"10.0.{index % clients // 256}.{index % 256}"}
+            for index in range(size)]
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_ingest_client_events(benchmark, region_count):
+    """Push path with client sketching; compare with test_bench_ingest.test_ingest_event_batch."""
+    windows = TrafficWindows.from_config({'ingest_max_regions': region_count})
+    events = client_batch(region_names(region_count))
+    result = benchmark(windows.ingest, events)
+    assert result['dropped'] == 0
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_client_summaries(benchmark, region_count):
+    """Flush pending clients and merge the sub-window sketches of every region."""
+    clients = ClientWindows(max_regions=region_count)
+
+    def flush_and_read():
+        for event in client_batch(region_names(region_count)):
+            clients.add(None, event['region'], event['ip'])
+        return clients.summaries()
+
+    summaries = benchmark(flush_and_read)
+    assert len(summaries[None]) == region_count
+
+
+def test_hyperloglog_add_hashes(benchmark):
+    hll = HyperLogLog()
+    hashes = hash_array([f"client-{index}" for index in range(BATCH_SIZE)])
+    benchmark(hll.add_hashes, hashes)
+    assert abs(hll.count() / BATCH_SIZE - 1) < 0.05
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+import pytest
+from conftest import REGION_COUNTS, region_names
+from utils.state_manager import get_state_store, load_deployment_state, record_placement_results, save_deployment_state
+
+
+def deployment_state(region_count):
+    now = datetime.now(timezone.utc).isoformat()
+    return {region: now for region in region_names(region_count)}
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_load_deployment_state(benchmark, data_dir, region_count):
+    save_deployment_state(deployment_state(region_count), dry_run=True)
+    state = benchmark(load_deployment_state, True)
+    assert len(state) == region_count
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_save_deployment_state(benchmark, data_dir, region_count):
+    benchmark(save_deployment_state, deployment_state(region_count), True)
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_record_placement_results(benchmark, data_dir, region_count):
+    """One tick's actions: state change and journal entries in a single transaction."""
+    regions = region_names(region_count)
+    results = {'deployed': regions[::2], 'removed': regions[1::2], 'skipped': [], 'errors': []}
+    benchmark(record_placement_results, results, True)
+
+
+def test_last_action_lookup(benchmark, data_dir):
+    """Indexed lookup of a region's last action in a 100k-entry journal."""
+    store = get_state_store(True)
+    regions = region_names(35)
+    with store._transaction() as conn:
+        conn.executemany('INSERT INTO actions (region, action, timestamp, result) VALUES (?, ?, ?, ?)',
+                         [(regions[i % 35], 'deploy', float(i), 'success') for i in range(100_000)])
+    entry = benchmark(store.last_action, 'iad')
+    assert entry['region'] == 'iad'
@@ -0,0 +1,57 @@
+import asyncio
+import numpy as np
+import pytest
+from conftest import REGION_COUNTS, region_names
+from automation import auto_placer
+from automation.auto_placer import AutoPlacer
+from utils.config_loader import Config
+from utils.metrics_fetcher import AsyncMetricsFetcher
+
+
+class SyntheticFetcher:
+    """Serves random per-region traffic without touching Prometheus."""
+
+    dry_run = True
+
+    def __init__(self, regions, seed=0):
+        self.regions = regions
+        self.rng = np.random.default_rng(seed)
+
+    def get_app_name(self):
+        return 'bench-app'
+
+    async def fetch_region_traffic(self):
+        return dict(zip(self.regions, self.rng.gamma(2.0, 30.0, size=len(self.regions)).tolist()))
+
+
+@pytest.fixture
+def event_loop_runner():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def placer_config(data_dir, monkeypatch):
+    monkeypatch.setattr(auto_placer, 'LOG_DIR', str(data_dir / 'logs'))
+    monkeypatch.setattr(auto_placer, 'LOG_FILE', str(data_dir / 'logs' / 'auto_placer.log'))
+    return {
+        **Config.get_config(),
+        'dry_run': True,
+        'apps': [],
+        'allowed_regions': [],
+        'excluded_regions': [],
+        'backfill_enabled': False,
+    }
+
+
+@pytest.mark.parametrize('region_count', REGION_COUNTS)
+def test_process_traffic_data_tick(benchmark, placer_config, event_loop_runner, region_count):
+    placer = AutoPlacer(placer_config, metrics_fetcher=SyntheticFetcher(region_names(region_count)))
+    benchmark(lambda: event_loop_runner(placer.process_traffic_data()))
+
+
+def test_process_traffic_data_tick_mock_metrics(benchmark, placer_config, event_loop_runner):
+    """Dry-run tick with the built-in mock traffic generator."""
+    placer = AutoPlacer(placer_config, metrics_fetcher=AsyncMetricsFetcher(dry_run=True))
+    benchmark(lambda: event_loop_runner(placer.process_traffic_data()))
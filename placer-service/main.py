@@ -1,15 +1,21 @@
 import os
-import threading
-import time
 import asyncio
+import functools
+import json
 from fastapi import FastAPI, Request, HTTPException
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import logging
 from automation import auto_placer
+from automation.scheduler import PlacerScheduler
+from utils.single_flight import SingleFlight
+from utils.traffic_cache import TrafficCache, etag_matches
 from utils.config_loader import Config
-from utils.metrics_fetcher import MetricsFetcher
+from utils.config_watcher import ConfigWatcher
+from utils.metrics_fetcher import AsyncMetricsFetcher
+from monitoring.ingest import IngestError, TrafficWindows, parse_batch
+from metrics.metrics_client import CONTENT_TYPE, REGISTRY
 import uvicorn
 from datetime import datetime, timezone  
 
@@ -17,33 +23,86 @@ from datetime import datetime, timezone
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def watch_config(server):
-    config_filepath = os.path.join('config', 'config.yml')
-    last_mtime = os.path.getmtime(config_filepath)
-    while not server.should_exit:
-        time.sleep(1)  # Check every second
-        try:
-            current_mtime = os.path.getmtime(config_filepath)
-            if current_mtime != last_mtime:
-                logger.info(f"{config_filepath} has changed, restarting application...")
-                server.should_exit = True  # Signal the server to shut down
-                break
-            else:
-                last_mtime = current_mtime
-        except FileNotFoundError:
-            logger.warning(f"{config_filepath} not found. Continuing...")
-            last_mtime = 0  # Reset last_mtime if file is not found
+def apply_runtime_config(app, config):
+    """Push a reloaded config into the long-lived components (runs on the event loop)."""
+    scheduler = app.state.scheduler
+    scheduler.interval = float(config.get('tick_interval', scheduler.interval))
+    scheduler.jitter = float(config.get('tick_jitter', scheduler.jitter))
+    if config.get('scheduler_enabled', True):
+        scheduler.start()
+    elif scheduler.running:
+        asyncio.create_task(scheduler.stop())
+    app.state.placer_flight.debounce = float(config.get('trigger_debounce', 0))
+    traffic_cache = app.state.traffic_cache
+    traffic_cache.ttl = float(config.get('metrics_cache_ttl', traffic_cache.ttl))
+    traffic_cache.stale_ttl = float(config.get('metrics_cache_stale', traffic_cache.stale_ttl))
+    app.state.ingest.update_config(config)
+    app.state.ingest.on_threshold = ingest_wakeup(app, config)
+    logger.info(f"Applied configuration version {Config.version()}")
+
+def ingest_wakeup(app, config):
+    """Threshold callback for pushed traffic; it only starts ticks when pushed traffic drives them."""
+    if config.get('traffic_source', 'prometheus') != 'ingest':
+        return None
+    scheduler = app.state.scheduler
+    return lambda app_name, region: scheduler.wake_in(0)
+
+def placer_traffic(app):
+    """Refill for the /metrics cache, in the shape ticks put: {region: n}, or {app: {region: n}} with apps."""
+    async def fetch():
+        placer = app.state.placer
+        if placer.multi_app:
+            return await app.state.metrics_fetcher.fetch_apps_traffic(placer.apps)
+        return await app.state.metrics_fetcher.fetch_region_traffic()
+    return fetch
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Perform startup operations
     config = Config.get_config()
-    if not config['dry_run']:
+    if not config['dry_run'] and not config.get('apps'):
         if not os.environ.get('FLY_APP_NAME'):
             raise ValueError("FLY_APP_NAME environment variable is not set. This is required when not in dry run mode.")
-    
+
+    # One pooled metrics client and one placer for the whole app lifespan
+    app.state.metrics_fetcher = AsyncMetricsFetcher()
+    app.state.traffic_cache = TrafficCache.from_config(config, placer_traffic(app))
+    app.state.ingest = TrafficWindows.from_config(config)
+    app.state.placer = auto_placer.AutoPlacer(
+        config,
+        metrics_fetcher=app.state.metrics_fetcher,
+        traffic_cache=app.state.traffic_cache,
+        ingest=app.state.ingest,
+    )
+    # Scheduled ticks and /trigger calls share one in-flight execution. Only /trigger is
+    # debounced: scheduled and wake-up ticks must see current traffic and cooldowns
+    app.state.placer_flight = SingleFlight(
+        app.state.placer.process_traffic_data,
+        debounce=float(config.get('trigger_debounce', 0)),
+    )
+    app.state.scheduler = PlacerScheduler.from_config(config, functools.partial(app.state.placer_flight, force=True))
+    # Actions held back by a cooldown wake the scheduler when they become eligible
+    app.state.placer.wakeup = app.state.scheduler.wake_in
+    # So does pushed traffic rising through traffic_threshold
+    app.state.ingest.on_threshold = ingest_wakeup(app, config)
+    if config.get('scheduler_enabled', True):
+        app.state.scheduler.start()
+
+    # Config changes are applied in place instead of restarting the server
+    loop = asyncio.get_running_loop()
+    def on_config_change(new_config):
+        loop.call_soon_threadsafe(apply_runtime_config, app, new_config)
+    Config.subscribe(on_config_change)
+    config_watcher = ConfigWatcher(Config.config_path, Config.reload).start()
+
     logger.info("Application startup complete")
     yield
+    config_watcher.stop()
+    Config.unsubscribe(on_config_change)
+    await app.state.scheduler.stop()
+    # Stopping the scheduler leaves the shielded tick running; end it before its client closes
+    await app.state.placer_flight.cancel()
+    await app.state.metrics_fetcher.aclose()
     logger.info("Application shutdown complete")
 
 app = FastAPI(lifespan=lifespan)
@@ -82,29 +141,136 @@ async def health_check():
         raise HTTPException(status_code=503, detail=str(e))
 
 @app.get("/metrics")
-async def get_metrics():
+async def get_metrics(request: Request):
+    traffic_cache = request.app.state.traffic_cache
     try:
-        metrics_fetcher = MetricsFetcher()
-        traffic_data = metrics_fetcher.fetch_region_traffic()
-        return {
-            "traffic_data": traffic_data,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+        cached = await traffic_cache.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"max-age={traffic_cache.max_age()}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=cached.body, headers=headers)
+
+@app.get("/metrics/prometheus")
+async def prometheus_metrics():
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.post("/ingest")
+async def ingest_traffic(request: Request):
+    """Count one request event or one set of per-region request counts."""
+    try:
+        payload = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Expected one event or {'counts': {...}}; use /ingest/batch for lists")
+    try:
+        return request.app.state.ingest.ingest(payload)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/ingest/batch")
+async def ingest_traffic_batch(request: Request):
+    """Count a batch of events, as a JSON list, {'events': [...]} or newline-delimited JSON."""
+    try:
+        return request.app.state.ingest.ingest(parse_batch(await request.body()))
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/ingest")
+async def ingest_status(request: Request):
+    return request.app.state.ingest.status()
+
+@app.get("/ingest/clients")
+async def ingest_clients(request: Request):
+    """Distinct-client estimates and top clients per region over the ingest window."""
+    clients = request.app.state.ingest.clients
+    # No sketches until the first pushed event names a client
+    summaries = clients.summaries() if clients is not None else {}
+    if request.app.state.ingest.apps is None:
+        return summaries.get(None, {})
+    return summaries
+
+@app.get("/scheduler")
+async def scheduler_status(request: Request):
+    return {**request.app.state.scheduler.status(), "single_flight": request.app.state.placer_flight.stats()}
+
 @app.post("/trigger")
-async def trigger_auto_placer():
+async def trigger_auto_placer(request: Request):
     try:
-        config = Config.get_config()  # Get config from Config class
-        auto_placer_instance = auto_placer.AutoPlacer(config)  # Pass config here
-        results = await auto_placer_instance.process_traffic_data()
-        logger.info(f"Auto-placer execution completed. Results: {results}")
-        return JSONResponse(content={"status": "success", "results": results})
+        results, source = await request.app.state.placer_flight.run()
+        logger.info(f"Auto-placer execution completed ({source}). Results: {results}")
+        return JSONResponse(content={
+            "status": "success",
+            "source": source,
+            "results": results,
+            "ticks": request.app.state.placer.tracer.recent(),
+        })
     except Exception as e:
         logger.error(f"Error triggering auto-placer: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.get("/inventory")
+async def machine_inventory(request: Request, refresh: bool = False):
+    """Cached machine inventory per managed app; refresh=true lists the machines again."""
+    placer = request.app.state.placer
+    inventories = []
+    for managed_app in placer.apps:
+        reconciler = placer.reconciler_for(managed_app)
+        if refresh:
+            try:
+                await reconciler.inventory(force=True)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Could not list machines: {e}")
+        inventories.append({"app": managed_app, **reconciler.status()})
+    return {"inventories": inventories}
+
+@app.get("/cooldowns")
+async def cooldowns(request: Request):
+    placer = request.app.state.placer
+    return {"cooldowns": [{"app": managed_app, **placer.cooldown_for(managed_app).status()}
+                          for managed_app in placer.apps]}
+
+@app.get("/debug/ticks")
+async def debug_ticks(request: Request):
+    tracer = request.app.state.placer.tracer
+    return {"ticks": tracer.recent(), "profile_pending": tracer.profile_pending}
+
+@app.post("/admin/profile")
+async def profile_tick(request: Request, trigger: bool = False, sort: str = 'cumulative', limit: int = 50,
+                       timeout: float = None):
+    """
+    Run the next tick under cProfile and return its trace and pstats report.
+
+    trigger=true starts that tick now. If a tick is already running, or the
+    trigger is debounced, the report comes from the next tick after it.
+    """
+    tracer = request.app.state.placer.tracer
+    if timeout is None:
+        timeout = 2 * request.app.state.scheduler.interval
+    try:
+        profile = asyncio.ensure_future(tracer.profile_next(timeout=timeout, sort=sort, limit=limit))
+        # Let the request register before a triggered tick starts
+        await asyncio.sleep(0)
+        if trigger and not profile.done():
+            try:
+                await request.app.state.placer_flight.run()
+            except Exception as e:
+                # The failed tick's trace and profile are still returned
+                logger.warning(f"Profiled tick failed: {e}")
+        return await profile
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"No placer tick finished within {timeout}s")
+
 # Modify run_server to be an async function
 async def run_server(host, port):
     config = uvicorn.Config(
@@ -116,10 +282,6 @@ async def run_server(host, port):
     )
     server = uvicorn.Server(config)
 
-    # Start the config watcher thread
-    config_watcher = threading.Thread(target=watch_config, args=(server,), daemon=True)
-    config_watcher.start()
-
     logger.info(f"Server started on {host}:{port}")
     logger.info("Autoplacer running for App: ")
 
@@ -128,14 +290,11 @@ async def run_server(host, port):
 
 async def main():
     host=["::", "0.0.0.0"] # or your preferred host
-    port = 8000  # or your preferred port
+    port = int(os.environ.get('PORT', 8000))  # or your preferred port
 
     logger.info(f"Starting placer server on {host}:{port}")
-    while True:
-        await run_server(host, port)
-        logger.info("Server has shut down")
-        logger.info("Restarting server in 1 second...")
-        await asyncio.sleep(1)  # Brief pause before restarting
+    await run_server(host, port)
+    logger.info("Server has shut down")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,5 +1,296 @@
+"""
+Module: metrics_client.py
+Description: In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+Metrics live in a MetricsRegistry (the module-level REGISTRY by default) and
+are served by GET /metrics/prometheus. Recording is meant for hot paths:
+`metric.labels(...)` returns a child that callers can keep, and updating a
+child is an attribute increment (histograms add a bisect over fixed bucket
+bounds). Nothing is allocated and no lock is taken per update. Only creating a
+new label combination takes the registry lock. All updates happen on the event
+loop thread, so they never race each other. Work handed to worker threads is
+timed by its awaiting coroutine.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+# Seconds; spans a fast Prometheus query up to a slow flyctl deploy
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        if amount < 0:
+            raise ValueError(f"Counters only go up, got {amount}")
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def dec(self, amount=1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # counts[i] holds observations in (bounds[i-1], bounds[i]]; the last slot is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """A named metric family; each distinct label tuple gets its own child."""
+
+    kind = None
+    _child_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        # An unlabelled metric is its own single child
+        self._default = self.labels() if not self.labelnames else None
+
+    def _new_child(self):
+        return self._child_type()
+
+    def labels(self, *values):
+        """Return the child for these label values (strings, in `labelnames` order)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def remove(self, *values):
+        """Drop a label combination, e.g. for a region that is no longer managed."""
+        with self._lock:
+            self._children.pop(values, None)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items(), key=lambda item: item[0]):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child):
+        return [f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _child_type = _CounterChild
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    _child_type = _GaugeChild
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        bounds = sorted(float(bound) for bound in buckets if not math.isinf(bound))
+        if not bounds:
+            raise ValueError(f"{name} needs at least one finite bucket bound")
+        if 'le' in labelnames:
+            raise ValueError("'le' is reserved for histogram buckets")
+        self.bounds = tuple(bounds)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _render_child(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), list(child.counts)):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(child.sum)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A set of metric families rendered together.
+
+    `counter`, `gauge` and `histogram` return the existing family when the
+    name is already registered with the same type and labels. Modules can
+    therefore declare their metrics at import time.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind} "
+                                 f"with labels {metric.labelnames}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# The placer's own metrics
+TICK_DURATION = REGISTRY.histogram(
+    'placer_tick_duration_seconds', 'Duration of one auto-placer tick', ('status',))
+TICKS_SKIPPED = REGISTRY.counter(
+    'placer_ticks_skipped_total', 'Scheduled ticks skipped because the previous tick was still running')
+TICK_OVERRUNS = REGISTRY.counter(
+    'placer_tick_overruns_total', 'Ticks that took longer than the tick interval')
+PROMETHEUS_REQUEST_DURATION = REGISTRY.histogram(
+    'placer_prometheus_request_duration_seconds', 'Latency of Prometheus API requests, per attempt',
+    ('endpoint', 'status'))
+FLY_API_DURATION = REGISTRY.histogram(
+    'placer_fly_api_duration_seconds', 'Latency of flyctl runs and Machines API calls', ('backend', 'operation'))
+SCALE_ACTIONS = REGISTRY.counter(
+    'placer_scale_actions_total', 'Scale actions executed', ('app', 'region', 'action', 'outcome'))
+
+
 class MetricsClient:
+    """Records placement decisions into the per-region gauges and counters of a registry."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or REGISTRY
+        self.traffic = self.registry.gauge(
+            'placer_region_traffic', 'Traffic value the latest decision was based on', ('region',))
+        self.traffic_threshold = self.registry.gauge(
+            'placer_traffic_threshold', 'Current adaptive scale-up threshold', ('region',))
+        self.deployment_threshold = self.registry.gauge(
+            'placer_deployment_threshold', 'Current adaptive scale-down threshold', ('region',))
+        self.decisions = self.registry.counter(
+            'placer_decisions_total', 'Placement decisions by action, before state and cooldown checks',
+            ('region', 'action'))
+        # region -> (traffic, traffic threshold, deployment threshold) gauge children
+        self._regions = {}
+
+    def _region(self, region):
+        children = self._regions.get(region)
+        if children is None:
+            children = (self.traffic.labels(region), self.traffic_threshold.labels(region),
+                        self.deployment_threshold.labels(region))
+            self._regions[region] = children
+        return children
+
+    def record_decisions(self, regions, current, traffic_threshold, deployment_threshold, actions):
+        """Record one tick's decisions from parallel sequences (actions as names, '' for none)."""
+        decisions = self.decisions
+        for region, value, scale_up, scale_down, action in zip(
+                regions, current, traffic_threshold, deployment_threshold, actions):
+            traffic, up, down = self._region(region)
+            traffic.value = value
+            up.value = scale_up
+            down.value = scale_down
+            if action:
+                decisions.labels(region, action).inc()
+
     def record_threshold_metrics(self, metrics):
-        """Basic metrics implementation"""
-        # Start with just logging if you don't have metrics infrastructure yet
-        print(f"Recording metrics: {metrics}")  # Replace with actual metrics later
+        """Record a single decision given as a dict (region, current_traffic, thresholds, action)."""
+        action = metrics.get('action')
+        self.record_decisions(
+            [metrics['region']], [metrics['current_traffic']], [metrics['traffic_threshold']],
+            [metrics['deployment_threshold']], ['' if action in (None, 'no_action') else action],
+        )
+
+    def render(self):
+        return self.registry.render()
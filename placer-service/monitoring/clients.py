@@ -0,0 +1,136 @@
+"""
+Module: clients.py
+Description: Per-region distinct-client counts and heavy hitters over a sliding window, in fixed memory.
+
+Each (app, region) keeps a ring of `windows` sub-windows covering the
+ingest window. A sub-window holds one HyperLogLog and one Count-Min top-k
+sketch. The sliding-window view merges the live sub-windows. Incoming
+clients are first summed in a small dict. The dict is flushed into the
+sketches in one vectorized batch once it holds FLUSH_SIZE clients, or when
+the window is read. A client that sends many requests is hashed once per
+flush, not once per request.
+"""
+
+import time
+import numpy as np
+from utils.fancy_logger import get_logger
+from utils.sketches import (DEFAULT_DEPTH, DEFAULT_PRECISION, DEFAULT_TOP_K, DEFAULT_WIDTH, HeavyHitters,
+                            HyperLogLog, hash_array)
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_CLIENT_WINDOW = 300  # seconds, like ingest_window
+DEFAULT_SUB_WINDOWS = 5
+DEFAULT_MAX_REGIONS = 256
+FLUSH_SIZE = 4096
+
+
+class _SubWindow:
+    __slots__ = ('number', 'distinct', 'heavy', 'pending')
+
+    def __init__(self, precision, top_k, width, depth):
+        self.number = None
+        self.distinct = HyperLogLog(precision)
+        self.heavy = HeavyHitters(top_k, width, depth)
+        self.pending = {}
+
+    def reset(self, number):
+        self.number = number
+        self.distinct.clear()
+        self.heavy.clear()
+        self.pending = {}
+
+    def flush(self):
+        pending = self.pending
+        if not pending:
+            return
+        clients = list(pending)
+        hashes = hash_array(clients)
+        self.distinct.add_hashes(hashes)
+        self.heavy.add(clients, hashes, np.fromiter(pending.values(), dtype=float, count=len(clients)))
+        self.pending = {}
+
+
+class ClientWindows:
+    """
+    Distinct clients and the busiest clients per (app, region) over the last `window` seconds.
+
+    Clients are bucketed by arrival time. Memory is fixed per region, and at
+    most `max_regions` regions are tracked.
+    """
+
+    def __init__(self, window=DEFAULT_CLIENT_WINDOW, windows=DEFAULT_SUB_WINDOWS, precision=DEFAULT_PRECISION,
+                 top_k=DEFAULT_TOP_K, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH, max_regions=DEFAULT_MAX_REGIONS,
+                 clock=time.time):
+        self.window = float(window)
+        self.windows = int(windows)
+        self.span = self.window / self.windows
+        self.sketch_args = (int(precision), int(top_k), int(width), int(depth))
+        self.max_regions = int(max_regions)
+        self.clock = clock
+        self._rings = {}
+
+    @classmethod
+    def from_config(cls, config, clock=time.time):
+        return cls(
+            window=float(config.get('ingest_window', DEFAULT_CLIENT_WINDOW)),
+            precision=int(config.get('client_sketch_precision', DEFAULT_PRECISION)),
+            top_k=int(config.get('client_top_k', DEFAULT_TOP_K)),
+            max_regions=int(config.get('ingest_max_regions', DEFAULT_MAX_REGIONS)),
+            clock=clock,
+        )
+
+    def add(self, app, region, client, count=1, now=None):
+        """Count `count` requests from `client`; returns False if the region can't be tracked."""
+        number = int((self.clock() if now is None else now) // self.span)
+        key = (app, region)
+        ring = self._rings.get(key)
+        if ring is None:
+            if len(self._rings) >= self.max_regions:
+                return False
+            ring = self._rings[key] = [_SubWindow(*self.sketch_args) for _ in range(self.windows)]
+        current = ring[number % self.windows]
+        if current.number != number:
+            current.reset(number)
+        pending = current.pending
+        pending[client] = pending.get(client, 0) + count
+        if len(pending) >= FLUSH_SIZE:
+            current.flush()
+        return True
+
+    def _merged(self, ring, number):
+        distinct = heavy = None
+        for sub_window in ring:
+            if sub_window.number is None or not number - self.windows < sub_window.number <= number:
+                continue
+            sub_window.flush()
+            if distinct is None:
+                distinct, heavy = sub_window.distinct.copy(), sub_window.heavy.copy()
+            else:
+                distinct.merge(sub_window.distinct)
+                heavy.merge(sub_window.heavy)
+        return distinct, heavy
+
+    def summary(self, app, region, now=None):
+        """
+        {'clients': distinct estimate, 'requests': total, 'top': [(client, requests)]}
+        over the sliding window, or None if nothing was seen.
+        """
+        ring = self._rings.get((app, region))
+        if ring is None:
+            return None
+        distinct, heavy = self._merged(ring, int((self.clock() if now is None else now) // self.span))
+        if distinct is None:
+            return None
+        return {"clients": distinct.count(), "requests": heavy.sketch.total, "top": heavy.top()}
+
+    def summaries(self, now=None):
+        """{app: {region: summary}} for every region seen within the window."""
+        now = self.clock() if now is None else now
+        result = {}
+        for app, region in list(self._rings):
+            summary = self.summary(app, region, now)
+            if summary is not None:
+                result.setdefault(app, {})[region] = summary
+        return result
@@ -0,0 +1,301 @@
+"""
+Module: ingest.py
+Description: In-memory per-region traffic windows fed by pushed request counts and events.
+
+Edge log shippers POST request counts (or single request events) per
+region. Each (app, region) gets a ring of `window / bucket` counters. A
+counter is one tumbling window of `bucket` seconds. Their running total is
+the sliding window the predictor reads. The sliding window matches the
+5-minute Prometheus count, so the same thresholds apply. Updates only run
+on the event loop thread, so no locks are needed. Memory is bounded by
+`max_regions` rings of fixed size.
+"""
+
+import json
+import math
+import time
+from metrics.metrics_client import REGISTRY
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_INGEST_WINDOW = 300  # seconds; matches the [5m] of the Prometheus traffic query
+DEFAULT_INGEST_BUCKET = 1.0  # seconds per tumbling bucket
+DEFAULT_MAX_REGIONS = 256
+DEFAULT_WAKE_INTERVAL = 5  # minimum seconds between threshold wake-ups
+MAX_REGION_LENGTH = 16
+
+INGESTED_EVENTS = REGISTRY.counter('placer_ingested_events_total', 'Traffic events pushed to /ingest', ('outcome',))
+_ACCEPTED = INGESTED_EVENTS.labels('accepted')
+_DROPPED = INGESTED_EVENTS.labels('dropped')
+
+
+class IngestError(ValueError):
+    """Raised when an ingest payload doesn't have a readable shape."""
+
+
+class _Window:
+    """One region's ring of bucket counts and their running total."""
+
+    __slots__ = ('counts', 'total', 'head')
+
+    def __init__(self, size, bucket_no):
+        self.counts = [0] * size
+        self.total = 0
+        self.head = bucket_no  # newest bucket the ring holds
+
+    def advance(self, bucket_no):
+        """Move the ring forward to `bucket_no`, zeroing the buckets that fall out of it."""
+        counts = self.counts
+        size = len(counts)
+        if bucket_no - self.head >= size:
+            counts[:] = [0] * size
+            self.total = 0
+        else:
+            for expired in range(self.head + 1, bucket_no + 1):
+                index = expired % size
+                self.total -= counts[index]
+                counts[index] = 0
+        self.head = bucket_no
+
+
+class TrafficWindows:
+    """
+    Sliding-window request counts per (app, region), fed by pushed events.
+
+    `snapshot` reports each region's count over the last `window` seconds.
+    The counts are only complete once events have been arriving for a whole
+    window, and they stop being current once events stop: `ready` tells the
+    two apart, so callers can fall back to polled traffic meanwhile. Once
+    ready, a region's count rising through `threshold` calls
+    `on_threshold(app, region)`, so a placer tick can run straight away
+    instead of at its next slot. These calls are at least `wake_interval`
+    seconds apart, so a count hovering around the threshold can't start a
+    tick per event.
+
+    `apps` lists the apps events may name. None is single-app mode, where the
+    app field is ignored. Events that name their client ("client", or "ip"
+    as in request logs) are also counted in `clients`, a ClientWindows
+    tracking distinct and heavy-hitting clients per region. With
+    `client_config` instead, `clients` is None until the first such event
+    and is then built from that config, so deployments that never push
+    client events don't load NumPy or allocate sketches for them.
+    """
+
+    def __init__(self, window=DEFAULT_INGEST_WINDOW, bucket=DEFAULT_INGEST_BUCKET, max_regions=DEFAULT_MAX_REGIONS,
+                 apps=None, threshold=None, on_threshold=None, wake_interval=DEFAULT_WAKE_INTERVAL, clients=None,
+                 client_config=None, clock=time.time):
+        if bucket <= 0 or window < bucket:
+            raise ValueError(f"Need 0 < bucket <= window, got bucket {bucket} and window {window}")
+        self.window = float(window)
+        self.bucket = float(bucket)
+        self.size = int(round(self.window / self.bucket))
+        self.max_regions = int(max_regions)
+        self.apps = None if apps is None else set(apps)
+        self.threshold = threshold
+        self.on_threshold = on_threshold
+        self.wake_interval = float(wake_interval)
+        self.clients = clients
+        self.client_config = client_config
+        self.clock = clock
+        self.accepted = 0
+        self.dropped = 0
+        self.last_event_at = None
+        self._first_bucket = None  # bucket of the first event received, not of its timestamp
+        self._last_wake = -math.inf
+        self._windows = {}
+
+    @classmethod
+    def from_config(cls, config, on_threshold=None, clock=time.time):
+        return cls(
+            window=float(config.get('ingest_window', DEFAULT_INGEST_WINDOW)),
+            bucket=float(config.get('ingest_bucket', DEFAULT_INGEST_BUCKET)),
+            max_regions=int(config.get('ingest_max_regions', DEFAULT_MAX_REGIONS)),
+            apps=config.get('apps') or None,
+            threshold=config.get('traffic_threshold'),
+            on_threshold=on_threshold,
+            wake_interval=float(config.get('ingest_wake_interval', DEFAULT_WAKE_INTERVAL)),
+            client_config=config,
+            clock=clock,
+        )
+
+    def update_config(self, config):
+        """Pick up reloaded apps, threshold and wake interval; window and bucket sizes need a restart."""
+        self.apps = set(config['apps']) if config.get('apps') else None
+        self.threshold = config.get('traffic_threshold')
+        self.wake_interval = float(config.get('ingest_wake_interval', self.wake_interval))
+
+    def add(self, region, count=1, app=None, timestamp=None, now=None, client=None):
+        """Count `count` requests for a region (from `client`, if known); returns False if the event was dropped."""
+        now = self.clock() if now is None else now
+        now_bucket = int(now // self.bucket)
+        bucket_no = now_bucket if timestamp is None else min(int(timestamp // self.bucket), now_bucket)
+        if self.apps is None:
+            app = None
+        key = (app, region)
+        try:
+            window = self._windows.get(key)
+        except TypeError:  # a list or object where a name should be
+            return self._drop()
+        # Check the event before a new region takes one of the max_regions slots
+        if bucket_no <= now_bucket - self.size or not _valid_count(count):
+            return self._drop()
+        if window is None:
+            if not self._valid_key(app, region) or len(self._windows) >= self.max_regions:
+                return self._drop()
+            window = self._windows[key] = _Window(self.size, now_bucket)
+        elif now_bucket > window.head:
+            window.advance(now_bucket)
+        if self._first_bucket is None or now - self.last_event_at > self.window:
+            # First event, or the first after more than a window of silence: coverage starts over here
+            self._first_bucket = now_bucket
+
+        window.counts[bucket_no % self.size] += count
+        window.total += count
+        self.accepted += 1
+        _ACCEPTED.inc()
+        self.last_event_at = now
+        if client is not None and isinstance(client, str):
+            clients = self.clients if self.clients is not None else self._start_clients()
+            if clients is not None:
+                clients.add(app, region, client, count, now)
+        threshold = self.threshold
+        if (threshold is not None and self.on_threshold is not None and window.total - count < threshold <= window.total
+                and now - self._last_wake >= self.wake_interval and now_bucket - self._first_bucket >= self.size):
+            self._last_wake = now
+            self.on_threshold(app, region)
+        return True
+
+    def _start_clients(self):
+        """Build `clients` from `client_config` for the first event that names a client."""
+        if self.client_config is None:
+            return None
+        from monitoring.clients import ClientWindows  # deferred: uses NumPy
+        self.clients = ClientWindows.from_config(self.client_config, clock=self.clock)
+        return self.clients
+
+    def _valid_key(self, app, region):
+        if not isinstance(region, str) or not 0 < len(region) <= MAX_REGION_LENGTH:
+            return False
+        return self.apps is None or app in self.apps
+
+    def _drop(self):
+        self.dropped += 1
+        _DROPPED.inc()
+        return False
+
+    def ingest(self, payload):
+        """
+        Count one pushed payload and return {'accepted': n, 'dropped': n}.
+
+        A payload is one event {"region", "count"?, "app"?, "timestamp"?,
+        "client"?}, a list of events, {"events": [...]}, or per-region totals
+        {"counts": {region: n}, "app"?, "timestamp"?}. "timestamp" is epoch
+        seconds; events older than the window are dropped. Events that fail
+        validation are dropped and counted, and the rest of the batch still
+        counts. Raises IngestError if the payload has none of these shapes.
+        """
+        accepted, dropped = self.accepted, self.dropped
+        now = self.clock()
+        add = self.add
+        if isinstance(payload, dict) and 'counts' in payload:
+            counts = payload['counts']
+            if not isinstance(counts, dict):
+                raise IngestError("'counts' must map regions to request counts")
+            app, timestamp = payload.get('app'), _timestamp(payload.get('timestamp'))
+            for region, count in counts.items():
+                add(region, count, app, timestamp, now)
+        else:
+            if isinstance(payload, dict):
+                events = payload['events'] if 'events' in payload else [payload]
+            else:
+                events = payload
+            if not isinstance(events, list):
+                raise IngestError("Expected an event, a list of events, {'events': [...]} or {'counts': {...}}")
+            for event in events:
+                if not isinstance(event, dict):
+                    self._drop()
+                    continue
+                try:
+                    timestamp = _timestamp(event.get('timestamp'))
+                except IngestError:
+                    self._drop()
+                    continue
+                add(event.get('region'), event.get('count', 1), event.get('app'), timestamp, now,
+                    event.get('client', event.get('ip')))
+        return {"accepted": self.accepted - accepted, "dropped": self.dropped - dropped}
+
+    def snapshot(self, now=None):
+        """{app: {region: requests in the last window}}; see `ready` for whether the counts are complete."""
+        now_bucket = int((self.clock() if now is None else now) // self.bucket)
+        traffic = {}
+        for (app, region), window in self._windows.items():
+            if now_bucket > window.head:
+                window.advance(now_bucket)
+            traffic.setdefault(app, {})[region] = window.total
+        return traffic
+
+    def latest(self, now=None):
+        """{app: {region: requests per second}} over the last complete bucket (the tumbling window)."""
+        now_bucket = int((self.clock() if now is None else now) // self.bucket)
+        previous = now_bucket - 1
+        rates = {}
+        for (app, region), window in self._windows.items():
+            if now_bucket > window.head:
+                window.advance(now_bucket)
+            count = window.counts[previous % self.size] if previous > now_bucket - self.size else 0
+            rates.setdefault(app, {})[region] = count / self.bucket
+        return rates
+
+    def active(self, now=None):
+        """Whether any event arrived within the last window."""
+        now = self.clock() if now is None else now
+        return self.last_event_at is not None and now - self.last_event_at < self.window
+
+    def ready(self, now=None):
+        """Whether events have covered a whole window and are still arriving, so `snapshot` is complete."""
+        now = self.clock() if now is None else now
+        return self.active(now) and int(now // self.bucket) - self._first_bucket >= self.size
+
+    def status(self):
+        traffic, rates = self.snapshot(), self.latest()
+        if self.apps is None:
+            traffic, rates = traffic.get(None, {}), rates.get(None, {})
+        return {
+            "window": self.window,
+            "bucket": self.bucket,
+            "regions": len(self._windows),
+            "max_regions": self.max_regions,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "active": self.active(),
+            "ready": self.ready(),
+            "traffic": traffic,
+            "rates": rates,
+        }
+
+
+def parse_batch(body):
+    """Decode a batch body: one JSON document, or newline-delimited JSON events as log shippers send them."""
+    try:
+        return json.loads(body)
+    except ValueError:
+        pass
+    try:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    except ValueError as e:
+        raise IngestError(f"Body is neither JSON nor newline-delimited JSON: {e}") from e
+
+
+def _valid_count(count):
+    return (isinstance(count, (int, float)) and not isinstance(count, bool)
+            and count >= 0 and math.isfinite(count))
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise IngestError(f"timestamp must be epoch seconds, got {value!r}")
+    return value
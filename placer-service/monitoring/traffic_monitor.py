@@ -8,9 +8,6 @@ from utils.config_loader import Config
 from utils.metrics_fetcher import MetricsFetcher
 import logging
 
-# Load configuration
-config = Config.get_config()
-
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -19,12 +16,19 @@ TRAFFIC_LEVEL_WEIGHTS_DEPLOYED = [0.4, 0.4, 0.1, 0.1]
 TRAFFIC_LEVEL_WEIGHTS_NON_DEPLOYED = [0.1, 0.1, 0.3, 0.5]
 MAX_HISTORY_ENTRIES = 5
 
-# Create MetricsFetcher instance
-metrics_fetcher = MetricsFetcher()
+# Created on first use so importing this module doesn't read .env or validate credentials
+_metrics_fetcher = None
+
+def get_metrics_fetcher():
+    global _metrics_fetcher
+    if _metrics_fetcher is None:
+        _metrics_fetcher = MetricsFetcher()
+    return _metrics_fetcher
 
 def collect_region_traffic():
+    metrics_fetcher = get_metrics_fetcher()
     app_name = metrics_fetcher.get_app_name()
-    logger.info(f"Collecting {'mock' if config['dry_run'] else 'real'} traffic data for app: {app_name}")
+    logger.info(f"Collecting {'mock' if metrics_fetcher.dry_run else 'real'} traffic data for app: {app_name}")
     
     try:
         traffic_data = metrics_fetcher.fetch_region_traffic()
@@ -34,3 +38,17 @@ def collect_region_traffic():
     except Exception as e:
         logger.error(f"Error collecting region traffic data for app {app_name}: {str(e)}")
         raise
+
+async def collect_region_traffic_async(fetcher):
+    """Collect region traffic with a long-lived AsyncMetricsFetcher."""
+    app_name = fetcher.get_app_name()
+    logger.info(f"Collecting {'mock' if fetcher.dry_run else 'real'} traffic data for app: {app_name}")
+
+    try:
+        traffic_data = await fetcher.fetch_region_traffic()
+        logger.info(f"Successfully collected traffic data for {len(traffic_data)} regions of app: {app_name}")
+        logger.debug(f"Collected traffic data for app {app_name}: {traffic_data}")
+        return traffic_data
+    except Exception as e:
+        logger.error(f"Error collecting region traffic data for app {app_name}: {str(e)}")
+        raise
@@ -0,0 +1,136 @@
+"""
+Module: forecast.py
+Description: Per-region additive Holt-Winters forecasting with O(1) vectorized updates.
+
+Scaling decisions take effect only after a machine has booted, so acting on
+the trailing average means acting late. HoltWinters keeps a level, a trend
+and a daily seasonal profile for every region, updates all regions in one
+NumPy pass per tick, and forecasts traffic `deploy_latency` seconds past each
+region's latest sample so the placer can act on where traffic is going.
+"""
+
+import numpy as np
+from prediction.smoothing import _RowTable
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_FORECAST_ALPHA = 0.3  # level
+DEFAULT_FORECAST_BETA = 0.05  # trend
+DEFAULT_FORECAST_GAMMA = 0.1  # seasonality
+DEFAULT_SEASON_PERIOD = 86400  # seconds; one day
+DEFAULT_DEPLOY_LATENCY = 90  # seconds from a scale decision to a serving machine
+DEFAULT_TICK_INTERVAL = 60  # seconds per sample; one seasonal slot per tick
+
+
+class HoltWinters(_RowTable):
+    """
+    Additive Holt-Winters (level + trend + seasonality) for many regions at once.
+
+    Each region's season is a ring of `season_length` slots, one per tick
+    interval of the period; a sample lands in the slot of its timestamp's
+    time of day, so missed ticks don't shift the profile. A region starts at
+    its first sample with no trend and a flat season, and learns both as
+    samples arrive.
+    """
+
+    _ARRAYS = ('_level', '_trend', '_count', '_last', '_season')
+
+    def __init__(self, alpha=DEFAULT_FORECAST_ALPHA, beta=DEFAULT_FORECAST_BETA, gamma=DEFAULT_FORECAST_GAMMA,
+                 season_period=DEFAULT_SEASON_PERIOD, tick_interval=DEFAULT_TICK_INTERVAL,
+                 deploy_latency=DEFAULT_DEPLOY_LATENCY):
+        super().__init__()
+        self._set(alpha, beta, gamma, season_period, tick_interval, deploy_latency)
+        self._level = np.zeros(0)
+        self._trend = np.zeros(0)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._last = np.zeros(0)
+        self._season = np.zeros((0, self.season_length))
+
+    @classmethod
+    def from_config(cls, config):
+        forecaster = cls()
+        forecaster.configure(config)
+        return forecaster
+
+    def _set(self, alpha, beta, gamma, season_period, tick_interval, deploy_latency):
+        for name, value in (('forecast_alpha', alpha), ('forecast_beta', beta), ('forecast_gamma', gamma)):
+            if not 0 <= value <= 1:
+                raise ValueError(f"{name} must be in [0, 1], got {value}")
+        if tick_interval <= 0 or season_period < tick_interval:
+            raise ValueError(f"season_period ({season_period}) must be at least tick_interval ({tick_interval}) > 0")
+        if deploy_latency < 0:
+            raise ValueError(f"deploy_latency must be non-negative, got {deploy_latency}")
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.gamma = float(gamma)
+        self.season_period = float(season_period)
+        self.tick_interval = float(tick_interval)
+        self.deploy_latency = float(deploy_latency)
+        self.season_length = max(1, int(round(self.season_period / self.tick_interval)))
+
+    def configure(self, config):
+        """Apply forecast settings from config; a new season length restarts the seasonal profiles."""
+        season_length = self.season_length
+        self._set(
+            float(config.get('forecast_alpha', DEFAULT_FORECAST_ALPHA)),
+            float(config.get('forecast_beta', DEFAULT_FORECAST_BETA)),
+            float(config.get('forecast_gamma', DEFAULT_FORECAST_GAMMA)),
+            float(config.get('season_period', DEFAULT_SEASON_PERIOD)),
+            float(config.get('tick_interval', DEFAULT_TICK_INTERVAL)),
+            float(config.get('deploy_latency', DEFAULT_DEPLOY_LATENCY)),
+        )
+        if self.season_length != season_length:
+            if len(self):
+                logger.info(f"Season length changed from {season_length} to {self.season_length} slots; "
+                            f"seasonal profiles restart")
+            self._season = np.zeros((self._capacity, self.season_length))
+
+    def _slots(self, timestamps):
+        return (np.floor(np.asarray(timestamps, dtype=float) % self.season_period / self.tick_interval)
+                .astype(np.int64) % self.season_length)
+
+    def update(self, keys, values, timestamps):
+        """Fold one sample per key (unique within the call), taken at `timestamps` (scalar or per key)."""
+        rows = self._lookup(keys)
+        values = np.asarray(values, dtype=float)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=float), values.shape)
+        slots = self._slots(timestamps)
+        first = self._count[rows] == 0
+        level = self._level[rows]
+        trend = self._trend[rows]
+        season = self._season[rows, slots]
+
+        new_level = self.alpha * (values - season) + (1 - self.alpha) * (level + trend)
+        new_level = np.where(first, values, new_level)
+        new_trend = np.where(first, 0.0, self.beta * (new_level - level) + (1 - self.beta) * trend)
+        self._season[rows, slots] = self.gamma * (values - new_level) + (1 - self.gamma) * season
+        self._level[rows] = new_level
+        self._trend[rows] = new_trend
+        self._count[rows] += 1
+        self._last[rows] = timestamps
+
+    def forecast(self, keys, horizon=None):
+        """
+        Traffic expected `horizon` seconds (default: deploy_latency) after each
+        key's latest sample, floored at zero; NaN for unknown keys.
+        """
+        horizon = self.deploy_latency if horizon is None else float(horizon)
+        rows = self._lookup(keys, create=False)
+        known = rows >= 0
+        result = np.full(len(keys), np.nan)
+        rows = rows[known]
+        slots = self._slots(self._last[rows] + horizon)
+        steps = horizon / self.tick_interval
+        result[known] = np.maximum(
+            self._level[rows] + steps * self._trend[rows] + self._season[rows, slots], 0.0)
+        return result
+
+    def components(self, key):
+        """Return {'level', 'trend', 'season', 'samples'} for a region, or None if it has no samples."""
+        if key not in self:
+            return None
+        row = self._rows[key]
+        return {'level': float(self._level[row]), 'trend': float(self._trend[row]),
+                'season': self._season[row].copy(), 'samples': int(self._count[row])}
@@ -1,116 +1,296 @@
 import json
-from datetime import datetime, timedelta
+import time
 from collections import defaultdict
 import os
 import yaml
 import logging
-from utils.config_loader import Config
+from utils.config_loader import DEFAULT_LONG_TERM_WINDOW, DEFAULT_SHORT_TERM_WINDOW
 from utils.fancy_logger import get_logger
+from prediction.smoothing import SmoothingEngine, RollingStats
+from prediction.forecast import HoltWinters
 import numpy as np
-from datetime import timezone
-
-# Load configuration
-config = Config.get_config()
 
 # Set up logging
 logger = get_logger(__name__)
 
-# Global constants
-traffic_threshold = int(config['traffic_threshold'])
-deployment_threshold = int(config['deployment_threshold'])
-ALLOWED_REGIONS = config.get('allowed_regions', [])
-EXCLUDED_REGIONS = config.get('excluded_regions', [])
-ALWAYS_RUNNING_REGIONS = config.get('always_running_regions', [])
+# Long-term averages the single-region wrappers keep per region, as the scalar code did
+THRESHOLD_HISTORY_WINDOW = 10
+
+# Samples of stored history replayed to rebuild the smoothing state of a new predictor
+WARM_START_SAMPLES = 256
+
+# Action codes used in the structured decision arrays returned by predict_all
+ACTION_NONE = 0
+ACTION_SCALE_UP = 1
+ACTION_SCALE_DOWN = -1
+ACTION_NAMES = {ACTION_NONE: None, ACTION_SCALE_UP: 'scale_up', ACTION_SCALE_DOWN: 'scale_down'}
+
+
+def decision_dtype(region_width=8):
+    return np.dtype([
+        ('region', f'U{max(region_width, 1)}'),
+        ('current', 'f8'),
+        ('traffic_threshold', 'f8'),
+        ('deployment_threshold', 'f8'),
+        ('action', 'i1'),
+    ])
+
+
+def window_stats(window):
+    """
+    Row-wise mean and population std of a regions x time matrix whose rows are
+    left-padded with NaN. Rows are grouped by their number of samples so each
+    reduction runs over exactly the same values, in the same order, as np.mean
+    and np.std on that region's list would.
+    """
+    lengths = np.count_nonzero(~np.isnan(window), axis=1)
+    mean = np.full(len(window), np.nan)
+    std = np.zeros(len(window))
+    width = window.shape[1]
+    for length in np.unique(lengths):
+        if length == 0:
+            continue
+        rows = np.flatnonzero(lengths == length)
+        values = window[rows][:, width - length:]
+        mean[rows] = np.mean(values, axis=1)
+        if length > 1:
+            std[rows] = np.std(values, axis=1)
+    return mean, std
+
+
+def adaptive_thresholds(mean, std, traffic_threshold, deployment_threshold):
+    """
+    Vectorized volatility-adjusted thresholds with hysteresis.
+
+    The base thresholds may be scalars or arrays that broadcast against `mean`.
+    """
+    traffic_variability = np.divide(std, mean, out=np.zeros_like(mean), where=mean > 0)
+    volatility_factor = 1 + traffic_variability
+
+    # Calculate thresholds with volatility consideration
+    adaptive_traffic_threshold = np.maximum(traffic_threshold, mean * (1.1 * volatility_factor))
+    adaptive_deployment_threshold = np.minimum(deployment_threshold, mean * (0.9 / volatility_factor))
+
+    # Add hysteresis
+    hysteresis_gap = (adaptive_traffic_threshold - adaptive_deployment_threshold) * 0.1
+    adaptive_deployment_threshold = adaptive_deployment_threshold + hysteresis_gap
+
+    # Regions without samples fall back to the configured thresholds
+    missing = np.isnan(mean)
+    adaptive_traffic_threshold = np.where(missing, traffic_threshold, adaptive_traffic_threshold)
+    adaptive_deployment_threshold = np.where(missing, deployment_threshold, adaptive_deployment_threshold)
+    return adaptive_traffic_threshold, adaptive_deployment_threshold
 
-TRAFFIC_HISTORY_FILE = 'data/traffic_history.json'
 
 class PlacementPredictor:
     def __init__(self, config, metrics_client=None):  # Make metrics_client optional for now
         self.config = config
         self.metrics_client = metrics_client
-        self.threshold_history = {}  # Add this but won't use yet
+        self.threshold_window = int(config.get('long_term_window', DEFAULT_LONG_TERM_WINDOW))
+        self.warmup_samples = int(config.get('short_term_window', DEFAULT_SHORT_TERM_WINDOW))
+        self.smoother = SmoothingEngine.from_config(config)
+        # Sliding-window mean/std of each region's long-term average
+        self.threshold_stats = RollingStats(self.threshold_window)
+        # Exact per-region history for the single-region wrappers
+        self.threshold_history = {}
+        # Decisions use traffic forecast one deploy latency ahead when enabled
+        self.forecaster = HoltWinters.from_config(config) if config.get('forecast_enabled', False) else None
+        # Distinct clients per region over the last ingest window, from weight_by_clients
+        self.unique_clients = {}
+
+    def update_config(self, config):
+        """Apply a reloaded config; smoothing state is kept, volatility windows are resized."""
+        self.config = config
+        self.smoother.configure(config)
+        self.warmup_samples = int(config.get('short_term_window', DEFAULT_SHORT_TERM_WINDOW))
+        window = int(config.get('long_term_window', DEFAULT_LONG_TERM_WINDOW))
+        if window != self.threshold_window:
+            self.threshold_window = window
+            self.threshold_stats = self.threshold_stats.resized(window)
+        if not config.get('forecast_enabled', False):
+            self.forecaster = None
+        elif self.forecaster is None:
+            # Starts cold; decisions use the forecast once regions have samples again
+            self.forecaster = HoltWinters.from_config(config)
+        else:
+            self.forecaster.configure(config)
+
+    @property
+    def warm_start_samples(self):
+        """Samples of history to replay on warm start; two seasons when forecasting."""
+        if self.forecaster is None:
+            return WARM_START_SAMPLES
+        return max(WARM_START_SAMPLES, 2 * self.forecaster.season_length)
+
+    def _base_thresholds(self):
+        return self.config.get('traffic_threshold', 100), self.config.get('deployment_threshold', 50)
 
-    # Add new method but keep existing logic for now
     def calculate_adaptive_thresholds(self, region, averages, traffic_threshold, deployment_threshold):
         """Enhanced version with volatility consideration"""
         if not averages or 'long' not in averages:
             return traffic_threshold, deployment_threshold
 
-        # Get current traffic value
-        current_traffic = averages['long']
-        
-        # Store in history for future volatility calculation
-        region_history = self.threshold_history.setdefault(region, [])
-        region_history.append(current_traffic)
-        # Keep last 10 values for history
-        self.threshold_history[region] = region_history[-10:]
-        
-        # Calculate traffic variability
-        traffic_values = self.threshold_history[region]
-        mean_traffic = np.mean(traffic_values)
-        std_traffic = np.std(traffic_values) if len(traffic_values) > 1 else 0
-        
-        traffic_variability = std_traffic / mean_traffic if mean_traffic > 0 else 0
-        volatility_factor = 1 + traffic_variability
-
-        # Calculate thresholds with volatility consideration
-        adaptive_traffic_threshold = max(
-            traffic_threshold,
-            mean_traffic * (1.1 * volatility_factor)
-        )
-        
-        adaptive_deployment_threshold = min(
-            deployment_threshold,
-            mean_traffic * (0.9 / volatility_factor)
-        )
+        mean, std = self._push_history(region, averages['long'])
+        thresholds = adaptive_thresholds(mean, std, traffic_threshold, deployment_threshold)
+        return thresholds[0][0], thresholds[1][0]
 
-        # Add hysteresis
-        hysteresis_gap = (adaptive_traffic_threshold - adaptive_deployment_threshold) * 0.1
-        adaptive_deployment_threshold += hysteresis_gap
+    def _push_history(self, region, value):
+        """Append to a region's last THRESHOLD_HISTORY_WINDOW values; returns their (mean, std) as arrays."""
+        history = self.threshold_history.setdefault(region, [])
+        history.append(value)
+        del history[:-THRESHOLD_HISTORY_WINDOW]
+        return window_stats(np.array([history], dtype=float))
 
-        return adaptive_traffic_threshold, adaptive_deployment_threshold
+    def observe(self, snapshot, timestamp=None):
+        """Fold a {region: traffic} sample taken at `timestamp` (default: now) into the predictor state."""
+        regions = list(snapshot)
+        values = np.fromiter((snapshot[region] for region in regions), dtype=float, count=len(regions))
+        self.observe_values(regions, values, timestamp)
 
-    # Modify existing predict_placement_actions to use new method
-    def predict_placement_actions(self, region, averages):
-        if not averages or 'long' not in averages:
-            return None
+    def weight_by_clients(self, snapshot, summaries):
+        """
+        Discount a {region: traffic} sample by who sent it.
 
-        traffic_threshold = self.config.get('traffic_threshold', 100)
-        deployment_threshold = self.config.get('deployment_threshold', 50)
+        `summaries` maps regions to client summaries ({'clients', 'top'}, see
+        monitoring.clients). With `client_request_cap` set, each top client
+        counts for at most that many requests, so one noisy client can't pull
+        a machine into a region on its own. The distinct-client counts are kept
+        for the `min_unique_clients` gate in predict_smoothed.
+        """
+        self.unique_clients = {region: summary['clients'] for region, summary in summaries.items()}
+        cap = self.config.get('client_request_cap')
+        if cap is None:
+            return snapshot
+        weighted = dict(snapshot)
+        for region, summary in summaries.items():
+            if region in weighted:
+                excess = sum(max(0.0, requests - cap) for _, requests in summary['top'])
+                weighted[region] = max(0.0, weighted[region] - excess)
+        return weighted
 
-        adaptive_traffic_threshold, adaptive_deployment_threshold = self.calculate_adaptive_thresholds(
-            region,
-            averages, 
-            traffic_threshold, 
-            deployment_threshold
-        )
+    def observe_values(self, regions, values, timestamp=None):
+        """Array form of observe: one sample for each of `regions` (unique within the call)."""
+        long = self.smoother.update(regions, values)
+        self.threshold_stats.push(regions, long)
+        if self.forecaster is not None:
+            self.forecaster.update(regions, values, time.time() if timestamp is None else timestamp)
 
-        current_average = averages['long']
-        action = None
+    def warm_start(self, regions, traffic, timestamps=None):
+        """
+        Replay a regions x time matrix (left-padded with NaN) through observe, oldest first.
 
-        if current_average > adaptive_traffic_threshold:
-            action = 'scale_up'
-        elif current_average < adaptive_deployment_threshold:
-            action = 'scale_down'
+        `timestamps` is a matching matrix of sample times; without it the
+        columns are taken to be one tick_interval apart, ending now.
+        """
+        regions = np.asarray(regions, dtype=object)
+        traffic = np.asarray(traffic, dtype=float)
+        if timestamps is None and self.forecaster is not None:
+            offsets = (traffic.shape[1] - 1 - np.arange(traffic.shape[1])) * self.forecaster.tick_interval
+            timestamps = np.broadcast_to(time.time() - offsets, traffic.shape)
+        for index, column in enumerate(traffic.T):
+            present = ~np.isnan(column)
+            if present.any():
+                column_timestamps = None if timestamps is None else timestamps[present, index]
+                self.observe_values(list(regions[present]), column[present], column_timestamps)
 
-        # Add metrics tracking if metrics client exists
-        if self.metrics_client:
-            metrics = {
-                "region": region,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "current_traffic": current_average,
-                "traffic_threshold": adaptive_traffic_threshold,
-                "deployment_threshold": adaptive_deployment_threshold,
-                "action": action or 'no_action',
-                "threshold_gap": adaptive_traffic_threshold - adaptive_deployment_threshold,
-                "distance_to_nearest_threshold": min(
-                    abs(current_average - adaptive_traffic_threshold),
-                    abs(current_average - adaptive_deployment_threshold)
-                )
-            }
-            self.metrics_client.record_threshold_metrics(metrics)
+    def averages(self, region):
+        return self.smoother.averages(region)
 
-        return action
+    def predict_smoothed(self, regions):
+        """
+        Decide actions for `regions` from the streaming state built by observe.
 
+        The current value is each region's long-term EWMA, or with forecasting
+        enabled its Holt-Winters forecast one deploy latency ahead, and the
+        thresholds use the running mean/std of the long-term average. Without
+        forecasting, a crossing only counts while the short-term EWMA is past
+        the same threshold: the long-term average lags, so this skips spikes
+        that are already over and dips that have already recovered. Regions
+        that have seen fewer than `short_term_window` samples are left alone.
+        Regions with fewer than `min_unique_clients` known distinct clients
+        aren't scaled up.
+        """
+        short, current, samples = self.smoother.snapshot(regions)
+        if self.forecaster is not None:
+            # The forecast already looks ahead; recent traffic can't confirm where it is going
+            current, short = self.forecaster.forecast(regions), None
+        mean, std, _ = self.threshold_stats.stats(regions)
+        can_scale_up = None
+        min_clients = self.config.get('min_unique_clients', 0)
+        if min_clients and self.unique_clients:
+            # Regions without a client count (no pushed client events) aren't gated
+            clients = np.fromiter((self.unique_clients.get(region, np.nan) for region in regions),
+                                  dtype=float, count=len(regions))
+            can_scale_up = ~(clients < min_clients)
+        return self._decide(regions, current, mean, std, eligible=samples >= self.warmup_samples,
+                            can_scale_up=can_scale_up, short=short)
 
+    def predict_all(self, regions, traffic, traffic_threshold=None, deployment_threshold=None):
+        """
+        Decide actions for every region in one vectorized pass.
+
+        `traffic` is a len(regions) x time matrix of long-term traffic averages,
+        oldest first, with rows left-padded with NaN; the last column is the
+        current value. Only the trailing `threshold_window` columns are used.
+        Returns a structured array (see `decision_dtype`) aligned with `regions`.
+        """
+        traffic = np.asarray(traffic, dtype=float)
+        if traffic.ndim != 2:
+            traffic = traffic.reshape(len(regions), -1)
+        window = traffic[:, -self.threshold_window:]
+        current = window[:, -1] if window.shape[1] else np.full(len(regions), np.nan)
+
+        mean, std = window_stats(window)
+        return self._decide(regions, current, mean, std, traffic_threshold, deployment_threshold)
+
+    def _decide(self, regions, current, mean, std, traffic_threshold=None, deployment_threshold=None, eligible=None,
+                can_scale_up=None, short=None):
+        base_traffic_threshold, base_deployment_threshold = self._base_thresholds()
+        if traffic_threshold is None:
+            traffic_threshold = base_traffic_threshold
+        if deployment_threshold is None:
+            deployment_threshold = base_deployment_threshold
+
+        adaptive_traffic_threshold, adaptive_deployment_threshold = adaptive_thresholds(
+            mean, std, traffic_threshold, deployment_threshold
+        )
+
+        decisions = np.zeros(len(regions), dtype=decision_dtype(max(map(len, regions), default=1)))
+        decisions['region'] = regions
+        decisions['current'] = current
+        decisions['traffic_threshold'] = adaptive_traffic_threshold
+        decisions['deployment_threshold'] = adaptive_deployment_threshold
+        # Scale-up wins where both thresholds are crossed, as in the scalar if/elif
+        decisions['action'] = np.where(
+            current > adaptive_traffic_threshold, ACTION_SCALE_UP,
+            np.where(current < adaptive_deployment_threshold, ACTION_SCALE_DOWN, ACTION_NONE))
+        if short is not None:
+            action = decisions['action']
+            action[(action == ACTION_SCALE_UP) & ~(short > adaptive_traffic_threshold)] = ACTION_NONE
+            action[(action == ACTION_SCALE_DOWN) & ~(short < adaptive_deployment_threshold)] = ACTION_NONE
+        if eligible is not None:
+            decisions['action'][~eligible] = ACTION_NONE
+        if can_scale_up is not None:
+            decisions['action'][~can_scale_up & (decisions['action'] == ACTION_SCALE_UP)] = ACTION_NONE
+
+        if self.metrics_client:
+            self._record_metrics(decisions)
+        return decisions
+
+    def _record_metrics(self, decisions):
+        self.metrics_client.record_decisions(
+            decisions['region'].tolist(),
+            decisions['current'].tolist(),
+            decisions['traffic_threshold'].tolist(),
+            decisions['deployment_threshold'].tolist(),
+            [ACTION_NAMES[action] for action in decisions['action'].tolist()],
+        )
+
+    def predict_placement_actions(self, region, averages):
+        """Single-region wrapper; decides exactly as the scalar code did over the last 10 averages."""
+        if not averages or 'long' not in averages:
+            return None
 
+        mean, std = self._push_history(region, averages['long'])
+        decision = self._decide([region], np.array([averages['long']], dtype=float), mean, std)[0]
+        return ACTION_NAMES[int(decision['action'])]
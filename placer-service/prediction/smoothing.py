@@ -0,0 +1,236 @@
+"""
+Module: smoothing.py
+Description: Streaming per-region traffic smoothing with O(1) updates.
+
+SmoothingEngine keeps short- and long-term exponentially weighted moving averages
+for every region, and RollingStats keeps a sliding-window Welford mean/variance
+used for the adaptive thresholds. Both store their state in NumPy arrays indexed
+by region, so a tick costs the same regardless of how long the windows are.
+"""
+
+import numpy as np
+from utils.config_loader import DEFAULT_ALPHA_LONG, DEFAULT_ALPHA_SHORT
+
+# Sliding Welford updates accumulate rounding error; rows are recomputed exactly
+# from their buffer once every RESYNC_INTERVAL windows worth of samples.
+RESYNC_INTERVAL = 64
+
+# Distinct key lists whose row lookups are memoized per table
+LOOKUP_CACHE_SIZE = 8
+
+
+class _RowTable:
+    """
+    Maps region keys to rows of the owner's state arrays, growing them on demand.
+
+    Subclasses list the attributes holding per-row state in `_ARRAYS`; each
+    is an array whose first axis is the row.
+    """
+
+    _ARRAYS = ()
+
+    def __init__(self):
+        self._rows = {}
+        self._capacity = 0
+        # The placer looks up the same few key lists every tick
+        self._lookup_cache = {}
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def keys(self):
+        return list(self._rows)
+
+    def _lookup(self, keys, create=True):
+        cache_key = tuple(keys)
+        cached = self._lookup_cache.get(cache_key)
+        # Answers with unknown keys (-1) can't be reused by a creating lookup
+        if cached is not None and (cached[1] or not create):
+            return cached[0]
+        known = len(self._rows)
+        rows = np.empty(len(keys), dtype=np.intp)
+        for i, key in enumerate(keys):
+            row = self._rows.get(key)
+            if row is None:
+                if not create:
+                    row = -1
+                else:
+                    row = len(self._rows)
+                    self._rows[key] = row
+            rows[i] = row
+        if len(self._rows) > self._capacity:
+            capacity = max(8, self._capacity * 2, len(self._rows))
+            self._grow(capacity)
+            self._capacity = capacity
+        # Rows never move once assigned; only new keys can change a cached answer
+        if len(self._rows) != known or len(self._lookup_cache) >= LOOKUP_CACHE_SIZE:
+            self._lookup_cache.clear()
+        self._lookup_cache[cache_key] = (rows, bool(len(rows) == 0 or rows.min() >= 0))
+        return rows
+
+    def _grow(self, capacity):
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+
+class RollingStats(_RowTable):
+    """Sliding-window mean and population standard deviation per region (Welford)."""
+
+    _ARRAYS = ('_buffer', '_count', '_mean', '_m2')
+
+    def __init__(self, window):
+        super().__init__()
+        if window < 1:
+            raise ValueError(f"Window must be at least 1, got {window}")
+        self.window = int(window)
+        self._buffer = np.zeros((0, self.window))
+        self._count = np.zeros(0, dtype=np.int64)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+
+    def push(self, keys, values):
+        """Add one sample for each of `keys` (which must be unique within the call)."""
+        rows = self._lookup(keys)
+        values = np.asarray(values, dtype=float)
+        count = self._count[rows]
+        slot = count % self.window
+        size = np.minimum(count, self.window)
+        full = size == self.window
+        old = self._buffer[rows, slot]
+        mean = self._mean[rows]
+        m2 = self._m2[rows]
+
+        # Growing window: classic Welford insert
+        new_size = np.where(full, size, size + 1)
+        delta = values - mean
+        grown_mean = mean + delta / new_size
+        grown_m2 = m2 + delta * (values - grown_mean)
+
+        # Full window: replace the oldest sample in place
+        replaced_mean = mean + (values - old) / self.window
+        replaced_m2 = m2 + (values - old) * (values - replaced_mean + old - mean)
+
+        self._mean[rows] = np.where(full, replaced_mean, grown_mean)
+        self._m2[rows] = np.where(full, replaced_m2, grown_m2)
+        self._buffer[rows, slot] = values
+        self._count[rows] = count + 1
+
+        resync = rows[(count + 1) % (self.window * RESYNC_INTERVAL) == 0]
+        if len(resync):
+            self._mean[resync] = self._buffer[resync].mean(axis=1)
+            self._m2[resync] = ((self._buffer[resync] - self._mean[resync, None]) ** 2).sum(axis=1)
+        return rows
+
+    def window_values(self, key):
+        """Return the samples currently in `key`'s window, oldest first."""
+        rows = self._lookup([key], create=False)
+        if rows[0] < 0:
+            return np.empty(0)
+        row = rows[0]
+        count = int(self._count[row])
+        size = min(count, self.window)
+        slots = (count - size + np.arange(size)) % self.window
+        return self._buffer[row, slots]
+
+    def resized(self, window):
+        """Return a RollingStats with a new window, seeded with each key's most recent samples."""
+        stats = RollingStats(window)
+        for key in self.keys():
+            for value in self.window_values(key)[-window:]:
+                stats.push([key], [value])
+        return stats
+
+    def stats(self, keys):
+        """Return (mean, std, samples) arrays; unknown keys get NaN mean and zero std."""
+        rows = self._lookup(keys, create=False)
+        known = rows >= 0
+        mean = np.full(len(keys), np.nan)
+        std = np.zeros(len(keys))
+        size = np.zeros(len(keys), dtype=np.int64)
+        size[known] = np.minimum(self._count[rows[known]], self.window)
+        mean[known] = self._mean[rows[known]]
+        populated = size > 1
+        std[populated] = np.sqrt(np.maximum(self._m2[rows[populated]], 0) / size[populated])
+        return mean, std, size
+
+
+class SmoothingEngine(_RowTable):
+    """
+    Per-region short- and long-term EWMAs.
+
+    Placement decisions are made on the long-term average; the short-term one
+    follows recent traffic closely enough to confirm that a crossing is still
+    happening, so it never moves slower than the long-term one (an alpha_short
+    below alpha_long is raised to it). Until a region has seen 1/alpha samples the step size is 1/n, so
+    the averages start out as the plain running mean instead of being biased
+    towards the first sample. The sample count is kept so callers can hold off
+    on regions that have only just appeared.
+    """
+
+    _ARRAYS = ('_short', '_long', '_count')
+
+    def __init__(self, alpha_short=DEFAULT_ALPHA_SHORT, alpha_long=DEFAULT_ALPHA_LONG):
+        super().__init__()
+        self.alpha_short = _checked_alpha('alpha_short', alpha_short)
+        self.alpha_long = _checked_alpha('alpha_long', alpha_long)
+        self._short = np.zeros(0)
+        self._long = np.zeros(0)
+        self._count = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_config(cls, config):
+        engine = cls()
+        engine.configure(config)
+        return engine
+
+    def configure(self, config):
+        """Apply smoothing settings from config; existing averages are kept."""
+        # Check both before applying either, so a bad reload leaves the engine as it was
+        alpha_short = _checked_alpha('alpha_short', float(config.get('alpha_short', DEFAULT_ALPHA_SHORT)))
+        alpha_long = _checked_alpha('alpha_long', float(config.get('alpha_long', DEFAULT_ALPHA_LONG)))
+        self.alpha_short, self.alpha_long = alpha_short, alpha_long
+
+    def update(self, keys, values):
+        """Fold one sample per key into the averages and return the new long-term values."""
+        rows = self._lookup(keys)
+        values = np.asarray(values, dtype=float)
+        count = self._count[rows] + 1
+        self._count[rows] = count
+        short = self._short[rows]
+        long = self._long[rows]
+        short += np.maximum(max(self.alpha_short, self.alpha_long), 1.0 / count) * (values - short)
+        long += np.maximum(self.alpha_long, 1.0 / count) * (values - long)
+        self._short[rows] = short
+        self._long[rows] = long
+        return long
+
+    def averages(self, key):
+        """Return {'short', 'long', 'samples'} for a region, or None if it has no samples."""
+        if key not in self:
+            return None
+        row = self._rows[key]
+        return {'short': float(self._short[row]), 'long': float(self._long[row]), 'samples': int(self._count[row])}
+
+    def snapshot(self, keys):
+        """Return (short, long, samples) arrays aligned with `keys`; unknown keys get NaN."""
+        rows = self._lookup(keys, create=False)
+        known = rows >= 0
+        short = np.full(len(keys), np.nan)
+        long = np.full(len(keys), np.nan)
+        samples = np.zeros(len(keys), dtype=np.int64)
+        short[known] = self._short[rows[known]]
+        long[known] = self._long[rows[known]]
+        samples[known] = self._count[rows[known]]
+        return short, long, samples
+
+
+def _checked_alpha(name, alpha):
+    if not 0 < alpha <= 1:
+        raise ValueError(f"{name} must be in (0, 1], got {alpha}")
+    return float(alpha)
@@ -0,0 +1,133 @@
+"""
+Module: startup_benchmark.py
+Description: Measures placer cold start (process spawn until /health answers) and fails over budget.
+
+Usage (from placer-service/):
+    python scripts/startup_benchmark.py                  # python main.py
+    python scripts/startup_benchmark.py --binary dist/main  # also the PyInstaller build
+    python scripts/startup_benchmark.py --runs 10 --json startup.json
+
+Each target is started `--runs` times on a free port; the median time to the
+first successful GET /health is compared against its budget. The import time of
+main.py is reported as well, since it is the part the code controls directly.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_RUNS = 5
+DEFAULT_PYTHON_BUDGET = 2.0  # seconds until /health answers
+DEFAULT_BINARY_BUDGET = 3.0  # PyInstaller onefile builds unpack before starting
+DEFAULT_IMPORT_BUDGET = 0.8  # seconds to import main.py
+STARTUP_TIMEOUT = 30
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(process, port, timeout):
+    url = f'http://127.0.0.1:{port}/health'
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with code {process.returncode} before becoming healthy")
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"/health did not answer within {timeout}s")
+
+
+def time_to_healthy(command, timeout=STARTUP_TIMEOUT):
+    """Start `command` in the service directory and return seconds until /health answers."""
+    port = _free_port()
+    env = {**os.environ, 'PORT': str(port)}
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_healthy(process, port, timeout)
+        return time.perf_counter() - start
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def time_import(module='main'):
+    """Seconds for a fresh interpreter to import `module`, minus bare interpreter startup."""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=SERVICE_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    return max(0.0, run(f'import {module}') - run('pass'))
+
+
+def measure(name, fn, runs, budget):
+    samples = [fn() for _ in range(runs)]
+    median = statistics.median(samples)
+    result = {
+        "name": name,
+        "runs": runs,
+        "median": median,
+        "min": min(samples),
+        "max": max(samples),
+        "budget": budget,
+        "ok": median <= budget,
+    }
+    status = "ok" if result["ok"] else "OVER BUDGET"
+    print(f"{name:<16} median {median:.3f}s  min {result['min']:.3f}s  max {result['max']:.3f}s  "
+          f"budget {budget:.2f}s  {status}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--budget', type=float, default=DEFAULT_PYTHON_BUDGET,
+                        help='seconds allowed for `python main.py` to answer /health')
+    parser.add_argument('--import-budget', type=float, default=DEFAULT_IMPORT_BUDGET)
+    parser.add_argument('--binary', help='path to the PyInstaller build, e.g. dist/main')
+    parser.add_argument('--binary-budget', type=float, default=DEFAULT_BINARY_BUDGET)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = [
+        measure('import main', time_import, args.runs, args.import_budget),
+        measure('python main.py', lambda: time_to_healthy([sys.executable, 'main.py']),
+                args.runs, args.budget),
+    ]
+    if args.binary:
+        binary = os.path.abspath(args.binary)
+        if not os.path.exists(binary):
+            parser.error(f"{binary} not found; build it with `pyinstaller --onefile main.py`")
+        results.append(measure('pyinstaller', lambda: time_to_healthy([binary]), args.runs, args.binary_budget))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch
-from automation.auto_placer import update_placements, DRY_RUN
+from automation.auto_placer import update_placements, settings
 from datetime import datetime
 
 class TestAutoPlacer(unittest.TestCase):
@@ -21,7 +21,7 @@ class TestAutoPlacer(unittest.TestCase):
         update_placements(regions_to_deploy, regions_to_remove)
 
         # Since DRY_RUN is True, subprocess.run should not be called
-        if DRY_RUN:
+        if settings.dry_run:
             mock_subprocess_run.assert_not_called()
         else:
             mock_subprocess_run.assert_called()
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from automation.backfill import backfill_history, backfill_settings
+from prediction.placement_predictor import PlacementPredictor
+from utils.history_store import HistoryStore
+from utils.metrics_fetcher import AsyncMetricsFetcher
+
+class FakePrometheus(ThreadingHTTPServer):
+    """Serves query_range from per-region functions of the timestamp."""
+
+    def __init__(self, series):
+        super().__init__(('127.0.0.1', 0), PrometheusHandler)
+        self.series = series
+        self.queries = []
+
+class PrometheusHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.queries.append((url.path, params))
+        if url.path != '/prometheus/api/v1/query_range':
+            self.send_response(404)
+            self.end_headers()
+            return
+        start, end = float(params['start']), float(params['end'])
+        step = float(params['step'].rstrip('s'))
+        timestamps = np.arange(start, end + step / 2, step)
+        result = [
+            {'metric': {'region': region}, 'values': [[ts, str(fn(ts))] for ts in timestamps]}
+            for region, fn in self.server.series.items()
+        ]
+        body = json.dumps({'status': 'success', 'data': {'resultType': 'matrix', 'result': result}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class TestBackfill(unittest.IsolatedAsyncioTestCase):
+    NOW = 1_700_000_000.0
+
+    def setUp(self):
+        self.server = FakePrometheus({
+            # Busy region whose traffic jumped over the last few minutes
+            'iad': lambda ts: 20.0 if ts < self.NOW - 180 else 200.0,
+            'cdg': lambda ts: 5.0,
+            'lhr': lambda ts: float('nan') if ts < self.NOW - 300 else 30.0,
+        })
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        env = {
+            'FLY_PROMETHEUS_URL': f'http://127.0.0.1:{self.server.server_address[1]}/prometheus',
+            'FLY_API_TOKEN': 'token',
+            'FLY_APP_NAME': 'demo',
+        }
+        patcher = patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fetcher = AsyncMetricsFetcher(dry_run=False, backoff=0)
+        self.addAsyncCleanup(self.fetcher.aclose)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.store = HistoryStore(self.tmp_dir, window=100)
+        self.addCleanup(self.store.close)
+
+    async def test_single_range_query_fills_store(self):
+        loaded = await backfill_history(self.fetcher, self.store, samples=30, step=60, now=self.NOW)
+
+        self.assertEqual(len(self.server.queries), 1)
+        path, params = self.server.queries[0]
+        self.assertEqual(params['step'], '60s')
+        self.assertIn('app="demo"', params['query'])
+
+        timestamps, values = self.store.window('iad')
+        self.assertEqual(len(values), 30)
+        self.assertEqual(timestamps[-1], self.NOW)
+        self.assertTrue(np.all(np.diff(timestamps) == 60))
+        # NaN gaps reported by Prometheus are dropped
+        self.assertEqual(len(self.store.window('lhr')[1]), 6)
+        self.assertEqual(loaded, 30 + 30 + 6)
+
+    async def test_only_missing_gap_is_fetched(self):
+        await backfill_history(self.fetcher, self.store, samples=30, step=60, now=self.NOW - 600)
+        loaded = await backfill_history(self.fetcher, self.store, samples=30, step=60, now=self.NOW)
+
+        _, params = self.server.queries[-1]
+        self.assertEqual(float(params['start']), self.NOW - 540)
+        self.assertEqual(loaded, 10 * 2 + 6)
+        self.assertEqual(len(self.store.window('iad')[1]), 40)
+
+        self.assertEqual(await backfill_history(self.fetcher, self.store, 30, 60, now=self.NOW), 0)
+        self.assertEqual(len(self.server.queries), 2)
+
+    async def test_backfilled_predictor_is_ready_for_first_decision(self):
+        config = {'traffic_threshold': 50, 'deployment_threshold': 10,
+                  'short_term_window': 5, 'long_term_window': 20, 'alpha_long': 0.1}
+        samples, step = backfill_settings(config)
+        self.assertEqual((samples, step), (30, 60.0))
+        await backfill_history(self.fetcher, self.store, samples, step, now=self.NOW)
+
+        predictor = PlacementPredictor(config)
+        regions = ['iad', 'cdg']
+        predictor.warm_start(regions, self.store.matrix(regions, samples))
+        decisions = predictor.predict_smoothed(regions)
+        self.assertEqual(decisions['action'].tolist(), [1, -1])
+
+    async def test_dry_run_has_nothing_to_backfill(self):
+        fetcher = AsyncMetricsFetcher(dry_run=True)
+        self.assertEqual(await backfill_history(fetcher, self.store, 30, 60, now=self.NOW), 0)
+        self.assertEqual(self.server.queries, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import yaml
+from utils.config_loader import Config, ConfigError, validate_config
+from utils.config_watcher import ConfigWatcher
+
+BASE_CONFIG = {
+    'dry_run': True,
+    'cooldown_period': 300,
+    'traffic_threshold': 50,
+    'deployment_threshold': 10,
+    'allowed_regions': ['ams', 'iad'],
+    'excluded_regions': [],
+    'always_running_regions': ['iad'],
+}
+
+
+def write_config(path, **overrides):
+    with open(path, 'w') as file:
+        yaml.safe_dump({**BASE_CONFIG, **overrides}, file)
+
+
+class TestValidateConfig(unittest.TestCase):
+    def test_accepts_valid_config(self):
+        self.assertEqual(validate_config(dict(BASE_CONFIG)), BASE_CONFIG)
+
+    def test_reports_every_problem(self):
+        config = {**BASE_CONFIG, 'dry_run': 'yes', 'cooldown_period': -1, 'alpha_short': 1.5}
+        with self.assertRaises(ConfigError) as ctx:
+            validate_config(config)
+        message = str(ctx.exception)
+        self.assertIn('dry_run', message)
+        self.assertIn('cooldown_period', message)
+        self.assertIn('alpha_short', message)
+
+    def test_rejects_deployment_threshold_above_traffic_threshold(self):
+        with self.assertRaises(ConfigError):
+            validate_config({**BASE_CONFIG, 'deployment_threshold': 80})
+
+    def test_rejects_non_list_regions(self):
+        with self.assertRaises(ConfigError):
+            validate_config({**BASE_CONFIG, 'allowed_regions': 'ams'})
+
+
+class TestConfigReload(unittest.TestCase):
+    def setUp(self):
+        self.saved = (Config._config, Config._version, Config._listeners, Config.config_path)
+        self.tmp_dir = tempfile.mkdtemp()
+        Config.config_path = os.path.join(self.tmp_dir, 'config.yml')
+        Config._config = None
+        Config._listeners = []
+        write_config(Config.config_path)
+
+    def tearDown(self):
+        Config._config, Config._version, Config._listeners, Config.config_path = self.saved
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reload_swaps_snapshot_and_notifies_listeners(self):
+        old = Config.get_config()
+        version = Config.version()
+        received = []
+        Config.subscribe(received.append)
+
+        write_config(Config.config_path, cooldown_period=60)
+        self.assertTrue(Config.reload())
+
+        new = Config.get_config()
+        self.assertIsNot(new, old)
+        self.assertEqual(old['cooldown_period'], 300)
+        self.assertEqual(new['cooldown_period'], 60)
+        self.assertEqual(Config.version(), version + 1)
+        self.assertEqual(received, [new])
+
+    def test_unchanged_file_is_not_swapped(self):
+        Config.get_config()
+        version = Config.version()
+        self.assertFalse(Config.reload())
+        self.assertEqual(Config.version(), version)
+
+    def test_invalid_file_keeps_current_config(self):
+        old = Config.get_config()
+        received = []
+        Config.subscribe(received.append)
+
+        with open(Config.config_path, 'w') as file:
+            file.write("dry_run: [unterminated\n")
+        self.assertFalse(Config.reload())
+        write_config(Config.config_path, traffic_threshold=-5)
+        self.assertFalse(Config.reload())
+
+        self.assertIs(Config.get_config(), old)
+        self.assertEqual(received, [])
+
+    def test_unsubscribed_listener_is_not_called(self):
+        Config.get_config()
+        received = []
+        Config.subscribe(received.append)
+        Config.unsubscribe(received.append)
+        write_config(Config.config_path, cooldown_period=60)
+        Config.reload()
+        self.assertEqual(received, [])
+
+
+class TestConfigWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'config.yml')
+        write_config(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assert_detects_change(self, use_inotify):
+        changed = threading.Event()
+        watcher = ConfigWatcher(self.path, changed.set, poll_interval=0.05, use_inotify=use_inotify).start()
+        try:
+            if use_inotify:
+                self.assertIn(watcher.mode, ('inotify', 'polling'))
+            else:
+                self.assertEqual(watcher.mode, 'polling')
+            time.sleep(0.1)
+            # Replace the file the way editors and deploy tools do
+            replacement = os.path.join(self.tmp_dir, 'config.yml.tmp')
+            write_config(replacement, cooldown_period=60)
+            os.replace(replacement, self.path)
+            self.assertTrue(changed.wait(2))
+        finally:
+            watcher.stop()
+
+    def test_detects_replaced_file(self):
+        self.assert_detects_change(use_inotify=True)
+
+    def test_polling_fallback_detects_replaced_file(self):
+        self.assert_detects_change(use_inotify=False)
+
+    def test_ignores_unrelated_files(self):
+        changed = threading.Event()
+        watcher = ConfigWatcher(self.path, changed.set, use_inotify=True).start()
+        try:
+            if watcher.mode != 'inotify':
+                self.skipTest("inotify not available")
+            with open(os.path.join(self.tmp_dir, 'other.txt'), 'w') as file:
+                file.write('x')
+            self.assertFalse(changed.wait(0.3))
+        finally:
+            watcher.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
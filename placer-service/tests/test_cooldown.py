@@ -1,9 +1,22 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
 from unittest.mock import patch
 from datetime import datetime, timedelta, timezone
-from automation.auto_placer import update_placements
+from automation.auto_placer import AutoPlacer, PlacerSettings, update_placements
+from automation.cooldown import CooldownScheduler
+from utils.state_manager import close_state_stores
+from utils.state_store import StateStore
 
 class TestCooldownPeriod(unittest.TestCase):
+    def setUp(self):
+        # The shipped config is dry-run, where update_placements never calls flyctl
+        patcher = patch.object(PlacerSettings, 'dry_run', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     @patch('automation.auto_placer.load_deployment_state')
     @patch('automation.auto_placer.save_deployment_state')
     @patch('automation.auto_placer.subprocess.run')
@@ -11,7 +24,7 @@ class TestCooldownPeriod(unittest.TestCase):
         now = datetime.now(timezone.utc)
         region = 'ams'
         # Mock the configuration
-        with patch('automation.auto_placer.COOLDOWN_PERIOD', 300):
+        with patch.object(PlacerSettings, 'cooldown_period', 300):
             # Mock deployment state with recent action
             mock_load_state.return_value = {region: (now - timedelta(seconds=100)).isoformat()}
             regions_to_deploy = [region]
@@ -29,7 +42,7 @@ class TestCooldownPeriod(unittest.TestCase):
     def test_deploy_after_cooldown(self, mock_subprocess_run, mock_save_state, mock_load_state):
         now = datetime.now(timezone.utc)
         region = 'ams'
-        with patch('automation.auto_placer.COOLDOWN_PERIOD', 300):
+        with patch.object(PlacerSettings, 'cooldown_period', 300):
             # Mock deployment state with action outside cooldown
             mock_load_state.return_value = {region: (now - timedelta(seconds=400)).isoformat()}
             regions_to_deploy = [region]
@@ -47,7 +60,7 @@ class TestCooldownPeriod(unittest.TestCase):
     def test_remove_within_cooldown(self, mock_subprocess_run, mock_save_state, mock_load_state):
         now = datetime.now(timezone.utc)
         region = 'iad'
-        with patch('automation.auto_placer.COOLDOWN_PERIOD', 300):
+        with patch.object(PlacerSettings, 'cooldown_period', 300):
             # Mock deployment state with recent action
             mock_load_state.return_value = {region: (now - timedelta(seconds=100)).isoformat()}
             regions_to_deploy = []
@@ -65,8 +78,8 @@ class TestCooldownPeriod(unittest.TestCase):
     def test_remove_after_cooldown(self, mock_subprocess_run, mock_save_state, mock_load_state):
         now = datetime.now(timezone.utc)
         region = 'iad'
-        with patch('automation.auto_placer.COOLDOWN_PERIOD', 300):
-            with patch('automation.auto_placer.ALWAYS_RUNNING_REGIONS', []):
+        with patch.object(PlacerSettings, 'cooldown_period', 300):
+            with patch.object(PlacerSettings, 'always_running_regions', []):
                 # Mock deployment state with action outside cooldown
                 mock_load_state.return_value = {region: (now - timedelta(seconds=400)).isoformat()}
                 regions_to_deploy = []
@@ -78,5 +91,97 @@ class TestCooldownPeriod(unittest.TestCase):
                 mock_subprocess_run.assert_called_once()
                 mock_save_state.assert_called_once()
 
+
+class TestCooldownScheduler(unittest.TestCase):
+    def test_deadlines_per_region_and_action(self):
+        cooldown = CooldownScheduler(50, clock=lambda: 120)
+        cooldown.record('iad', 'deploy', 100)
+        cooldown.record('fra', 'deploy', 110, succeeded=False)
+        self.assertFalse(cooldown.ready('iad', 'remove'))
+        self.assertFalse(cooldown.ready('iad', 'deploy'))
+        self.assertTrue(cooldown.ready('iad', 'remove', now=150))
+        # A failed deploy only holds back another deploy
+        self.assertFalse(cooldown.ready('fra', 'deploy'))
+        self.assertTrue(cooldown.ready('fra', 'remove'))
+        self.assertTrue(cooldown.ready('cdg', 'deploy'))
+        self.assertEqual(cooldown.next_deadline(), 150)
+
+        cooldown.record('iad', 'remove', 130)
+        self.assertEqual(cooldown.next_deadline(now=155), 160)
+        self.assertEqual(cooldown.deadline('iad', 'deploy'), 180)
+        self.assertIsNone(cooldown.next_deadline(now=180))
+        self.assertEqual(cooldown.status(now=180)['cooling_down'], [])
+
+    def test_hold_splits_planned_actions(self):
+        cooldown = CooldownScheduler(60, clock=lambda: 1000)
+        cooldown.record('iad', 'deploy', 990)
+        deploy, remove, held = cooldown.hold(['cdg'], ['iad', 'lhr'])
+        self.assertEqual((deploy, remove), (['cdg'], ['lhr']))
+        self.assertEqual(held, [{'region': 'iad', 'action': 'remove', 'reason': 'cooldown', 'eligible_at': 1050}])
+        # The period can change without rebuilding the heap
+        cooldown.period = 5
+        self.assertEqual(cooldown.hold([], ['iad'])[1], ['iad'])
+
+    def test_deadlines_survive_a_restart(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        store = StateStore(os.path.join(tmp_dir, 'state.db'))
+        self.addCleanup(store.close)
+        now = time.time()
+        store.record_results({'deployed': ['cdg'], 'removed': [], 'errors': []}, timestamp=now - 500)
+        store.record_results({
+            'deployed': [],
+            'removed': ['iad'],
+            'errors': [{'region': 'fra', 'action': 'deploy', 'error': 'boom'}],
+        }, timestamp=now - 10)
+
+        cooldown = CooldownScheduler.from_store(StateStore(store.path), 60)
+        self.assertTrue(cooldown.ready('cdg', 'remove'))
+        self.assertFalse(cooldown.ready('iad', 'deploy'))
+        self.assertFalse(cooldown.ready('fra', 'deploy'))
+        self.assertTrue(cooldown.ready('fra', 'remove'))
+        self.assertAlmostEqual(cooldown.next_deadline(), now + 50, places=3)
+
+
+class FakeFetcher:
+    dry_run = True
+
+    def get_app_name(self):
+        return 'cooldown-app'
+
+
+class TestPlacerCooldown(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch('utils.state_manager.DATA_DIR', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(close_state_stores)
+        self.wakeups = []
+
+    def placer(self):
+        config = {'dry_run': True, 'traffic_threshold': 50, 'deployment_threshold': 10, 'cooldown_period': 300,
+                  'always_running_regions': ['iad']}
+        placer = AutoPlacer(config, metrics_fetcher=FakeFetcher())
+        placer.wakeup = self.wakeups.append
+        return placer
+
+    async def test_actions_wait_out_the_cooldown(self):
+        placer = self.placer()
+        result = await placer._execute_actions([('cdg', 'scale_up')], {})
+        self.assertEqual(result['actions_taken']['deployed'], ['cdg'])
+
+        # Flapping straight back is held, also after a restart, and the scheduler is asked to wake up
+        for placer in (placer, self.placer()):
+            self.wakeups.clear()
+            result = await placer._execute_actions([('cdg', 'scale_down'), ('iad', 'scale_down')], {'cdg': None})
+            self.assertEqual(result['updated_regions'], [])
+            skipped = {entry['region']: entry['reason'] for entry in result['actions_taken']['skipped']}
+            self.assertEqual(skipped, {'cdg': 'cooldown', 'iad': 'always running'})
+            self.assertEqual(len(self.wakeups), 1)
+            self.assertAlmostEqual(self.wakeups[0], 300, delta=5)
+            self.assertTrue(placer._is_in_cooldown('cdg', 'remove'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+import unittest
+import numpy as np
+from prediction.forecast import HoltWinters
+from prediction.placement_predictor import ACTION_SCALE_UP, PlacementPredictor
+from utils.config_loader import ConfigError, validate_config
+
+HOUR = 3600
+
+
+class TestHoltWinters(unittest.TestCase):
+    def test_learns_seasonal_profile(self):
+        # A one-hour "day" of 60 one-minute ticks
+        forecaster = HoltWinters(alpha=0.05, beta=0.01, gamma=0.5, season_period=HOUR, tick_interval=60,
+                                 deploy_latency=300)
+        t = np.arange(60 * 12) * 60.0
+        traffic = 100 + 60 * np.sin(2 * np.pi * t / HOUR)
+        errors = []
+        for step, (timestamp, value) in enumerate(zip(t, traffic)):
+            if step >= 5 and step + 5 < len(t):
+                errors.append(abs(forecaster.forecast(['iad'])[0] - traffic[step - 1 + 5]))
+            forecaster.update(['iad'], [value], timestamp)
+        # Late forecasts, five ticks ahead, track the curve closely; early ones don't know it yet
+        self.assertLess(np.mean(errors[-60:]), 2)
+        self.assertGreater(np.mean(errors[:60]), 20)
+
+    def test_trend_projects_deploy_latency_ahead(self):
+        forecaster = HoltWinters(alpha=0.5, beta=0.3, gamma=0.0, season_period=86400, tick_interval=60,
+                                 deploy_latency=120)
+        for step in range(200):
+            forecaster.update(['iad'], [10.0 + 2 * step], step * 60.0)
+        # Last sample 408; two ticks later the ramp reaches 412
+        self.assertAlmostEqual(forecaster.forecast(['iad'])[0], 412, delta=0.5)
+        self.assertAlmostEqual(forecaster.forecast(['iad'], horizon=600)[0], 428, delta=1)
+        self.assertAlmostEqual(forecaster.components('iad')['trend'], 2, delta=0.05)
+
+    def test_regions_update_independently_in_one_pass(self):
+        rng = np.random.default_rng(0)
+        traffic = rng.gamma(2.0, 30.0, size=(300, 3))
+        joint = HoltWinters(season_period=HOUR)
+        separate = {region: HoltWinters(season_period=HOUR) for region in ('a', 'b', 'c')}
+        for step, row in enumerate(traffic):
+            joint.update(['a', 'b', 'c'], row, step * 60.0)
+            for region, value in zip(('a', 'b', 'c'), row):
+                separate[region].update([region], [value], step * 60.0)
+        expected = [separate[region].forecast([region])[0] for region in ('a', 'b', 'c')]
+        np.testing.assert_allclose(joint.forecast(['a', 'b', 'c']), expected)
+
+    def test_missed_ticks_keep_season_aligned(self):
+        forecaster = HoltWinters(alpha=0.0, beta=0.0, gamma=1.0, season_period=HOUR, tick_interval=60)
+        forecaster.update(['iad'], [10.0], 0.0)
+        forecaster.update(['iad'], [50.0], 30 * 60.0)  # half an hour later, no samples in between
+        season = forecaster.components('iad')['season']
+        self.assertEqual(season[30], 40.0)
+        self.assertEqual(np.count_nonzero(season), 1)
+
+    def test_unknown_regions_and_floor(self):
+        forecaster = HoltWinters(alpha=1.0, beta=1.0, gamma=0.0, deploy_latency=600)
+        forecaster.update(['iad'], [50.0], 0.0)
+        forecaster.update(['iad'], [5.0], 60.0)
+        forecast = forecaster.forecast(['iad', 'cdg'])
+        self.assertEqual(forecast[0], 0.0)  # steep decline is floored, not negative
+        self.assertTrue(np.isnan(forecast[1]))
+
+    def test_configure_resets_season_on_new_length(self):
+        forecaster = HoltWinters.from_config({'season_period': HOUR, 'tick_interval': 60})
+        forecaster.update(['iad'], [10.0], 0.0)
+        forecaster.configure({'season_period': 2 * HOUR, 'tick_interval': 60, 'deploy_latency': 30})
+        self.assertEqual(forecaster.season_length, 120)
+        self.assertEqual(forecaster.components('iad')['season'].shape, (120,))
+        self.assertEqual(forecaster.deploy_latency, 30)
+        with self.assertRaises(ValueError):
+            forecaster.configure({'forecast_alpha': 2})
+
+
+class TestPredictorForecast(unittest.TestCase):
+    CONFIG = {'traffic_threshold': 50, 'deployment_threshold': 10, 'short_term_window': 3,
+              'long_term_window': 10, 'alpha_long': 0.1, 'tick_interval': 60}
+
+    def first_scale_up(self, config):
+        predictor = PlacementPredictor(config)
+        for step in range(120):
+            predictor.observe({'iad': 5.0 if step < 40 else 120.0}, step * 60.0)
+            if predictor.predict_smoothed(['iad'])['action'][0] == ACTION_SCALE_UP:
+                return step
+        return None
+
+    def test_forecast_scales_up_ahead_of_trailing_average(self):
+        trailing = self.first_scale_up(self.CONFIG)
+        forecast = self.first_scale_up({**self.CONFIG, 'forecast_enabled': True, 'deploy_latency': 120})
+        self.assertIsNotNone(forecast)
+        self.assertLess(forecast, trailing)
+
+    def test_toggling_forecast_on_reload(self):
+        predictor = PlacementPredictor(self.CONFIG)
+        self.assertIsNone(predictor.forecaster)
+        predictor.update_config({**self.CONFIG, 'forecast_enabled': True, 'season_period': HOUR})
+        self.assertEqual(predictor.forecaster.season_length, 60)
+        self.assertEqual(predictor.warm_start_samples, 256)
+        predictor.update_config({**self.CONFIG, 'forecast_enabled': True})
+        self.assertEqual(predictor.warm_start_samples, 2 * 1440)
+        predictor.update_config(self.CONFIG)
+        self.assertIsNone(predictor.forecaster)
+
+    def test_warm_start_uses_sample_timestamps(self):
+        config = {**self.CONFIG, 'forecast_enabled': True, 'season_period': HOUR, 'forecast_gamma': 1.0}
+        predictor = PlacementPredictor(config)
+        timestamps = np.array([[0.0, 60.0, 120.0], [np.nan, 60.0, 120.0]])
+        predictor.warm_start(['iad', 'cdg'], [[1.0, 2.0, 3.0], [np.nan, 7.0, 9.0]], timestamps)
+        self.assertEqual(predictor.forecaster.components('iad')['samples'], 3)
+        self.assertEqual(predictor.forecaster.components('cdg')['samples'], 2)
+        self.assertEqual(predictor.forecaster._last[predictor.forecaster._rows['iad']], 120.0)
+
+    def test_config_validation(self):
+        base = {'dry_run': True, 'cooldown_period': 10, 'traffic_threshold': 50, 'deployment_threshold': 10}
+        validate_config({**base, 'forecast_enabled': True, 'deploy_latency': 90, 'season_period': 86400})
+        for bad in ({'forecast_alpha': 1.5}, {'deploy_latency': -1}, {'season_period': 30},
+                    {'forecast_enabled': 'yes'}):
+            with self.assertRaises(ConfigError):
+                validate_config({**base, **bad})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,56 +1,74 @@
 import unittest
-from unittest.mock import mock_open, patch
+import os
+import tempfile
+from unittest.mock import patch
+from utils import history_manager
 from utils.history_manager import load_traffic_history, save_traffic_history, update_traffic_history
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 
 class TestHistoryManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.history_dir = os.path.join(self.tmp.name, 'traffic_history')
+        self.legacy_file = os.path.join(self.tmp.name, 'traffic_history.json')
+        patchers = [
+            patch('utils.history_manager.get_traffic_history_dir', return_value=self.history_dir),
+            patch('utils.history_manager.get_traffic_history_file', return_value=self.legacy_file),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(history_manager.close_history_stores)
+
     def test_load_traffic_history_with_data(self):
-        mock_data = json.dumps({
-            "2024-10-01T08:00:00Z": {
-                "cdg": 9,
-                "ams": 15
-            }
-        })
-        with patch('builtins.open', mock_open(read_data=mock_data)) as mocked_file:
-            with patch('os.path.exists') as mocked_exists:
-                mocked_exists.return_value = True
-                history = load_traffic_history()
-                self.assertIn("2024-10-01T08:00:00Z", history)
+        with open(self.legacy_file, 'w') as f:
+            json.dump({
+                "2024-10-01T08:00:00Z": {
+                    "cdg": 9,
+                    "ams": 15
+                }
+            }, f)
+        history = load_traffic_history(dry_run=False)
+        timestamp = datetime(2024, 10, 1, 8, 0, tzinfo=timezone.utc)
+        self.assertIn(timestamp, history)
+        self.assertEqual(history[timestamp], {'ams': 15.0, 'cdg': 9.0})
+        # The legacy file is migrated exactly once
+        self.assertFalse(os.path.exists(self.legacy_file))
+        self.assertTrue(os.path.exists(self.legacy_file + '.migrated'))
 
     def test_load_traffic_history_no_file(self):
-        with patch('os.path.exists') as mocked_exists:
-            mocked_exists.return_value = False
-            history = load_traffic_history()
-            self.assertEqual(history, {})
+        history = load_traffic_history(dry_run=False)
+        self.assertEqual(history, {})
 
     def test_save_traffic_history(self):
-        history_to_save = {'2024-10-01T08:30:00Z': {'iad': 100, 'cdg': 50}}
-        with patch('builtins.open', mock_open()) as mocked_file:
-            with patch('os.makedirs') as mocked_makedirs:
-                save_traffic_history(history_to_save)
-                mocked_file.assert_called_with('data/traffic_history.json', 'w')
-                file_handle = mocked_file()
-                file_handle.write.assert_called_once_with(json.dumps(history_to_save, indent=2))
-
-    @patch('utils.history_manager.load_traffic_history')
-    @patch('utils.history_manager.save_traffic_history')
-    def test_update_traffic_history(self, mock_save_history, mock_load_history):
-        # Mock existing history
-        mock_load_history.return_value = {
-            "2024-10-01T08:00:00Z": {
-                "cdg": 9,
-                "ams": 15
-            }
-        }
+        timestamp = datetime(2024, 10, 1, 8, 30, tzinfo=timezone.utc)
+        history_to_save = {timestamp: {'iad': 100, 'cdg': 50}}
+        save_traffic_history(history_to_save, dry_run=False)
+        # Saving the same history again must not duplicate samples
+        save_traffic_history(history_to_save, dry_run=False)
+
+        history_manager.close_history_stores()
+        history = load_traffic_history(dry_run=False)
+        self.assertEqual(history, {timestamp: {'iad': 100.0, 'cdg': 50.0}})
+
+    def test_update_traffic_history(self):
+        with open(self.legacy_file, 'w') as f:
+            json.dump({
+                "2024-10-01T08:00:00Z": {
+                    "cdg": 9,
+                    "ams": 15
+                }
+            }, f)
         current_data = {'iad': 100, 'cdg': 50}
-        updated_history = update_traffic_history(current_data, dry_run=True)
+        update_traffic_history(current_data, dry_run=False)
+        updated_history = load_traffic_history(dry_run=False)
 
         # Should have two entries in history now
         self.assertEqual(len(updated_history), 2)
         latest_timestamp = max(updated_history.keys())
         self.assertEqual(updated_history[latest_timestamp], current_data)
-        mock_save_history.assert_called_once_with(updated_history)
 
 if __name__ == '__main__':
     unittest.main()
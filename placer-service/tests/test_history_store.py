@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from utils.history_store import HistoryStore, RegionSeries
+
+class TestRegionSeries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'iad.series')
+
+    def test_ring_buffer_keeps_latest_samples(self):
+        series = RegionSeries(self.path, capacity=4)
+        for i in range(6):
+            series.append(1000 + i, i)
+        timestamps, values = series.window()
+        np.testing.assert_array_equal(values, [2, 3, 4, 5])
+        np.testing.assert_array_equal(timestamps, [1002, 1003, 1004, 1005])
+        self.assertEqual(series.latest(), (1005.0, 5.0))
+        self.assertEqual(series.total, 6)
+
+    def test_extend_wraps_and_truncates(self):
+        series = RegionSeries(self.path, capacity=5)
+        series.extend([1, 2, 3], [10, 20, 30])
+        series.extend(np.arange(4, 12), np.arange(40, 120, 10))
+        _, values = series.window()
+        np.testing.assert_array_equal(values, [70, 80, 90, 100, 110])
+        _, values = series.window(2)
+        np.testing.assert_array_equal(values, [100, 110])
+
+    def test_reopen_and_resize(self):
+        series = RegionSeries(self.path, capacity=3)
+        series.extend([1, 2, 3], [10, 20, 30])
+        series.close()
+
+        reopened = RegionSeries(self.path, capacity=3)
+        np.testing.assert_array_equal(reopened.window()[1], [10, 20, 30])
+        reopened.close()
+
+        shrunk = RegionSeries(self.path, capacity=2)
+        self.assertEqual(shrunk.capacity, 2)
+        np.testing.assert_array_equal(shrunk.window()[1], [20, 30])
+        shrunk.append(4, 40)
+        np.testing.assert_array_equal(shrunk.window()[1], [30, 40])
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_matrix_is_left_padded(self):
+        store = HistoryStore(self.tmp.name, window=10)
+        store.append({'iad': 1, 'cdg': 5}, 100)
+        store.append({'iad': 2}, 200)
+        matrix = store.matrix(['iad', 'cdg', 'fra'], 3)
+        np.testing.assert_array_equal(matrix[0], [np.nan, 1, 2])
+        np.testing.assert_array_equal(matrix[1], [np.nan, np.nan, 5])
+        self.assertTrue(np.isnan(matrix[2]).all())
+
+    def test_regions_are_rediscovered_on_open(self):
+        store = HistoryStore(self.tmp.name, window=10)
+        store.append({'iad': 1, 'cdg': 5}, 100)
+        store.close()
+        store = HistoryStore(self.tmp.name, window=10)
+        self.assertEqual(sorted(store.regions()), ['cdg', 'iad'])
+        self.assertEqual(store.latest_timestamp(), 100)
+
+    def test_rejects_unsafe_region_names(self):
+        store = HistoryStore(self.tmp.name, window=10)
+        with self.assertRaises(ValueError):
+            store.append({'../etc': 1}, 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import main
+from automation.auto_placer import AutoPlacer
+from automation.scheduler import PlacerScheduler
+from monitoring.ingest import IngestError, TrafficWindows, parse_batch
+from utils.history_manager import close_history_stores
+from utils.single_flight import SingleFlight
+from utils.state_manager import close_state_stores
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTrafficWindows(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.windows = TrafficWindows(window=10, bucket=1, clock=self.clock)
+
+    def test_sliding_window_expires_old_buckets(self):
+        self.windows.add('iad', 4)
+        self.clock.now += 9
+        self.windows.add('iad', 6)
+        self.windows.add('cdg')
+        self.assertEqual(self.windows.snapshot(), {None: {'iad': 10, 'cdg': 1}})
+        # Not a whole window of pushes yet
+        self.assertFalse(self.windows.ready())
+        self.clock.now += 1
+        self.assertTrue(self.windows.ready())
+        self.assertEqual(self.windows.snapshot()[None]['iad'], 6)
+        self.assertEqual(self.windows.latest(), {None: {'iad': 6.0, 'cdg': 1.0}})
+        self.clock.now += 100
+        self.assertEqual(self.windows.snapshot(), {None: {'iad': 0, 'cdg': 0}})
+        self.assertFalse(self.windows.active())
+        self.assertFalse(self.windows.ready())
+
+    def test_gap_longer_than_a_window_restarts_coverage(self):
+        for _ in range(11):
+            self.windows.add('iad', 5)
+            self.clock.now += 1
+        self.assertTrue(self.windows.ready())
+        self.clock.now += 60
+        self.windows.add('iad', 5)
+        # One bucket after the gap is not a complete window
+        self.assertTrue(self.windows.active())
+        self.assertFalse(self.windows.ready())
+        self.clock.now += 10
+        self.windows.add('iad', 5)
+        self.assertTrue(self.windows.ready())
+
+    def test_payload_shapes(self):
+        ingest = self.windows.ingest
+        self.assertEqual(ingest({'region': 'iad', 'count': 3}), {'accepted': 1, 'dropped': 0})
+        self.assertEqual(ingest({'counts': {'iad': 2, 'cdg': 5}}), {'accepted': 2, 'dropped': 0})
+        self.assertEqual(ingest([{'region': 'cdg'}, {'region': 'lhr', 'timestamp': self.clock.now - 3}]),
+                         {'accepted': 2, 'dropped': 0})
+        self.assertEqual(ingest({'events': [
+            {'region': 'iad', 'count': -1},
+            {'region': ['iad']},
+            {'region': 'iad', 'timestamp': self.clock.now - 60},
+            {'region': 'iad', 'timestamp': 'yesterday'},
+            'iad',
+            {'region': 'iad', 'count': True},
+        ]}), {'accepted': 0, 'dropped': 6})
+        self.assertEqual(self.windows.snapshot(), {None: {'iad': 5, 'cdg': 6, 'lhr': 1}})
+        with self.assertRaises(IngestError):
+            ingest({'counts': [1, 2]})
+        with self.assertRaises(IngestError):
+            ingest('iad')
+
+    def test_memory_is_bounded_by_region_count(self):
+        windows = TrafficWindows(window=10, bucket=1, max_regions=2, clock=self.clock)
+        result = windows.ingest({'counts': {'iad': 1, 'cdg': 1, 'lhr': 1}})
+        self.assertEqual(result, {'accepted': 2, 'dropped': 1})
+        self.clock.now += 1000
+        windows.add('iad', 1)
+        self.assertEqual(len(windows.snapshot()[None]), 2)
+
+    def test_dropped_events_do_not_take_region_slots(self):
+        windows = TrafficWindows(window=10, bucket=1, max_regions=2, clock=self.clock)
+        result = windows.ingest([{'region': 'aaa', 'count': -1}, {'region': 'bbb', 'count': 'many'},
+                                 {'region': 'ccc', 'timestamp': self.clock.now - 60}])
+        self.assertEqual(result, {'accepted': 0, 'dropped': 3})
+        self.assertEqual(windows.status()['regions'], 0)
+        self.assertEqual(windows.ingest({'counts': {'iad': 1, 'cdg': 1}}), {'accepted': 2, 'dropped': 0})
+
+    def test_multi_app_events_name_a_managed_app(self):
+        windows = TrafficWindows(window=10, bucket=1, apps=['web', 'api'], clock=self.clock)
+        windows.ingest([{'app': 'web', 'region': 'iad'}, {'app': 'other', 'region': 'iad'}, {'region': 'iad'}])
+        self.assertEqual(windows.snapshot(), {'web': {'iad': 1}})
+        self.assertEqual(windows.dropped, 2)
+
+    def test_threshold_crossing_wakes_at_most_once_per_interval(self):
+        crossings = []
+        windows = TrafficWindows(window=10, bucket=1, threshold=50, wake_interval=5, clock=self.clock,
+                                 on_threshold=lambda app, region: crossings.append(region))
+        # Crossings before a whole window has been seen don't count
+        windows.add('fra', 60)
+        self.clock.now += 10
+        windows.add('iad', 20)
+        windows.add('iad', 20)
+        self.assertEqual(crossings, [])
+        windows.add('iad', 20)
+        windows.add('cdg', 60)
+        self.assertEqual(crossings, ['iad'])
+        self.clock.now += 5
+        windows.add('lhr', 60)
+        self.assertEqual(crossings, ['iad', 'lhr'])
+
+    def test_parse_batch(self):
+        self.assertEqual(parse_batch(b'[{"region": "iad"}]'), [{'region': 'iad'}])
+        self.assertEqual(parse_batch(b'{"region": "iad"}\n\n{"region": "cdg", "count": 2}\n'),
+                         [{'region': 'iad'}, {'region': 'cdg', 'count': 2}])
+        with self.assertRaises(IngestError):
+            parse_batch(b'{"region": ')
+
+
+class TestThresholdWakeup(unittest.IsolatedAsyncioTestCase):
+    async def test_crossing_within_trigger_debounce_still_ticks(self):
+        ticks = []
+
+        async def tick():
+            ticks.append(1)
+
+        # Wired as in main.lifespan, with /trigger's 60s debounce on the shared flight
+        flight = SingleFlight(tick, debounce=60)
+        scheduler = PlacerScheduler(functools.partial(flight, force=True), interval=10, jitter=0)
+        app = SimpleNamespace(state=SimpleNamespace(scheduler=scheduler))
+        clock = FakeClock()
+        windows = TrafficWindows(window=10, bucket=1, threshold=50, clock=clock,
+                                 on_threshold=main.ingest_wakeup(app, {'traffic_source': 'ingest'}))
+        windows.add('iad', 1)
+        clock.now += 10
+        scheduler.start()
+        await asyncio.sleep(0.02)
+        windows.add('iad', 60)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        self.assertEqual(len(ticks), 2)
+        self.assertEqual(scheduler.wakeups, 1)
+
+
+class FakeFetcher:
+    dry_run = True
+
+    def get_app_name(self):
+        return 'ingest-app'
+
+    async def fetch_region_traffic(self):
+        raise AssertionError("Prometheus should not be polled when traffic is pushed")
+
+
+class TestPlacerReadsPushedTraffic(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch('utils.state_manager.DATA_DIR', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(close_history_stores)
+        self.addCleanup(close_state_stores)
+
+    async def test_tick_uses_ingested_windows(self):
+        config = {'dry_run': True, 'traffic_threshold': 50, 'deployment_threshold': 10, 'short_term_window': 1,
+                  'backfill_enabled': False, 'traffic_source': 'ingest'}
+        clock = FakeClock()
+        windows = TrafficWindows.from_config(config, clock=clock)
+        windows.ingest({'counts': {'iad': 1}})
+        clock.now += windows.window
+        windows.ingest({'counts': {'iad': 400, 'cdg': 1}})
+        placer = AutoPlacer(config, metrics_fetcher=FakeFetcher(), ingest=windows)
+        self.assertEqual(await placer._collect_traffic(), {None: {'iad': 400, 'cdg': 1}})
+        await placer.process_traffic_data()
+        self.assertEqual(placer.tracer.recent()[-1]['status'], 'success')
+
+if __name__ == '__main__':
+    unittest.main()
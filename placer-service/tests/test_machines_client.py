@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from automation.placement_executor import PlacementExecutor, MachinesApiBackend
+from utils.machines_client import MachinesClient, MachinesApiError
+
+class FakeMachinesApi(ThreadingHTTPServer):
+    """In-memory stand-in for the Machines API of a single app."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeMachinesHandler)
+        self.machines = {}
+        self.next_id = 1
+        self.requests = []
+        self.client_ports = set()
+        self.lock = threading.Lock()
+
+    def add(self, region, config=None, state='started'):
+        machine_id = f'm{self.next_id}'
+        self.next_id += 1
+        self.machines[machine_id] = {'id': machine_id, 'region': region, 'state': state,
+                                     'config': config or {'image': 'app:latest'}}
+        return machine_id
+
+class FakeMachinesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self, method):
+        server = self.server
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        with server.lock:
+            server.requests.append((method, url.path, self.headers.get('Authorization')))
+            server.client_ports.add(self.client_address[1])
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        if parts[:3] != ['v1', 'apps', 'demo'] or parts[3] != 'machines':
+            return self._reply(404, {'error': 'not found'})
+        with server.lock:
+            if method == 'GET' and len(parts) == 4:
+                region = parse_qs(url.query).get('region', [None])[0]
+                machines = [m for m in server.machines.values() if region in (None, m['region'])]
+                return self._reply(200, machines)
+            if method == 'POST' and len(parts) == 4:
+                if body['region'] == 'bad':
+                    return self._reply(422, {'error': 'invalid region'})
+                machine_id = server.add(body['region'], body['config'])
+                return self._reply(200, server.machines[machine_id])
+            machine = server.machines.get(parts[4]) if len(parts) > 4 else None
+            if machine is None:
+                return self._reply(404, {'error': 'machine not found'})
+            if method == 'POST' and parts[5:] == ['stop']:
+                machine['state'] = 'stopped'
+                return self._reply(200, {'ok': True})
+            if method == 'DELETE':
+                del server.machines[machine['id']]
+                return self._reply(200, {'ok': True})
+        return self._reply(405, {'error': 'method not allowed'})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_DELETE(self):
+        self._route('DELETE')
+
+class MachinesApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeMachinesApi()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+        self.client = MachinesClient('demo', 'secret', base_url=base_url, pool_size=4)
+        self.addCleanup(self.client.close)
+
+class TestMachinesClient(MachinesApiTestCase):
+    def test_requests_share_a_keep_alive_connection(self):
+        self.server.add('iad')
+        for _ in range(5):
+            self.client.list_machines()
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(self.server.requests[0][2], 'Bearer secret')
+
+    def test_list_filters_by_region(self):
+        self.server.add('iad')
+        self.server.add('cdg')
+        self.assertEqual([m['region'] for m in self.client.list_machines(region='cdg')], ['cdg'])
+
+    def test_batched_lifecycle(self):
+        created = self.client.create_machines(['iad', 'cdg', 'bad'], {'image': 'app:v2'})
+        self.assertEqual([m['region'] for m in created[:2]], ['iad', 'cdg'])
+        self.assertIsInstance(created[2], MachinesApiError)
+        self.assertEqual(created[2].status_code, 422)
+
+        ids = [m['id'] for m in created[:2]]
+        self.client.stop_machines(ids)
+        self.assertEqual({m['state'] for m in self.server.machines.values()}, {'stopped'})
+        results = self.client.destroy_machines(ids + ['missing'])
+        self.assertIsInstance(results[2], MachinesApiError)
+        self.assertEqual(self.server.machines, {})
+
+    def test_scale_regions_clones_existing_config(self):
+        self.server.add('fra', config={'image': 'app:v7'})
+        self.server.add('iad')
+        self.server.add('iad')
+        errors = self.client.scale_regions({'cdg': 1, 'iad': 0, 'fra': 1})
+        self.assertEqual(errors, {'cdg': None, 'iad': None, 'fra': None})
+        regions = sorted(m['region'] for m in self.server.machines.values())
+        self.assertEqual(regions, ['cdg', 'fra'])
+        cdg = next(m for m in self.server.machines.values() if m['region'] == 'cdg')
+        self.assertEqual(cdg['config'], {'image': 'app:v7'})
+
+    def test_scale_up_without_template_fails(self):
+        errors = self.client.scale_regions({'cdg': 1})
+        self.assertIn('No existing machine', errors['cdg'])
+
+class TestMachinesApiBackend(MachinesApiTestCase):
+    def test_executor_lists_once_per_batch(self):
+        self.server.add('fra')
+        self.server.add('sfo')
+        executor = PlacementExecutor(backend=MachinesApiBackend(self.client), concurrency=4, timeout=5)
+        updated, results = asyncio.run(executor.execute(['iad', 'cdg'], ['sfo']))
+        self.assertEqual(sorted(updated), ['cdg', 'iad', 'sfo'])
+        self.assertEqual(results['errors'], [])
+        list_calls = [r for r in self.server.requests if r[0] == 'GET']
+        self.assertEqual(len(list_calls), 1)
+        self.assertEqual(sorted(m['region'] for m in self.server.machines.values()), ['cdg', 'fra', 'iad'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from metrics.metrics_client import MetricsClient, MetricsRegistry, SCALE_ACTIONS
+from automation.placement_executor import PlacementError, PlacementExecutor
+from prediction.placement_predictor import PlacementPredictor
+
+
+class FailingBackend:
+    async def scale(self, region, count):
+        if region == 'cdg':
+            raise PlacementError("boom")
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge_exposition(self):
+        counter = self.registry.counter('requests_total', 'Requests served', ('path',))
+        counter.labels('/a').inc()
+        counter.labels('/a').inc(2)
+        counter.labels('/b').inc()
+        gauge = self.registry.gauge('temperature', 'Current temperature')
+        gauge.set(21.5)
+        self.assertEqual(self.registry.render(), (
+            '# HELP requests_total Requests served\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{path="/a"} 3\n'
+            'requests_total{path="/b"} 1\n'
+            '# HELP temperature Current temperature\n'
+            '# TYPE temperature gauge\n'
+            'temperature 21.5\n'
+        ))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency', ('op',), buckets=(0.1, 1, 10))
+        child = histogram.labels('get')
+        for value in (0.05, 0.1, 0.5, 5, 50):
+            child.observe(value)
+        lines = self.registry.render().splitlines()
+        self.assertEqual(lines[2:], [
+            'latency_seconds_bucket{op="get",le="0.1"} 2',
+            'latency_seconds_bucket{op="get",le="1"} 3',
+            'latency_seconds_bucket{op="get",le="10"} 4',
+            'latency_seconds_bucket{op="get",le="+Inf"} 5',
+            'latency_seconds_sum{op="get"} 55.65',
+            'latency_seconds_count{op="get"} 5',
+        ])
+
+    def test_children_are_reused_and_labels_escaped(self):
+        counter = self.registry.counter('events_total', 'Events', ('name',))
+        self.assertIs(counter.labels('x'), counter.labels('x'))
+        counter.labels('a "quoted"\nname').inc()
+        self.assertIn('events_total{name="a \\"quoted\\"\\nname"} 1', self.registry.render())
+        with self.assertRaises(ValueError):
+            counter.labels('x', 'y')
+        with self.assertRaises(ValueError):
+            counter.labels('x').inc(-1)
+
+    def test_registration_is_idempotent(self):
+        first = self.registry.counter('ticks_total', 'Ticks')
+        self.assertIs(self.registry.counter('ticks_total', 'Ticks'), first)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('ticks_total', 'Ticks')
+        with self.assertRaises(ValueError):
+            self.registry.counter('ticks_total', 'Ticks', ('region',))
+
+
+class TestPlacerInstrumentation(unittest.TestCase):
+    def test_predictor_records_thresholds_and_decisions(self):
+        registry = MetricsRegistry()
+        client = MetricsClient(registry)
+        predictor = PlacementPredictor({'traffic_threshold': 50, 'deployment_threshold': 10}, client)
+        predictor.predict_all(['iad', 'cdg'], [[200.0], [1.0]])
+        decisions = predictor.predict_all(['iad', 'cdg'], [[30.0, 300.0], [1.0, 0.5]])
+        self.assertEqual(client.traffic.labels('iad').value, 300.0)
+        self.assertEqual(client.traffic_threshold.labels('cdg').value, decisions['traffic_threshold'][1])
+        self.assertEqual(client.deployment_threshold.labels('cdg').value, decisions['deployment_threshold'][1])
+        self.assertEqual(decisions['action'].tolist(), [0, -1])
+        self.assertEqual(client.decisions.labels('cdg', 'scale_down').value, 2)
+        self.assertEqual(list(client.decisions._children), [('cdg', 'scale_down')])
+        self.assertIn('placer_region_traffic{region="cdg"} 0.5', registry.render())
+
+    def test_record_threshold_metrics_dict(self):
+        client = MetricsClient(MetricsRegistry())
+        client.record_threshold_metrics({'region': 'lhr', 'current_traffic': 5.0, 'traffic_threshold': 60.0,
+                                         'deployment_threshold': 12.0, 'action': 'no_action'})
+        self.assertEqual(client.traffic_threshold.labels('lhr').value, 60.0)
+        self.assertEqual(client.decisions._children, {})
+
+
+class TestExecutorInstrumentation(unittest.IsolatedAsyncioTestCase):
+    async def test_scale_actions_counted_by_outcome(self):
+        def count(region, action, outcome):
+            return SCALE_ACTIONS.labels('metrics-app', region, action, outcome).value
+
+        before = count('iad', 'deploy', 'success'), count('cdg', 'remove', 'error')
+        executor = PlacementExecutor(backend=FailingBackend(), app='metrics-app')
+        await executor.execute(['iad'], ['cdg'])
+        self.assertEqual(count('iad', 'deploy', 'success'), before[0] + 1)
+        self.assertEqual(count('cdg', 'remove', 'error'), before[1] + 1)
+
+if __name__ == '__main__':
+    unittest.main()
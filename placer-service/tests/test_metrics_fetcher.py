@@ -0,0 +1,106 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+import httpx
+from utils.metrics_fetcher import AsyncMetricsFetcher, MetricsFetcher
+
+ENV = {
+    'FLY_PROMETHEUS_URL': 'http://prometheus.test/prometheus/personal',
+    'FLY_API_TOKEN': 'token',
+    'FLY_APP_NAME': 'demo',
+}
+
+PROMETHEUS_RESPONSE = {
+    'status': 'success',
+    'data': {'resultType': 'vector', 'result': [
+        {'metric': {'region': 'iad'}, 'value': [1700000000, '42']},
+        {'metric': {'region': 'cdg'}, 'value': [1700000000, '7.5']},
+    ]},
+}
+
+class PrometheusStub:
+    def __init__(self, statuses=(200,)):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        if status == 'timeout':
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(status, json=PROMETHEUS_RESPONSE if status == 200 else {'error': 'x'})
+
+class TestAsyncMetricsFetcher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetcher(self, stub, **kwargs):
+        fetcher = AsyncMetricsFetcher(dry_run=False, transport=httpx.MockTransport(stub), backoff=0, **kwargs)
+        self.addAsyncCleanup(fetcher.aclose)
+        return fetcher
+
+    async def test_fetch_parses_regions_and_reuses_client(self):
+        stub = PrometheusStub()
+        fetcher = self.fetcher(stub)
+        self.assertEqual(await fetcher.fetch_region_traffic(), {'iad': 42.0, 'cdg': 7.5})
+        client = fetcher._client
+        await fetcher.fetch_region_traffic()
+        self.assertIs(fetcher._client, client)
+
+        request = stub.requests[0]
+        self.assertEqual(request.url.path, '/prometheus/personal/api/v1/query')
+        self.assertEqual(request.headers['Authorization'], 'Bearer token')
+        self.assertIn('app="demo"', request.url.params['query'])
+
+    async def test_retries_transient_failures(self):
+        stub = PrometheusStub([503, 'timeout', 200])
+        fetcher = self.fetcher(stub, retries=2)
+        self.assertEqual(await fetcher.fetch_region_traffic(), {'iad': 42.0, 'cdg': 7.5})
+        self.assertEqual(len(stub.requests), 3)
+
+    async def test_gives_up_after_bounded_retries(self):
+        stub = PrometheusStub([502])
+        fetcher = self.fetcher(stub, retries=1)
+        with self.assertRaises(httpx.HTTPStatusError):
+            await fetcher.fetch_region_traffic()
+        self.assertEqual(len(stub.requests), 2)
+
+    async def test_client_errors_are_not_retried(self):
+        stub = PrometheusStub([401])
+        fetcher = self.fetcher(stub, retries=3)
+        with self.assertRaises(httpx.HTTPStatusError):
+            await fetcher.fetch_region_traffic()
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_requires_credentials_outside_dry_run(self):
+        with patch.dict(os.environ, {'FLY_API_TOKEN': ''}):
+            with self.assertRaises(ValueError):
+                AsyncMetricsFetcher(dry_run=False)
+
+class TestMetricsFetcherShim(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_shim(self):
+        shim = MetricsFetcher(dry_run=False)
+        shim._fetcher._transport = httpx.MockTransport(PrometheusStub())
+        return shim
+
+    def test_sync_fetch(self):
+        self.assertEqual(self.make_shim().fetch_region_traffic(), {'iad': 42.0, 'cdg': 7.5})
+
+    def test_sync_fetch_from_inside_event_loop(self):
+        shim = self.make_shim()
+
+        async def call_from_loop():
+            return shim.fetch_region_traffic()
+
+        self.assertEqual(asyncio.run(call_from_loop()), {'iad': 42.0, 'cdg': 7.5})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import httpx
+import main
+from automation.auto_placer import AutoPlacer, placement_key, split_placement_key
+from utils.history_manager import close_history_stores, get_traffic_history_dir
+from utils.metrics_fetcher import AsyncMetricsFetcher
+from utils.state_manager import (close_state_stores, get_deployment_state_file, get_state_store,
+                                 load_deployment_state, save_deployment_state)
+from utils.traffic_cache import TrafficCache
+
+APPS_RESPONSE = {
+    'status': 'success',
+    'data': {'resultType': 'vector', 'result': [
+        {'metric': {'app': 'web', 'region': 'iad'}, 'value': [1700000000, '42']},
+        {'metric': {'app': 'web', 'region': 'cdg'}, 'value': [1700000000, '3']},
+        {'metric': {'app': 'api', 'region': 'iad'}, 'value': [1700000000, '7.5']},
+        {'metric': {'app': 'other', 'region': 'iad'}, 'value': [1700000000, '1']},
+    ]},
+}
+
+class FakeAppsFetcher:
+    dry_run = False
+
+    def __init__(self):
+        self.traffic = {}
+        self.calls = 0
+
+    async def fetch_apps_traffic(self, apps):
+        self.calls += 1
+        return {app: dict(self.traffic.get(app, {})) for app in apps}
+
+    async def fetch_apps_traffic_range(self, apps, start, end, step):
+        return {app: {} for app in apps}
+
+class TestAppsQuery(unittest.IsolatedAsyncioTestCase):
+    async def test_one_query_returns_traffic_for_every_app(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=APPS_RESPONSE)
+
+        env = {'FLY_PROMETHEUS_URL': 'http://prometheus.test', 'FLY_API_TOKEN': 'token'}
+        with patch.dict(os.environ, env):
+            os.environ.pop('FLY_APP_NAME', None)
+            fetcher = AsyncMetricsFetcher(dry_run=False, apps=['web', 'api', 'idle'],
+                                          transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(fetcher.aclose)
+
+        traffic = await fetcher.fetch_apps_traffic()
+
+        self.assertEqual(traffic, {'web': {'iad': 42.0, 'cdg': 3.0}, 'api': {'iad': 7.5}, 'idle': {}})
+        self.assertEqual(len(requests), 1)
+        query = requests[0].url.params['query']
+        self.assertIn('app=~"web|api|idle"', query)
+        self.assertIn('by (app, region)', query)
+
+class TestMultiAppPlacer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch('utils.state_manager.DATA_DIR', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(close_history_stores)
+        self.addCleanup(close_state_stores)
+
+        config = {
+            'dry_run': True,
+            'apps': ['web', 'api'],
+            'traffic_threshold': 50,
+            'deployment_threshold': 10,
+            'short_term_window': 1,
+            'long_term_window': 20,
+            'alpha_long': 0.1,
+            'backfill_enabled': False,
+        }
+        self.fetcher = FakeAppsFetcher()
+        self.placer = AutoPlacer(config, metrics_fetcher=self.fetcher)
+
+    def test_placement_keys_round_trip(self):
+        self.assertEqual(split_placement_key(placement_key('web', 'iad')), ('web', 'iad'))
+        self.assertEqual(split_placement_key(placement_key(None, 'iad')), (None, 'iad'))
+
+    async def test_apps_share_one_fetch_and_keep_separate_state(self):
+        save_deployment_state({'ams': '2024-01-01T00:00:00+00:00'}, dry_run=True, app='api')
+        self.fetcher.traffic = {'web': {'iad': 20, 'ams': 1}, 'api': {'iad': 20, 'ams': 1}}
+        removed = {'web': [], 'api': []}
+        for _ in range(5):
+            results = await self.placer.process_traffic_data()
+            for app in removed:
+                removed[app] += results['apps'][app]['actions_taken']['removed']
+        self.fetcher.traffic['web']['iad'] = 1000
+
+        results = await self.placer.process_traffic_data()
+
+        self.assertEqual(self.fetcher.calls, 6)
+        self.assertEqual(set(results['apps']), {'web', 'api'})
+        self.assertEqual(results['apps']['web']['actions_taken']['deployed'], ['iad'])
+        self.assertEqual(results['apps']['web']['actions_taken']['removed'], [])
+        self.assertEqual(results['apps']['api']['actions_taken']['deployed'], [])
+        # Only the app that runs in ams has something to remove there, and only once
+        self.assertEqual(removed, {'web': [], 'api': ['ams']})
+        self.assertEqual(list(load_deployment_state(dry_run=True, app='web')), ['iad'])
+        self.assertEqual(load_deployment_state(dry_run=True, app='api'), {})
+        self.assertEqual([(entry['region'], entry['action']) for entry in get_state_store(True, 'api').actions()],
+                         [('ams', 'remove')])
+
+        for app in ('web', 'api'):
+            history_dir = get_traffic_history_dir(True, app)
+            self.assertTrue(history_dir.startswith(os.path.join(self.tmp_dir, 'apps', app)))
+            self.assertTrue(os.path.exists(os.path.join(history_dir, 'iad.series')))
+            self.assertTrue(get_deployment_state_file(True, app).startswith(os.path.join(self.tmp_dir, 'apps', app)))
+
+    async def test_region_missing_from_traffic_scales_down(self):
+        self.placer.config['cooldown_period'] = 0
+        self.fetcher.traffic = {'web': {'iad': 20, 'cdg': 20}, 'api': {}}
+        for _ in range(5):
+            await self.placer.process_traffic_data()
+        self.fetcher.traffic['web']['iad'] = 1000
+        results = await self.placer.process_traffic_data()
+        self.assertEqual(results['apps']['web']['actions_taken']['deployed'], ['iad'])
+
+        # iad stops reporting altogether; it decays as zero traffic rather than holding its last value
+        del self.fetcher.traffic['web']['iad']
+        removed = []
+        for _ in range(30):
+            results = await self.placer.process_traffic_data()
+            removed += results['apps']['web']['actions_taken']['removed']
+        self.assertEqual(removed, ['iad'])
+        self.assertLess(self.placer.predictor.averages(placement_key('web', 'iad'))['long'], 10)
+
+    async def test_metrics_endpoint_keeps_one_shape(self):
+        self.fetcher.traffic = {'web': {'iad': 20}, 'api': {'cdg': 5}}
+        cache = TrafficCache(main.placer_traffic(main.app))
+        self.placer.traffic_cache = cache
+        main.app.state.metrics_fetcher = self.fetcher
+        main.app.state.placer = self.placer
+        main.app.state.traffic_cache = cache
+        self.addCleanup(main.app.state._state.clear)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            # A cold miss refills through the apps query, not the single-app fetch
+            cold = await client.get('/metrics')
+            self.assertEqual(cold.status_code, 200)
+            self.assertEqual(cold.json()['traffic_data'], {'web': {'iad': 20}, 'api': {'cdg': 5}})
+
+            self.fetcher.traffic['web']['iad'] = 30
+            await self.placer.process_traffic_data()
+            ticked = await client.get('/metrics')
+        self.assertEqual(ticked.json()['traffic_data'], {'web': {'iad': 30}, 'api': {'cdg': 5}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import stat
+import tempfile
+import time
+import unittest
+from automation.placement_executor import PlacementExecutor, FlyctlBackend, PlacementError
+
+class SleepyBackend:
+    def __init__(self, delays, failures=()):
+        self.delays = delays
+        self.failures = set(failures)
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def scale(self, region, count):
+        self.calls.append((region, count))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(region, 0))
+            if region in self.failures:
+                raise PlacementError("boom")
+        finally:
+            self.running -= 1
+
+class TestPlacementExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_regions_concurrently(self):
+        backend = SleepyBackend({'iad': 0.2, 'cdg': 0.2, 'lhr': 0.2, 'fra': 0.2, 'sfo': 0.3})
+        executor = PlacementExecutor(backend=backend, concurrency=5, timeout=5)
+        start = time.perf_counter()
+        updated, results = await executor.execute(['iad', 'cdg', 'lhr'], ['fra', 'sfo'])
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(results['deployed'], ['iad', 'cdg', 'lhr'])
+        self.assertEqual(results['removed'], ['fra', 'sfo'])
+        self.assertEqual(updated, ['iad', 'cdg', 'lhr', 'fra', 'sfo'])
+        self.assertIn(('fra', 0), backend.calls)
+
+    async def test_concurrency_limit(self):
+        backend = SleepyBackend({region: 0.05 for region in 'abcdef'})
+        executor = PlacementExecutor(backend=backend, concurrency=2, timeout=5)
+        await executor.execute(list('abcdef'), [])
+        self.assertEqual(backend.max_running, 2)
+
+    async def test_errors_and_timeouts_are_reported_per_region(self):
+        backend = SleepyBackend({'iad': 5}, failures={'cdg'})
+        executor = PlacementExecutor(backend=backend, concurrency=4, timeout=0.1)
+        updated, results = await executor.execute(['iad', 'cdg', 'lhr'], [])
+        self.assertEqual(updated, ['lhr'])
+        errors = {error['region']: error for error in results['errors']}
+        self.assertIn('Timed out', errors['iad']['error'])
+        self.assertEqual(errors['cdg'], {'region': 'cdg', 'action': 'deploy', 'error': 'boom'})
+
+    async def test_dry_run_does_not_call_backend(self):
+        backend = SleepyBackend({})
+        executor = PlacementExecutor(backend=backend, dry_run=True)
+        updated, results = await executor.execute(['iad'], ['cdg'])
+        self.assertEqual(backend.calls, [])
+        self.assertEqual(updated, ['iad', 'cdg'])
+
+class TestFlyctlBackend(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.binary = os.path.join(self.tmp.name, 'fly')
+        self.marker = os.path.join(self.tmp.name, 'finished')
+        with open(self.binary, 'w') as f:
+            f.write(f"#!/bin/sh\n"
+                    f"[ \"$5\" = bad ] && {{ echo 'no such region' >&2; exit 3; }}\n"
+                    f"[ \"$5\" = slow ] && sleep 1 && touch {self.marker}\n"
+                    f"exit 0\n")
+        os.chmod(self.binary, os.stat(self.binary).st_mode | stat.S_IEXEC)
+
+    async def test_subprocess_success_and_failure(self):
+        executor = PlacementExecutor(backend=FlyctlBackend(self.binary), timeout=5)
+        updated, results = await executor.execute(['iad'], ['bad'])
+        self.assertEqual(updated, ['iad'])
+        self.assertIn('no such region', results['errors'][0]['error'])
+
+    async def test_timeout_kills_subprocess(self):
+        executor = PlacementExecutor(backend=FlyctlBackend(self.binary), timeout=0.2)
+        _, results = await executor.execute(['slow'], [])
+        self.assertEqual(results['errors'][0]['region'], 'slow')
+        await asyncio.sleep(1.2)
+        self.assertFalse(os.path.exists(self.marker))
+
+if __name__ == '__main__':
+    unittest.main()
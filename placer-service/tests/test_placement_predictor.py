@@ -1,7 +1,29 @@
 import unittest
 from unittest.mock import Mock
-from prediction.placement_predictor import PlacementPredictor
+from prediction.placement_predictor import PlacementPredictor, ACTION_SCALE_UP, ACTION_SCALE_DOWN
 from datetime import datetime, timezone
+import numpy as np
+
+def legacy_predict(history, region, current, traffic_threshold, deployment_threshold):
+    """Reference copy of the original per-region scalar implementation."""
+    region_history = history.setdefault(region, [])
+    region_history.append(current)
+    history[region] = region_history[-10:]
+    traffic_values = history[region]
+    mean_traffic = np.mean(traffic_values)
+    std_traffic = np.std(traffic_values) if len(traffic_values) > 1 else 0
+    traffic_variability = std_traffic / mean_traffic if mean_traffic > 0 else 0
+    volatility_factor = 1 + traffic_variability
+    adaptive_traffic_threshold = max(traffic_threshold, mean_traffic * (1.1 * volatility_factor))
+    adaptive_deployment_threshold = min(deployment_threshold, mean_traffic * (0.9 / volatility_factor))
+    hysteresis_gap = (adaptive_traffic_threshold - adaptive_deployment_threshold) * 0.1
+    adaptive_deployment_threshold += hysteresis_gap
+    action = None
+    if current > adaptive_traffic_threshold:
+        action = 'scale_up'
+    elif current < adaptive_deployment_threshold:
+        action = 'scale_down'
+    return action, adaptive_traffic_threshold, adaptive_deployment_threshold
 
 class TestPlacementPredictor(unittest.TestCase):
     def test_adaptive_thresholds_with_volatility(self):
@@ -26,5 +48,122 @@ class TestPlacementPredictor(unittest.TestCase):
         )
         assert final_thresholds[0] > config['traffic_threshold']  # Higher traffic threshold due to volatility
 
+class TestPredictAll(unittest.TestCase):
+    def setUp(self):
+        self.config = {'traffic_threshold': 50, 'deployment_threshold': 10}
+
+    def test_matches_legacy_scalar_path_bit_for_bit(self):
+        rng = np.random.default_rng(42)
+        regions = [f'r{i}' for i in range(35)]
+        # Regions start reporting at different ticks so windows have mixed lengths
+        start = rng.integers(0, 15, size=len(regions))
+        series = rng.gamma(2.0, 20.0, size=(len(regions), 30)).round(2)
+        predictor = PlacementPredictor(self.config)
+        legacy_history = {}
+
+        for tick in range(30):
+            active = [i for i in range(len(regions)) if start[i] <= tick]
+            traffic = np.full((len(active), tick + 1), np.nan)
+            for row, i in enumerate(active):
+                traffic[row, start[i]:] = series[i, start[i]:tick + 1]
+            decisions = predictor.predict_all([regions[i] for i in active], traffic)
+
+            for row, i in enumerate(active):
+                action, upper, lower = legacy_predict(legacy_history, regions[i], series[i, tick], 50, 10)
+                self.assertEqual(decisions['traffic_threshold'][row], upper)
+                self.assertEqual(decisions['deployment_threshold'][row], lower)
+                expected = {'scale_up': ACTION_SCALE_UP, 'scale_down': ACTION_SCALE_DOWN}.get(action, 0)
+                self.assertEqual(decisions['action'][row], expected)
+
+    def test_scalar_wrapper_matches_batch(self):
+        predictor = PlacementPredictor(self.config)
+        values = [60, 90, 40, 100, 50, 5, 120, 7]
+        actions = [predictor.predict_placement_actions('iad', {'long': v}) for v in values]
+        legacy_history = {}
+        expected = [legacy_predict(legacy_history, 'iad', v, 50, 10)[0] for v in values]
+        self.assertEqual(actions, expected)
+
+    def test_scalar_wrapper_matches_legacy_thresholds(self):
+        predictor = PlacementPredictor({**self.config, 'long_term_window': 3})
+        legacy_history = {}
+        for value in [60, 90, 40, 100, 50, 5, 120, 7, 33, 41, 80, 12]:
+            _, upper, lower = legacy_predict(legacy_history, 'iad', value, 50, 10)
+            thresholds = predictor.calculate_adaptive_thresholds('iad', {'long': value}, 50, 10)
+            self.assertEqual(thresholds, (upper, lower))
+
+    def test_empty_rows_take_no_action(self):
+        predictor = PlacementPredictor(self.config)
+        decisions = predictor.predict_all(['iad', 'cdg'], np.array([[np.nan, np.nan, np.nan, np.nan], [20, 20, 20, 80]]))
+        self.assertEqual(decisions['action'][0], 0)
+        self.assertEqual(decisions['traffic_threshold'][0], 50)
+        self.assertEqual(decisions['action'][1], ACTION_SCALE_UP)
+        self.assertEqual(list(decisions['region']), ['iad', 'cdg'])
+
+    def test_no_regions(self):
+        predictor = PlacementPredictor(self.config)
+        self.assertEqual(len(predictor.predict_all([], np.empty((0, 0)))), 0)
+
+    def test_scale_up_wins_when_both_thresholds_are_crossed(self):
+        # A non-positive mean inverts the adaptive thresholds: -10 is above -11 and below -9.2
+        predictor = PlacementPredictor(self.config)
+        decisions = predictor.predict_all(['iad'], np.full((1, 4), -10.0), traffic_threshold=-20,
+                                          deployment_threshold=0)
+        self.assertLess(decisions['traffic_threshold'][0], -10)
+        self.assertGreater(decisions['deployment_threshold'][0], -10)
+        self.assertEqual(decisions['action'][0], ACTION_SCALE_UP)
+
+class TestSmoothedPrediction(unittest.TestCase):
+    def test_observe_feeds_long_average(self):
+        config = {'traffic_threshold': 50, 'deployment_threshold': 10, 'short_term_window': 3,
+                  'long_term_window': 20, 'alpha_short': 0.3, 'alpha_long': 0.1}
+        predictor = PlacementPredictor(config)
+        predictor.observe({'iad': 5, 'cdg': 40})
+        predictor.observe({'iad': 5, 'cdg': 40})
+        # Not warm yet: no decision before short_term_window samples
+        self.assertEqual(list(predictor.predict_smoothed(['iad', 'cdg'])['action']), [0, 0])
+
+        predictor.observe({'iad': 5, 'cdg': 40})
+        decisions = predictor.predict_smoothed(['iad', 'cdg'])
+        self.assertEqual(decisions['action'][0], ACTION_SCALE_DOWN)
+        self.assertEqual(decisions['action'][1], 0)
+        self.assertEqual(predictor.averages('iad')['long'], 5)
+
+    def test_short_average_confirms_crossings(self):
+        config = {'traffic_threshold': 50, 'deployment_threshold': 10, 'short_term_window': 1,
+                  'long_term_window': 20, 'alpha_short': 0.9, 'alpha_long': 0.1}
+        predictor = PlacementPredictor(config)
+        for _ in range(10):
+            predictor.observe({'iad': 20, 'cdg': 20})
+
+        # A one-tick spike: once it is over, the lagging long average alone would still scale up
+        predictor.observe({'iad': 1000, 'cdg': 0})
+        self.assertEqual(predictor.predict_smoothed(['iad'])['action'][0], ACTION_SCALE_UP)
+        predictor.observe({'iad': 20, 'cdg': 0})
+        predictor.observe({'iad': 20, 'cdg': 0})
+        iad = predictor.predict_smoothed(['iad'])[0]
+        self.assertGreater(iad['current'], iad['traffic_threshold'])
+        self.assertEqual(iad['action'], 0)
+
+        # Likewise a dip that has recovered isn't scaled down
+        predictor.observe({'iad': 20, 'cdg': 0})
+        self.assertEqual(predictor.predict_smoothed(['cdg'])['action'][0], ACTION_SCALE_DOWN)
+        predictor.observe({'iad': 20, 'cdg': 0})
+        predictor.observe({'iad': 20, 'cdg': 30})
+        cdg = predictor.predict_smoothed(['cdg'])[0]
+        self.assertLess(cdg['current'], cdg['deployment_threshold'])
+        self.assertEqual(cdg['action'], 0)
+
+    def test_warm_start_matches_observe(self):
+        config = {'traffic_threshold': 50, 'deployment_threshold': 10}
+        traffic = np.array([[np.nan, 10, 20, 30], [1, 2, 3, 4]])
+        warmed = PlacementPredictor(config)
+        warmed.warm_start(['iad', 'cdg'], traffic)
+        observed = PlacementPredictor(config)
+        observed.observe({'cdg': 1})
+        for column in range(1, 4):
+            observed.observe({'iad': traffic[0, column], 'cdg': traffic[1, column]})
+        self.assertEqual(warmed.averages('iad'), observed.averages('iad'))
+        self.assertEqual(warmed.averages('cdg'), observed.averages('cdg'))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from automation.auto_placer import AutoPlacer
+from automation.placement_executor import FlyctlBackend, MachinesApiBackend, PlacementExecutor
+from automation.reconciler import NOOPS_SUPPRESSED, Reconciler
+from utils.state_manager import close_state_stores, load_deployment_state, save_deployment_state
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    name = 'fake'
+
+    def __init__(self, machines):
+        self.machines = dict(machines)
+        self.listings = 0
+        self.scaled = []
+
+    async def inventory(self):
+        self.listings += 1
+        await asyncio.sleep(0)
+        return dict(self.machines)
+
+    async def scale(self, region, count):
+        self.scaled.append((region, count))
+        self.machines[region] = count
+
+
+class FakeFetcher:
+    dry_run = False
+
+    def get_app_name(self):
+        return 'reconcile-app'
+
+
+class FakeMachinesClient:
+    def list_machines(self):
+        return [{'id': '1', 'region': 'iad'}, {'id': '2', 'region': 'iad'}, {'id': '3', 'region': 'cdg'}]
+
+
+class TestReconciler(unittest.IsolatedAsyncioTestCase):
+    async def test_inventory_is_cached_for_ttl(self):
+        backend = FakeBackend({'iad': 2, 'cdg': 0})
+        clock = FakeClock()
+        reconciler = Reconciler(backend.inventory, ttl=60, clock=clock)
+        results = await asyncio.gather(*(reconciler.inventory() for _ in range(5)))
+        self.assertEqual(results, [{'iad': 2}] * 5)
+        self.assertEqual(backend.listings, 1)
+
+        clock.now = 59
+        await reconciler.inventory()
+        self.assertEqual(backend.listings, 1)
+        clock.now = 60
+        await reconciler.inventory()
+        self.assertEqual(backend.listings, 2)
+        await reconciler.inventory(force=True)
+        self.assertEqual(backend.listings, 3)
+        self.assertEqual(reconciler.status()['refreshes'], 3)
+
+    async def test_plan_drops_noops(self):
+        reconciler = Reconciler(FakeBackend({}).inventory)
+        deploy_child = NOOPS_SUPPRESSED.labels('deploy')
+        before = deploy_child.value
+        deploy, remove, skipped = reconciler.plan(['iad', 'cdg'], ['lhr', 'fra'], {'iad': 1, 'lhr': 2})
+        self.assertEqual((deploy, remove), (['cdg'], ['lhr']))
+        self.assertEqual(skipped, [
+            {'region': 'iad', 'action': 'deploy', 'reason': 'already running'},
+            {'region': 'fra', 'action': 'remove', 'reason': 'not running'},
+        ])
+        self.assertEqual(deploy_child.value, before + 1)
+        self.assertEqual(reconciler.suppressed, 2)
+
+    async def test_apply_updates_or_invalidates_the_cache(self):
+        backend = FakeBackend({'iad': 1})
+        reconciler = Reconciler(backend.inventory, ttl=60, clock=FakeClock())
+        await reconciler.inventory()
+        reconciler.apply({'deployed': ['cdg'], 'removed': ['iad'], 'errors': []})
+        self.assertEqual(await reconciler.inventory(), {'cdg': 1})
+        self.assertEqual(backend.listings, 1)
+
+        reconciler.apply({'deployed': [], 'removed': [], 'errors': [{'region': 'lhr', 'action': 'deploy',
+                                                                     'error': 'timeout'}]})
+        self.assertIsNone(reconciler.status()['regions'])
+        self.assertEqual(await reconciler.inventory(), {'iad': 1})
+        self.assertEqual(backend.listings, 2)
+
+    async def test_failed_listing_is_not_cached(self):
+        async def broken():
+            raise RuntimeError('api down')
+        reconciler = Reconciler(broken)
+        with self.assertRaises(RuntimeError):
+            await reconciler.inventory()
+        self.assertFalse(reconciler.fresh)
+
+
+class TestBackendInventory(unittest.IsolatedAsyncioTestCase):
+    async def test_flyctl_counts_active_machines(self):
+        backend = FlyctlBackend(app='my-app')
+        listing = json.dumps([
+            {'id': '1', 'region': 'iad', 'state': 'started'},
+            {'id': '2', 'region': 'iad', 'state': 'stopped'},
+            {'id': '3', 'region': 'cdg', 'state': 'destroyed'},
+        ]).encode()
+        with patch.object(FlyctlBackend, '_run', return_value=listing) as run:
+            self.assertEqual(await backend.inventory(), {'iad': 2})
+        run.assert_called_once_with(['fly', 'machines', 'list', '--json', '--app', 'my-app'])
+
+    async def test_machines_api_counts_one_listing(self):
+        backend = MachinesApiBackend(FakeMachinesClient())
+        self.assertEqual(await backend.inventory(), {'iad': 2, 'cdg': 1})
+
+
+class TestPlacerReconciliation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch('utils.state_manager.DATA_DIR', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(close_state_stores)
+
+    def live_placer(self, backend):
+        config = {'dry_run': False, 'traffic_threshold': 50, 'deployment_threshold': 10, 'inventory_ttl': 300}
+        placer = AutoPlacer(config, metrics_fetcher=FakeFetcher())
+        placer.executors[None] = PlacementExecutor(backend=backend, dry_run=False)
+        return placer
+
+    async def test_steady_state_makes_no_mutating_calls(self):
+        backend = FakeBackend({'iad': 1})
+        placer = self.live_placer(backend)
+        actions = [('iad', 'scale_up'), ('cdg', 'scale_up'), ('fra', 'scale_down')]
+
+        result = await placer._execute_actions(actions, {})
+        self.assertEqual(backend.scaled, [('cdg', 1)])
+        self.assertEqual(result['actions_taken']['deployed'], ['cdg'])
+        self.assertEqual([entry['region'] for entry in result['actions_taken']['skipped']], ['iad', 'fra'])
+
+        for _ in range(3):
+            result = await placer._execute_actions(actions, load_deployment_state(dry_run=False))
+            self.assertEqual(result['updated_regions'], [])
+        self.assertEqual(backend.scaled, [('cdg', 1)])
+        self.assertEqual(backend.listings, 1)
+
+    async def test_state_drift_is_corrected_from_the_inventory(self):
+        # The recorded state says cdg is running, but its machine is gone
+        save_deployment_state({'cdg': None}, dry_run=False)
+        backend = FakeBackend({})
+        placer = self.live_placer(backend)
+        await placer._execute_actions([('cdg', 'scale_up')], load_deployment_state(dry_run=False))
+        self.assertEqual(backend.scaled, [('cdg', 1)])
+
+    async def test_listing_failure_falls_back_to_recorded_state(self):
+        backend = FakeBackend({})
+
+        async def broken():
+            raise RuntimeError('api down')
+        backend.inventory = broken
+        placer = self.live_placer(backend)
+        result = await placer._execute_actions([('iad', 'scale_up'), ('cdg', 'scale_up')], {'iad': None})
+        self.assertEqual(backend.scaled, [('cdg', 1)])
+        self.assertEqual(result['actions_taken']['skipped'][0]['region'], 'iad')
+
+if __name__ == '__main__':
+    unittest.main()
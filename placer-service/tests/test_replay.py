@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import numpy as np
+from automation import replay as replay_module
+from automation.replay import TrafficSeries, replay, simulate
+from prediction.placement_predictor import PlacementPredictor
+from utils.history_store import HistoryStore
+
+REGIONS = ['iad', 'cdg', 'lhr', 'fra', 'sfo', 'nrt']
+
+CONFIG = {
+    'dry_run': True,
+    'cooldown_period': 300,
+    'traffic_threshold': 50,
+    'deployment_threshold': 10,
+    'short_term_window': 2,
+    'long_term_window': 3,
+    'alpha_short': 0.9,
+    'alpha_long': 0.6,
+    'allowed_regions': [],
+    'excluded_regions': ['nrt'],
+    'always_running_regions': ['fra'],
+}
+
+
+def choppy_series(ticks=1200, seed=1):
+    """Traffic jumping between levels every few minutes, with gaps, so every rule gets exercised."""
+    rng = np.random.default_rng(seed)
+    levels = rng.choice([0, 5, 30, 200], size=(ticks // 4, len(REGIONS)))
+    traffic = (np.repeat(levels, 4, axis=0) + rng.poisson(3, size=(ticks, len(REGIONS)))).astype(float)
+    traffic[::7, REGIONS.index('lhr')] = np.nan
+    return TrafficSeries(np.arange(ticks) * 60.0, REGIONS, traffic)
+
+
+def live_placer_actions(series, config, flap_window=replay_module.DEFAULT_FLAP_WINDOW):
+    """The same run, one tick at a time through PlacementPredictor, as the placer loop would."""
+    predictor = PlacementPredictor(config)
+    managed = [region for region in series.regions if region not in config['excluded_regions']]
+    always = set(config['always_running_regions'])
+    deployed = {region: region in always for region in series.regions}
+    last = {region: (-np.inf, None) for region in series.regions}
+    actions = []
+    for timestamp, row in zip(series.timestamps.tolist(), series.traffic):
+        predictor.observe({region: value for region, value in zip(series.regions, row) if not np.isnan(value)},
+                          timestamp)
+        for decision in predictor.predict_smoothed(managed):
+            region, action = str(decision['region']), int(decision['action'])
+            if not action or (action == 1) == deployed[region] or (action == -1 and region in always):
+                continue
+            if timestamp - last[region][0] < config['cooldown_period']:
+                continue
+            flap = last[region][1] == -action and timestamp - last[region][0] < flap_window
+            actions.append((timestamp, region, 'scale_up' if action == 1 else 'scale_down', flap))
+            deployed[region] = action == 1
+            last[region] = (timestamp, action)
+    return actions
+
+
+class TestReplay(unittest.TestCase):
+    def test_matches_live_placer_decisions(self):
+        series = choppy_series()
+        for cooldown in (0, 300, 3000):
+            config = {**CONFIG, 'cooldown_period': cooldown}
+            report = replay(series, config)
+            log = [(a['timestamp'], a['region'], a['action'], a['flap']) for a in report.action_log()]
+            self.assertEqual(log, live_placer_actions(series, config))
+            self.assertGreater(len(log), 0)
+
+    def test_matches_live_placer_decisions_with_forecast(self):
+        series = choppy_series(ticks=900)
+        config = {**CONFIG, 'forecast_enabled': True, 'deploy_latency': 120, 'season_period': 3600,
+                  'tick_interval': 60, 'forecast_beta': 0.2}
+        report = replay(series, config)
+        log = [(a['timestamp'], a['region'], a['action'], a['flap']) for a in report.action_log()]
+        self.assertEqual(log, live_placer_actions(series, config))
+        self.assertNotEqual(log, [(a['timestamp'], a['region'], a['action'], a['flap'])
+                                  for a in replay(series, CONFIG).action_log()])
+
+    def test_cooldown_holds_back_actions(self):
+        series = choppy_series()
+        eager = replay(series, {**CONFIG, 'cooldown_period': 0})
+        patient = replay(series, {**CONFIG, 'cooldown_period': 3000})
+        self.assertLess(len(patient.actions), len(eager.actions))
+        self.assertLess(patient.flaps, eager.flaps)
+        self.assertGreater(patient.skipped_cooldown, 0)
+        self.assertEqual(eager.skipped_cooldown, 0)
+        for region in range(len(REGIONS)):
+            times = patient.actions['timestamp'][patient.actions['region'] == region]
+            self.assertTrue((np.diff(times) >= 3000).all())
+
+    def test_region_rules_and_cost(self):
+        series = choppy_series(ticks=600)
+        report = replay(series, CONFIG)
+        summary = report.summary()
+        self.assertEqual(summary['regions']['nrt']['deploys'], 0)
+        self.assertEqual(summary['regions']['nrt']['under_provisioned_minutes'], 0)
+        self.assertEqual(summary['regions']['fra']['removals'], 0)
+        self.assertEqual(summary['regions']['fra']['hours_deployed'], 10.0)
+        self.assertIn('fra', summary['final_regions'])
+        self.assertAlmostEqual(summary['machine_hours'],
+                               sum(region['hours_deployed'] for region in summary['regions'].values()), places=2)
+        self.assertEqual(summary['actions'], summary['deploys'] + summary['removals'])
+
+    def test_always_running_region_without_traffic_is_billed(self):
+        series = TrafficSeries([0, 60, 120], ['iad'], [[1], [2], [3]])
+        report = replay(series, {**CONFIG, 'always_running_regions': ['ams']})
+        self.assertEqual(report.summary()['regions']['ams']['hours_deployed'], 0.05)
+
+    def test_under_provisioned_until_deployed(self):
+        traffic = np.array([[5.0]] * 10 + [[500.0]] * 10)
+        series = TrafficSeries(np.arange(20) * 60.0, ['iad'], traffic)
+        report = replay(series, {**CONFIG, 'always_running_regions': []})
+        first_deploy = report.actions['timestamp'][0]
+        self.assertEqual(report.action_log()[0]['action'], 'scale_up')
+        self.assertEqual(report.under_provisioned_minutes, (first_deploy - 600) / 60)
+        self.assertEqual(report.final_regions, ['iad'])
+
+    def test_simulate_many_configs_matches_single_runs(self):
+        series = choppy_series(ticks=800)
+        configs = [
+            CONFIG,
+            {**CONFIG, 'alpha_long': 0.2, 'long_term_window': 10},
+            {**CONFIG, 'traffic_threshold': 100, 'cooldown_period': 60},
+            {**CONFIG, 'alpha_short': 0.7},
+        ]
+        for config, report in zip(configs, simulate(series, configs)):
+            single = replay(series, config)
+            np.testing.assert_array_equal(report.actions, single.actions)
+            np.testing.assert_array_equal(report.deployed_seconds, single.deployed_seconds)
+
+    def test_empty_series(self):
+        report = replay(TrafficSeries([], REGIONS, np.empty((0, len(REGIONS)))), CONFIG)
+        self.assertEqual(report.summary()['actions'], 0)
+        self.assertEqual(report.final_regions, ['fra'])
+
+
+class TestTrafficSeries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_legacy_json(self):
+        path = os.path.join(self.tmp.name, 'traffic_history.json')
+        with open(path, 'w') as f:
+            json.dump({
+                '2024-10-22T22:28:00+00:00': {'iad': 3, 'cdg': 4},
+                '2024-10-22T22:27:00+00:00': {'iad': 1},
+            }, f)
+        series = TrafficSeries.load(path)
+        self.assertEqual(series.regions, ['cdg', 'iad'])
+        np.testing.assert_array_equal(series.traffic, [[np.nan, 1], [4, 3]])
+        self.assertEqual(series.step(), 60)
+
+    def test_history_store_and_npz_round_trip(self):
+        store_dir = os.path.join(self.tmp.name, 'traffic_history')
+        store = HistoryStore(store_dir, window=8)
+        store.extend('iad', [60, 120, 180], [1, 2, 3])
+        store.extend('cdg', [120, 180], [5, 6])
+        store.close()
+
+        series = TrafficSeries.load(store_dir)
+        self.assertEqual(series.regions, ['cdg', 'iad'])
+        np.testing.assert_array_equal(series.timestamps, [60, 120, 180])
+        np.testing.assert_array_equal(series.traffic, [[np.nan, 1], [5, 2], [6, 3]])
+
+        export = os.path.join(self.tmp.name, 'export.npz')
+        series.save(export)
+        loaded = TrafficSeries.load(export)
+        self.assertEqual(loaded.regions, series.regions)
+        np.testing.assert_array_equal(loaded.traffic, series.traffic)
+
+    def test_cli_writes_report(self):
+        export = os.path.join(self.tmp.name, 'export.npz')
+        choppy_series(ticks=300).save(export)
+        config_path = os.path.join(self.tmp.name, 'config.yml')
+        with open(config_path, 'w') as f:
+            json.dump(CONFIG, f)
+        output = os.path.join(self.tmp.name, 'report.json')
+        with redirect_stdout(io.StringIO()):
+            replay_module.main([export, '--config', config_path, '--json', output, '--actions'])
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(report['ticks'], 300)
+        self.assertEqual(len(report['action_log']), report['actions'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import unittest
+from automation.scheduler import PlacerScheduler
+from utils.single_flight import SingleFlight
+
+class TestPlacerScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_ticks_periodically(self):
+        calls = []
+
+        async def tick():
+            calls.append(asyncio.get_running_loop().time())
+            return {'ok': True}
+
+        scheduler = PlacerScheduler(tick, interval=0.05, jitter=0)
+        scheduler.start()
+        await asyncio.sleep(0.23)
+        await scheduler.stop()
+
+        self.assertGreaterEqual(len(calls), 4)
+        self.assertLessEqual(len(calls), 6)
+        status = scheduler.status()
+        self.assertEqual(status['ticks'], len(calls))
+        self.assertEqual(status['last_tick']['status'], 'success')
+        self.assertEqual(scheduler.last_result, {'ok': True})
+        self.assertFalse(status['running'])
+
+    async def test_skips_while_previous_tick_runs_and_counts_overruns(self):
+        started = []
+
+        async def slow_tick():
+            started.append(1)
+            await asyncio.sleep(0.12)
+
+        scheduler = PlacerScheduler(slow_tick, interval=0.05, jitter=0)
+        scheduler.start()
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+
+        self.assertGreater(scheduler.skipped, 0)
+        self.assertGreater(scheduler.overruns, 0)
+        self.assertTrue(all(tick['overrun'] for tick in scheduler.ticks if tick['status'] == 'success'))
+        self.assertLess(len(started), 5)
+
+    async def test_tick_errors_do_not_stop_the_loop(self):
+        async def failing_tick():
+            raise RuntimeError("prometheus down")
+
+        scheduler = PlacerScheduler(failing_tick, interval=0.03, jitter=0)
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        self.assertTrue(scheduler.running)
+        await scheduler.stop()
+        self.assertEqual(scheduler.ticks[0]['status'], 'error')
+        self.assertEqual(scheduler.ticks[0]['error'], 'prometheus down')
+
+    async def test_wake_in_runs_an_extra_tick(self):
+        calls = []
+
+        async def tick():
+            calls.append(asyncio.get_running_loop().time())
+
+        scheduler = PlacerScheduler(tick, interval=10, jitter=0)
+        scheduler.start()
+        await asyncio.sleep(0.02)
+        self.assertEqual(len(calls), 1)
+        scheduler.wake_in(0.5)
+        scheduler.wake_in(0.05)
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(scheduler.wakeups, 1)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.05)
+
+    async def test_wake_within_trigger_debounce_still_ticks(self):
+        calls = []
+
+        async def tick():
+            calls.append(1)
+            return len(calls)
+
+        # Wired as in main: /trigger shares the flight and is debounced, the scheduler isn't
+        flight = SingleFlight(tick, debounce=60)
+        scheduler = PlacerScheduler(functools.partial(flight, force=True), interval=10, jitter=0)
+        scheduler.start()
+        await asyncio.sleep(0.02)
+        scheduler.wake_in(0)
+        await asyncio.sleep(0.05)
+        self.assertEqual(await flight(), 2)
+        await scheduler.stop()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(scheduler.last_result, 2)
+        self.assertEqual(flight.stats()['debounced'], 1)
+
+    def test_rejects_non_positive_interval(self):
+        with self.assertRaises(ValueError):
+            PlacerScheduler(None, interval=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+from utils.single_flight import SingleFlight, EXECUTED, JOINED, DEBOUNCED
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        calls = []
+
+        async def tick():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'tick': len(calls)}
+
+        flight = SingleFlight(tick)
+        results = await asyncio.gather(*(flight.run() for _ in range(5)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({id(result) for result, _ in results}, {id(results[0][0])})
+        self.assertEqual(sorted(source for _, source in results), [EXECUTED] + [JOINED] * 4)
+
+    async def test_debounce_window_reuses_last_result(self):
+        clock = FakeClock()
+        calls = []
+
+        async def tick():
+            calls.append(1)
+            return len(calls)
+
+        flight = SingleFlight(tick, debounce=5, clock=clock)
+        self.assertEqual(await flight.run(), (1, EXECUTED))
+        clock.now = 4.9
+        self.assertEqual(await flight.run(), (1, DEBOUNCED))
+        clock.now = 5.1
+        self.assertEqual(await flight.run(), (2, EXECUTED))
+        flight.invalidate()
+        self.assertEqual(await flight(), 3)
+        self.assertEqual(flight.stats()[DEBOUNCED], 1)
+        self.assertEqual(await flight.run(force=True), (4, EXECUTED))
+
+    async def test_errors_propagate_to_joiners_and_are_not_cached(self):
+        attempts = []
+
+        async def tick():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise RuntimeError("flyctl failed")
+            return 'ok'
+
+        flight = SingleFlight(tick, debounce=60)
+        results = await asyncio.gather(flight(), flight(), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(await flight(), 'ok')
+
+    async def test_cancelled_caller_does_not_cancel_execution(self):
+        async def tick():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        flight = SingleFlight(tick)
+        impatient = asyncio.ensure_future(flight())
+        await asyncio.sleep(0.01)
+        patient = asyncio.ensure_future(flight())
+        impatient.cancel()
+        self.assertEqual(await patient, 'done')
+
+    async def test_cancel_stops_the_shielded_execution(self):
+        stopped = []
+
+        async def tick():
+            try:
+                await asyncio.sleep(10)
+            finally:
+                stopped.append(1)
+
+        flight = SingleFlight(tick)
+        caller = asyncio.ensure_future(flight())
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        # Cancelling the caller (as PlacerScheduler.stop does) leaves the execution running
+        self.assertEqual(stopped, [])
+        await flight.cancel()
+        self.assertEqual(stopped, [1])
+        self.assertFalse(flight.stats()['in_flight'])
+        await flight.cancel()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import unittest
+import httpx
+import numpy as np
+import main
+from monitoring.clients import ClientWindows
+from monitoring.ingest import TrafficWindows
+from prediction.placement_predictor import ACTION_NAMES, PlacementPredictor
+from utils.config_loader import ConfigError, validate_config
+from utils.sketches import CountMinSketch, HeavyHitters, HyperLogLog, hash_array
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimate_is_within_a_few_percent(self):
+        for n in (100, 10_000, 100_000):
+            hll = HyperLogLog()
+            hll.add_hashes(hash_array([f"10.0.{i}" for i in range(n)]))
+            self.assertAlmostEqual(hll.count() / n, 1, delta=0.05, msg=n)
+
+    def test_duplicates_do_not_count(self):
+        hll = HyperLogLog()
+        for _ in range(5):
+            hll.add_hashes(hash_array([f"client-{i}" for i in range(1000)]))
+        self.assertAlmostEqual(hll.count(), 1000, delta=50)
+
+    def test_merge_is_the_union(self):
+        left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        left.add_hashes(hash_array([f"c{i}" for i in range(0, 6000)]))
+        right.add_hashes(hash_array([f"c{i}" for i in range(4000, 10000)]))
+        both.add_hashes(hash_array([f"c{i}" for i in range(10000)]))
+        self.assertEqual(left.merge(right).count(), both.count())
+        with self.assertRaises(ValueError):
+            left.merge(HyperLogLog(precision=10))
+
+
+class TestCountMinSketch(unittest.TestCase):
+    def test_never_undercounts(self):
+        rng = np.random.default_rng(7)
+        items = [f"ip-{i}" for i in range(2000)]
+        counts = rng.integers(1, 50, size=len(items)).astype(float)
+        sketch = CountMinSketch(width=256, depth=4)
+        hashes = hash_array(items)
+        sketch.add_hashes(hashes, counts)
+        estimates = sketch.estimate_hashes(hashes)
+        self.assertTrue((estimates >= counts).all())
+        self.assertEqual(sketch.total, counts.sum())
+
+    def test_merge_adds_counts(self):
+        hashes = hash_array(['a', 'b'])
+        left, right = CountMinSketch(), CountMinSketch()
+        left.add_hashes(hashes, np.array([3.0, 1.0]))
+        right.add_hashes(hashes, np.array([2.0, 4.0]))
+        self.assertEqual(left.merge(right).estimate_hashes(hashes).tolist(), [5.0, 5.0])
+
+
+class TestHeavyHitters(unittest.TestCase):
+    def test_finds_a_client_spread_over_batches(self):
+        heavy = HeavyHitters(k=3)
+        for batch in range(20):
+            items = [f"user-{batch}-{i}" for i in range(100)] + ['bot']
+            counts = np.ones(len(items))
+            counts[-1] = 10
+            heavy.add(items, hash_array(items), counts)
+        top = heavy.top()
+        self.assertEqual(len(top), 3)
+        self.assertEqual(top[0][0], 'bot')
+        self.assertGreaterEqual(top[0][1], 200)
+
+    def test_merge_keeps_the_overall_top(self):
+        left, right = HeavyHitters(k=1), HeavyHitters(k=1)
+        left.add(['a', 'b'], hash_array(['a', 'b']), np.array([5.0, 4.0]))
+        right.add(['b', 'c'], hash_array(['b', 'c']), np.array([4.0, 1.0]))
+        self.assertEqual(left.merge(right).top()[0][0], 'b')
+
+
+class TestClientWindows(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.clients = ClientWindows(window=10, windows=5, clock=self.clock)
+
+    def test_sliding_window_expires_old_clients(self):
+        for i in range(100):
+            self.clients.add(None, 'iad', f"a{i}")
+        self.clock.now += 6
+        for i in range(50):
+            self.clients.add(None, 'iad', f"b{i}", count=2)
+        summary = self.clients.summary(None, 'iad')
+        self.assertAlmostEqual(summary['clients'], 150, delta=5)
+        self.assertEqual(summary['requests'], 200)
+        self.clock.now += 6
+        summary = self.clients.summary(None, 'iad')
+        self.assertAlmostEqual(summary['clients'], 50, delta=3)
+        self.clock.now += 100
+        self.assertIsNone(self.clients.summary(None, 'iad'))
+        self.assertEqual(self.clients.summaries(), {})
+
+    def test_large_batches_flush_into_the_sketches(self):
+        for i in range(10_000):
+            self.clients.add(None, 'cdg', f"ip-{i}")
+        self.clients.add(None, 'cdg', 'crawler', count=5000)
+        summary = self.clients.summaries()[None]['cdg']
+        self.assertAlmostEqual(summary['clients'] / 10_001, 1, delta=0.05)
+        self.assertEqual(summary['top'][0][0], 'crawler')
+
+    def test_memory_is_bounded_by_region_count(self):
+        clients = ClientWindows(window=10, max_regions=1, clock=self.clock)
+        self.assertTrue(clients.add('web', 'iad', 'x'))
+        self.assertFalse(clients.add('web', 'cdg', 'x'))
+        self.assertEqual(list(clients.summaries()['web']), ['iad'])
+
+
+class TestIngestedClients(unittest.TestCase):
+    def test_events_with_a_client_are_sketched(self):
+        clock = FakeClock()
+        windows = TrafficWindows.from_config({'ingest_window': 10, 'client_top_k': 2}, clock=clock)
+        windows.ingest([{'region': 'iad', 'ip': '1.2.3.4', 'count': 9}, {'region': 'iad', 'client': 'u1'},
+                        {'region': 'iad'}, {'region': 'lhr', 'ip': ['x']}])
+        self.assertEqual(windows.snapshot(), {None: {'iad': 11, 'lhr': 1}})
+        summary = windows.clients.summaries()[None]['iad']
+        self.assertEqual(round(summary['clients']), 2)
+        self.assertEqual(summary['top'][0], ('1.2.3.4', 9.0))
+        self.assertNotIn('lhr', windows.clients.summaries()[None])
+
+
+    def test_sketches_start_with_the_first_client_event(self):
+        windows = TrafficWindows.from_config({'ingest_window': 10}, clock=FakeClock())
+        windows.ingest([{'region': 'iad'}, {'region': 'cdg', 'count': 4}])
+        self.assertIsNone(windows.clients)
+        windows.ingest([{'region': 'iad', 'ip': '1.2.3.4'}])
+        self.assertEqual(round(windows.clients.summaries()[None]['iad']['clients']), 1)
+        # Built directly without a client config, events naming a client are counted but not sketched
+        plain = TrafficWindows(window=10, clock=FakeClock())
+        self.assertTrue(plain.add('iad', client='1.2.3.4'))
+        self.assertIsNone(plain.clients)
+
+
+class TestClientsEndpoint(unittest.IsolatedAsyncioTestCase):
+    async def test_empty_until_a_client_event_arrives(self):
+        main.app.state.ingest = TrafficWindows.from_config({'ingest_window': 10}, clock=FakeClock())
+        self.addCleanup(main.app.state._state.clear)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            self.assertEqual((await client.get('/ingest/clients')).json(), {})
+            main.app.state.ingest.ingest({'region': 'iad', 'client': 'u1', 'count': 3})
+            summary = (await client.get('/ingest/clients')).json()
+        self.assertEqual(summary['iad']['requests'], 3)
+
+
+class TestPredictorClientWeighting(unittest.TestCase):
+    def config(self, **overrides):
+        return {'traffic_threshold': 100, 'deployment_threshold': 10, 'short_term_window': 1,
+                'alpha_short': 1, 'alpha_long': 1, **overrides}
+
+    def summaries(self):
+        return {
+            'iad': {'clients': 1.0, 'requests': 500.0, 'top': [('bot', 495.0), ('u1', 5.0)]},
+            'cdg': {'clients': 400.0, 'requests': 500.0, 'top': [('u2', 3.0)]},
+        }
+
+    def test_request_cap_discounts_heavy_clients(self):
+        predictor = PlacementPredictor(self.config(client_request_cap=20))
+        weighted = predictor.weight_by_clients({'iad': 500.0, 'cdg': 500.0, 'fra': 300.0}, self.summaries())
+        self.assertEqual(weighted, {'iad': 25.0, 'cdg': 500.0, 'fra': 300.0})
+        self.assertEqual(predictor.unique_clients, {'iad': 1.0, 'cdg': 400.0})
+
+    def test_without_a_cap_traffic_is_unchanged(self):
+        predictor = PlacementPredictor(self.config())
+        snapshot = {'iad': 500.0}
+        self.assertEqual(predictor.weight_by_clients(snapshot, self.summaries()), snapshot)
+
+    def test_min_unique_clients_gates_scale_up(self):
+        predictor = PlacementPredictor(self.config(min_unique_clients=50))
+        for _ in range(9):
+            predictor.observe({'iad': 50.0, 'cdg': 50.0, 'fra': 50.0})
+        # fra has no client events, so it isn't gated
+        predictor.observe(predictor.weight_by_clients({'iad': 500.0, 'cdg': 500.0, 'fra': 500.0},
+                                                      self.summaries()))
+        decisions = predictor.predict_smoothed(['iad', 'cdg', 'fra'])
+        actions = {str(d['region']): ACTION_NAMES[int(d['action'])] for d in decisions}
+        self.assertEqual(actions, {'iad': None, 'cdg': 'scale_up', 'fra': 'scale_up'})
+
+    def test_config_validation(self):
+        base = {'dry_run': True, 'cooldown_period': 60, 'traffic_threshold': 100, 'deployment_threshold': 10}
+        validate_config({**base, 'client_request_cap': None, 'min_unique_clients': 0, 'client_top_k': 10,
+                         'client_sketch_precision': 11})
+        for bad in ({'client_request_cap': 0}, {'min_unique_clients': -1}, {'client_top_k': 0},
+                    {'client_sketch_precision': 20}):
+            with self.assertRaises(ConfigError, msg=bad):
+                validate_config({**base, **bad})
+
+
+if __name__ == '__main__':
+    unittest.main()
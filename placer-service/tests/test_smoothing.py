@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from prediction.smoothing import RollingStats, SmoothingEngine
+
+class TestRollingStats(unittest.TestCase):
+    def test_matches_numpy_over_sliding_window(self):
+        rng = np.random.default_rng(7)
+        stats = RollingStats(window=10)
+        values = rng.gamma(2.0, 30.0, size=(200, 3))
+        for i, row in enumerate(values):
+            stats.push(['iad', 'cdg', 'fra'], row)
+            mean, std, size = stats.stats(['iad', 'cdg', 'fra'])
+            window = values[max(0, i - 9):i + 1]
+            np.testing.assert_allclose(mean, window.mean(axis=0), rtol=1e-9)
+            np.testing.assert_allclose(std, window.std(axis=0), rtol=1e-7, atol=1e-9)
+            self.assertEqual(size[0], min(i + 1, 10))
+
+    def test_unknown_keys(self):
+        stats = RollingStats(window=5)
+        stats.push(['iad'], [4.0])
+        mean, std, size = stats.stats(['iad', 'sin'])
+        self.assertEqual(mean[0], 4.0)
+        self.assertTrue(np.isnan(mean[1]))
+        self.assertEqual(list(std), [0, 0])
+        self.assertEqual(list(size), [1, 0])
+
+class TestSmoothingEngine(unittest.TestCase):
+    def test_ewma_starts_as_running_mean(self):
+        engine = SmoothingEngine(alpha_short=0.3, alpha_long=0.1)
+        engine.update(['iad'], [10])
+        engine.update(['iad'], [20])
+        averages = engine.averages('iad')
+        self.assertAlmostEqual(averages['short'], 15)
+        self.assertAlmostEqual(averages['long'], 15)
+        self.assertEqual(averages['samples'], 2)
+
+    def test_ewma_uses_configured_alpha(self):
+        engine = SmoothingEngine.from_config({'alpha_short': 0.5, 'alpha_long': 0.25})
+        for value in [0, 0, 0, 0]:
+            engine.update(['iad'], [value])
+        engine.update(['iad'], [100])
+        averages = engine.averages('iad')
+        self.assertAlmostEqual(averages['short'], 50)
+        self.assertAlmostEqual(averages['long'], 25)
+        with self.assertRaises(ValueError):
+            engine.configure({'alpha_short': 0.5, 'alpha_long': 0})
+        with self.assertRaises(ValueError):
+            engine.configure({'alpha_short': 2, 'alpha_long': 0.5})
+        # A rejected reload changes neither alpha
+        self.assertEqual((engine.alpha_short, engine.alpha_long), (0.5, 0.25))
+
+    def test_short_average_is_never_slower_than_long(self):
+        engine = SmoothingEngine(alpha_short=0.1, alpha_long=0.5)
+        for value in [0, 0, 0, 100]:
+            engine.update(['iad'], [value])
+        averages = engine.averages('iad')
+        self.assertEqual(averages['short'], averages['long'])
+
+    def test_many_regions_grow_state(self):
+        engine = SmoothingEngine()
+        regions = [f'r{i}' for i in range(50)]
+        engine.update(regions, np.arange(50))
+        short, long, samples = engine.snapshot(regions + ['unknown'])
+        np.testing.assert_array_equal(long[:50], np.arange(50))
+        self.assertTrue(np.isnan(long[50]))
+        self.assertEqual(samples[50], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestLazyStartup(unittest.TestCase):
+    def import_in_fresh_interpreter(self, module):
+        code = (
+            "import json, logging, sys\n"
+            f"import {module}\n"
+            "handlers = logging.getLogger('automation.auto_placer').handlers\n"
+            "print(json.dumps({'modules': sorted(sys.modules), 'handlers': len(handlers)}))\n"
+        )
+        output = subprocess.run([sys.executable, '-c', code], cwd=SERVICE_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def test_importing_main_defers_heavy_dependencies(self):
+        result = self.import_in_fresh_interpreter('main')
+        for module in ('numpy', 'httpx', 'requests'):
+            self.assertNotIn(module, result['modules'])
+
+    def test_importing_auto_placer_has_no_side_effects(self):
+        result = self.import_in_fresh_interpreter('automation.auto_placer')
+        self.assertEqual(result['handlers'], 0)
+        self.assertNotIn('numpy', result['modules'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,45 +1,134 @@
-import unittest
-from unittest.mock import mock_open, patch
-from utils.state_manager import load_deployment_state, save_deployment_state
 import json
-from utils.config_loader import Config
-
-config = Config.get_config()
-DRY_RUN = config['dry_run']
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from utils.state_manager import (close_state_stores, get_deployment_state_file, get_legacy_state_file,
+                                 get_state_store, load_deployment_state, record_placement_results,
+                                 save_deployment_state)
+from utils.state_store import StateStore
 
 class TestStateManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch('utils.state_manager.DATA_DIR', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(close_state_stores)
+
+    def write_legacy(self, data, dry_run=True):
+        with open(get_legacy_state_file(dry_run), 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+
     def test_load_deployment_state_dict_format(self):
-        # Mock data in new dict format with timestamps
-        mock_data = json.dumps({'iad': '2024-10-01T08:30:00Z', 'cdg': None})
-        with patch('builtins.open', mock_open(read_data=mock_data)) as mocked_file:
-            with patch('os.path.exists') as mocked_exists:
-                mocked_exists.return_value = True
-                state = load_deployment_state(dry_run=DRY_RUN)
-                self.assertEqual(state, {'iad': '2024-10-01T08:30:00Z', 'cdg': None})
+        # Legacy JSON in dict format with timestamps is migrated on first load
+        self.write_legacy({'iad': '2024-10-01T08:30:00Z', 'cdg': None})
+        state = load_deployment_state(dry_run=True)
+        self.assertEqual(state, {'iad': '2024-10-01T08:30:00Z', 'cdg': None})
+        self.assertFalse(os.path.exists(get_legacy_state_file(True)))
+        self.assertTrue(os.path.exists(get_legacy_state_file(True) + '.migrated'))
 
     def test_load_deployment_state_list_format(self):
-        # Mock data in old list format
-        mock_data = json.dumps(['iad', 'cdg'])
-        with patch('builtins.open', mock_open(read_data=mock_data)) as mocked_file:
-            with patch('os.path.exists') as mocked_exists:
-                mocked_exists.return_value = True
-                state = load_deployment_state(dry_run=DRY_RUN)
-                self.assertEqual(state, {'iad': None, 'cdg': None})
+        # Legacy JSON in the old list format
+        self.write_legacy(['iad', 'cdg'])
+        state = load_deployment_state(dry_run=True)
+        self.assertEqual(state, {'iad': None, 'cdg': None})
+
+    def test_invalid_legacy_file_is_kept(self):
+        self.write_legacy('{"iad": "2024-10-01')
+        self.assertEqual(load_deployment_state(dry_run=True), {})
+        self.assertTrue(os.path.exists(get_legacy_state_file(True)))
 
     def test_load_deployment_state_no_file(self):
-        with patch('os.path.exists') as mocked_exists:
-            mocked_exists.return_value = False
-            state = load_deployment_state(dry_run=DRY_RUN)
-            self.assertEqual(state, {})
+        self.assertEqual(load_deployment_state(dry_run=True), {})
+        self.assertEqual(load_deployment_state(dry_run=False), {})
 
     def test_save_deployment_state(self):
         test_state = {'iad': '2024-10-01T08:30:00Z', 'cdg': None}
-        with patch('builtins.open', mock_open()) as mocked_file:
-            with patch('os.makedirs') as mocked_makedirs:
-                save_deployment_state(test_state)
-                mocked_file.assert_called_with('data/deployment_state.json', 'w')
-                file_handle = mocked_file()
-                file_handle.write.assert_called_once_with(json.dumps(test_state, indent=2))
+        save_deployment_state(test_state)
+        self.assertEqual(load_deployment_state(), test_state)
+        save_deployment_state({'ams': None})
+        self.assertEqual(load_deployment_state(), {'ams': None})
+        # Dry-run and live state don't mix
+        self.assertEqual(load_deployment_state(dry_run=True), {})
+        with sqlite3.connect(get_deployment_state_file(False)) as conn:
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_loaded_state_is_a_copy(self):
+        save_deployment_state({'iad': None}, dry_run=True)
+        load_deployment_state(dry_run=True)['cdg'] = None
+        self.assertEqual(load_deployment_state(dry_run=True), {'iad': None})
+
+    def test_record_placement_results(self):
+        save_deployment_state({'iad': '2024-10-01T08:30:00+00:00', 'lhr': None}, dry_run=True)
+        when = datetime(2024, 10, 2, tzinfo=timezone.utc)
+        state = record_placement_results({
+            'deployed': ['cdg'],
+            'removed': ['iad'],
+            'skipped': [],
+            'errors': [{'region': 'fra', 'action': 'deploy', 'error': 'boom'}],
+        }, dry_run=True, timestamp=when)
+        self.assertEqual(state, {'lhr': None, 'cdg': when.isoformat()})
+        self.assertEqual(load_deployment_state(dry_run=True), state)
+        journal = get_state_store(True).actions()
+        self.assertEqual(sorted((e['region'], e['action'], e['result']) for e in journal),
+                         [('cdg', 'deploy', 'success'), ('fra', 'deploy', 'error'), ('iad', 'remove', 'success')])
+        self.assertEqual(get_state_store(True).last_action('fra')['error'], 'boom')
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'state.db')
+        self.store = StateStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def test_last_action_per_region(self):
+        for timestamp, region, action in ((10, 'iad', 'deploy'), (20, 'cdg', 'deploy'), (30, 'iad', 'remove'),
+                                          (40, 'iad', 'deploy')):
+            self.store.record_action(region, action, timestamp=timestamp)
+        self.store.record_action('iad', 'remove', result='error', timestamp=50, error='timeout')
+
+        self.assertEqual(self.store.last_action('iad')['result'], 'error')
+        self.assertEqual(self.store.last_action('iad', result='success')['timestamp'], 40)
+        self.assertIsNone(self.store.last_action('ams'))
+        last = self.store.last_actions(result='success')
+        self.assertEqual({region: entry['action'] for region, entry in last.items()},
+                         {'iad': 'deploy', 'cdg': 'deploy'})
+        self.assertEqual([e['timestamp'] for e in self.store.actions(region='iad', since=20, until=50)], [40, 30])
+        self.assertEqual(len(self.store.actions(limit=2)), 2)
+        plan = sqlite3.connect(self.path).execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM actions WHERE region = ? ORDER BY timestamp DESC LIMIT 1',
+            ('iad',)).fetchall()
+        self.assertIn('actions_region_time', ' '.join(str(row) for row in plan))
+
+    def test_failed_write_rolls_back(self):
+        self.store.save_state({'iad': None})
+        with self.assertRaises(Exception):
+            self.store.save_state({'cdg': None, 'lhr': object()})
+        self.assertEqual(self.store.load_state(), {'iad': None})
+        self.assertEqual(StateStore(self.path).load_state(), {'iad': None})
+
+    def test_reads_see_writes_from_other_connections(self):
+        other = StateStore(self.path)
+        self.addCleanup(other.close)
+        self.assertEqual(self.store.load_state(), {})
+        other.save_state({'iad': None})
+        self.assertEqual(self.store.load_state(), {'iad': None})
+
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(self.store.load_state()))
+        thread.start()
+        thread.join()
+        self.store.record_results({'deployed': ['cdg'], 'removed': [], 'errors': []})
+        self.assertEqual(seen, [{'iad': None}])
+        self.assertEqual(set(other.load_state()), {'iad', 'cdg'})
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
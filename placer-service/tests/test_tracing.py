@@ -0,0 +1,122 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from automation.auto_placer import AutoPlacer
+from utils.history_manager import close_history_stores
+from utils.state_manager import close_state_stores
+from utils.tracing import STAGE_DURATION, TickTracer
+
+
+def busy_work():
+    return sum(i * i for i in range(20000))
+
+
+class TestTickTracer(unittest.IsolatedAsyncioTestCase):
+    def test_spans_and_history(self):
+        tracer = TickTracer(history=2)
+        for _ in range(3):
+            trace = tracer.start()
+            with trace.span('fetch'):
+                pass
+            with trace.span('predict'):
+                busy_work()
+            tracer.finish(trace, 'success')
+        ticks = tracer.recent()
+        self.assertEqual(len(ticks), 2)
+        self.assertEqual([span['stage'] for span in ticks[-1]['spans']], ['fetch', 'predict'])
+        fetch, predict = ticks[-1]['spans']
+        self.assertLessEqual(fetch['start'] + fetch['duration'], predict['start'])
+        self.assertLessEqual(predict['start'] + predict['duration'], ticks[-1]['duration'])
+        self.assertFalse(ticks[-1]['profiled'])
+        tracer.resize(5)
+        self.assertEqual(len(tracer.recent()), 2)
+
+    def test_failed_stage_is_still_recorded(self):
+        tracer = TickTracer()
+        trace = tracer.start()
+        with self.assertRaises(KeyError):
+            with trace.span('load_state'):
+                raise KeyError('boom')
+        tracer.finish(trace, 'error')
+        tick = tracer.recent()[0]
+        self.assertEqual(tick['status'], 'error')
+        self.assertEqual(tick['spans'][0]['stage'], 'load_state')
+
+    def test_stage_durations_are_exported(self):
+        child = STAGE_DURATION.labels('tracing_test_stage')
+        before = child.count
+        tracer = TickTracer()
+        trace = tracer.start()
+        with trace.span('tracing_test_stage'):
+            pass
+        tracer.finish(trace, 'success')
+        self.assertEqual(child.count, before + 1)
+
+    async def test_profile_next_tick(self):
+        tracer = TickTracer()
+        profile = asyncio.ensure_future(tracer.profile_next(timeout=5, sort='tottime', limit=5))
+        await asyncio.sleep(0)
+        self.assertTrue(tracer.profile_pending)
+        with self.assertRaises(RuntimeError):
+            await tracer.profile_next()
+
+        trace = tracer.start()
+        with trace.span('predict'):
+            busy_work()
+        tracer.finish(trace, 'success')
+        report = await profile
+
+        self.assertIn('busy_work', report['stats'])
+        self.assertTrue(report['tick']['profiled'])
+        self.assertEqual(report['tick']['spans'][0]['stage'], 'predict')
+        self.assertFalse(tracer.profile_pending)
+        # The tick after that runs unprofiled
+        trace = tracer.start()
+        tracer.finish(trace, 'success')
+        self.assertFalse(tracer.recent()[-1]['profiled'])
+
+    async def test_profile_times_out_without_a_tick(self):
+        tracer = TickTracer()
+        with self.assertRaises(asyncio.TimeoutError):
+            await tracer.profile_next(timeout=0.01)
+        self.assertFalse(tracer.profile_pending)
+        with self.assertRaises(ValueError):
+            await tracer.profile_next(sort='fastest')
+
+
+class FakeFetcher:
+    dry_run = True
+
+    def get_app_name(self):
+        return 'trace-app'
+
+
+class TestPlacerStages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = patch('utils.state_manager.DATA_DIR', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(close_history_stores)
+        self.addCleanup(close_state_stores)
+
+    async def test_tick_records_each_stage(self):
+        config = {'dry_run': True, 'traffic_threshold': 50, 'deployment_threshold': 10, 'short_term_window': 1,
+                  'backfill_enabled': False, 'trace_history': 3}
+        placer = AutoPlacer(config, metrics_fetcher=FakeFetcher())
+        traffic = {'iad': 100.0, 'cdg': 1.0}
+        with patch('automation.auto_placer.collect_region_traffic_async', return_value=traffic):
+            for _ in range(4):
+                await placer.process_traffic_data()
+        ticks = placer.tracer.recent()
+        self.assertEqual(len(ticks), 3)
+        self.assertEqual([span['stage'] for span in ticks[-1]['spans']],
+                         ['refresh_config', 'fetch_traffic', 'update_history', 'predict', 'load_state',
+                          'update_placements'])
+        self.assertEqual(ticks[-1]['status'], 'success')
+
+if __name__ == '__main__':
+    unittest.main()
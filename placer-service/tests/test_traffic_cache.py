@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from utils.traffic_cache import TrafficCache, etag_matches
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CountingFetch:
+    def __init__(self, delay=0, fail=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("prometheus unavailable")
+        return {'iad': float(self.calls)}
+
+class TestTrafficCache(unittest.IsolatedAsyncioTestCase):
+    async def test_fresh_entries_are_served_from_cache(self):
+        clock = FakeClock()
+        fetch = CountingFetch()
+        cache = TrafficCache(fetch, ttl=10, stale_ttl=30, clock=clock)
+        first = await cache.get()
+        clock.now = 9
+        self.assertIs(await cache.get(), first)
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(cache.max_age(), 1)
+
+    async def test_stale_while_revalidate(self):
+        clock = FakeClock()
+        fetch = CountingFetch(delay=0.01)
+        cache = TrafficCache(fetch, ttl=10, stale_ttl=30, clock=clock)
+        first = await cache.get()
+        clock.now = 15
+        stale = await asyncio.gather(cache.get(), cache.get())
+        self.assertTrue(all(entry is first for entry in stale))
+        await asyncio.sleep(0.05)
+        self.assertEqual(fetch.calls, 2)
+        self.assertEqual(cache.entry.traffic_data, {'iad': 2.0})
+        self.assertNotEqual(cache.entry.etag, first.etag)
+
+    async def test_expired_entries_are_refetched_once(self):
+        clock = FakeClock()
+        fetch = CountingFetch(delay=0.01)
+        cache = TrafficCache(fetch, ttl=10, stale_ttl=30, clock=clock)
+        await cache.get()
+        clock.now = 100
+        entries = await asyncio.gather(*(cache.get() for _ in range(5)))
+        self.assertEqual(fetch.calls, 2)
+        self.assertEqual(entries[0].traffic_data, {'iad': 2.0})
+
+    async def test_put_warms_cache_and_failed_revalidation_keeps_stale(self):
+        clock = FakeClock()
+        fetch = CountingFetch(fail=True)
+        cache = TrafficCache(fetch, ttl=10, stale_ttl=30, clock=clock)
+        warmed = cache.put({'cdg': 3.0})
+        self.assertIs(await cache.get(), warmed)
+        clock.now = 20
+        self.assertIs(await cache.get(), warmed)
+        await asyncio.sleep(0.01)
+        self.assertIs(cache.entry, warmed)
+        clock.now = 100
+        with self.assertRaises(RuntimeError):
+            await cache.get()
+
+    def test_etag_matching(self):
+        self.assertTrue(etag_matches('"abc"', '"abc"'))
+        self.assertTrue(etag_matches('W/"abc", "def"', '"abc"'))
+        self.assertTrue(etag_matches('*', '"abc"'))
+        self.assertFalse(etag_matches('"def"', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+
+if __name__ == '__main__':
+    unittest.main()
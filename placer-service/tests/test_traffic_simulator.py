@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+from utils import mock_traffic_generator
+from utils.traffic_simulator import TrafficSimulator, format_ip
+
+REGIONS = ['iad', 'cdg', 'lhr', 'fra']
+
+class TestTrafficSimulator(unittest.TestCase):
+    def test_same_seed_same_traffic(self):
+        _, first = TrafficSimulator(REGIONS, 'diurnal', seed=7).counts(500)
+        _, second = TrafficSimulator(REGIONS, 'diurnal', seed=7).counts(500)
+        _, other = TrafficSimulator(REGIONS, 'diurnal', seed=8).counts(500)
+        np.testing.assert_array_equal(first, second)
+        self.assertFalse(np.array_equal(first, other))
+
+    def test_stream_is_chunked_and_unbounded(self):
+        sim = TrafficSimulator(REGIONS, seed=1, step=60, start=1000)
+        chunks = list(sim.stream(ticks=250, chunk=100))
+        self.assertEqual([len(t) for t, _ in chunks], [100, 100, 50])
+        self.assertEqual(chunks[1][0][0], 1000 + 100 * 60)
+        self.assertEqual(chunks[0][1].shape, (100, len(REGIONS)))
+
+        endless = TrafficSimulator(REGIONS, seed=1).stream(chunk=10)
+        for _ in range(5):
+            timestamps, _ = next(endless)
+        self.assertEqual(len(timestamps), 10)
+
+    def test_outage_silences_region(self):
+        sim = TrafficSimulator(REGIONS, 'outage', seed=2, base_rate=100,
+                               params={'outage': {'regions': ['cdg'], 'at': 600, 'duration': 600}})
+        _, counts = sim.counts(30)
+        cdg = counts[:, REGIONS.index('cdg')]
+        self.assertTrue((cdg[10:20] == 0).all())
+        self.assertTrue((cdg[:10] > 0).all() and (cdg[20:] > 0).all())
+
+    def test_flash_crowd_spikes_then_decays(self):
+        params = {'flash_crowd': {'region': 'lhr', 'at': 600, 'magnitude': 20, 'decay': 300}}
+        rates = TrafficSimulator(REGIONS, 'flash_crowd', seed=3, params=params).rates(0, 60)
+        lhr = rates[:, REGIONS.index('lhr')]
+        self.assertAlmostEqual(lhr[10] / lhr[0], 21)
+        self.assertLess(lhr[30], lhr[15])
+        np.testing.assert_allclose(rates[:, REGIONS.index('iad')], rates[0, REGIONS.index('iad')])
+
+    def test_diurnal_and_drift_combine(self):
+        sim = TrafficSimulator(REGIONS, ['diurnal', 'drift'], seed=4, step=3600)
+        rates = sim.rates(0, 48)
+        daily = rates / sim.base_rates
+        self.assertGreater(daily.max() - daily.min(), 0.5)
+        self.assertTrue((rates >= 0).all())
+
+    def test_request_logs_match_counts(self):
+        sim = TrafficSimulator(REGIONS, seed=5, step=60)
+        timestamps, counts = sim.counts(20)
+        logs = sim.request_logs(timestamps, counts)
+        self.assertEqual(len(logs['timestamp']), counts.sum())
+        np.testing.assert_array_equal(np.bincount(logs['region'], minlength=len(REGIONS)), counts.sum(axis=0))
+        self.assertTrue((logs['timestamp'] >= timestamps[0]).all())
+        self.assertTrue((logs['timestamp'] < timestamps[-1] + 60).all())
+        self.assertTrue(format_ip(logs['ip'][0]).startswith('10.'))
+
+    def test_millions_of_requests_stream_in_bounded_chunks(self):
+        sim = TrafficSimulator(REGIONS, seed=6, base_rate=5000)
+        total = 0
+        for chunk in sim.stream_logs(ticks=60, chunk=10):
+            self.assertLess(len(chunk['ip']), 400_000)
+            total += len(chunk['ip'])
+        self.assertGreater(total, 1_000_000)
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(ValueError):
+            TrafficSimulator(REGIONS, 'meteor')
+
+class TestMockTrafficGenerator(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(mock_traffic_generator, 'load_deployment_state', return_value={'iad': 'x'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(mock_traffic_generator.reseed)
+
+    def test_seeded_mock_traffic_is_reproducible(self):
+        mock_traffic_generator.reseed(42)
+        first = [mock_traffic_generator.generate_mock_traffic_data() for _ in range(3)]
+        mock_traffic_generator.reseed(42)
+        second = [mock_traffic_generator.generate_mock_traffic_data() for _ in range(3)]
+        self.assertEqual(first, second)
+        self.assertEqual(set(first[0]), set(mock_traffic_generator.MOCK_REGIONS))
+
+    def test_mock_logs_are_columnar_without_side_effects(self):
+        mock_traffic_generator.reseed(1)
+        with patch('utils.history_manager.update_traffic_history') as update_history:
+            logs = mock_traffic_generator.generate_mock_logs(dry_run=True)
+        update_history.assert_not_called()
+        self.assertEqual(len(logs['ip']), len(logs['timestamp']))
+        self.assertTrue(set(logs['ip'].tolist()) <= set(mock_traffic_generator.MOCK_IP_REGION_MAP))
+
+    def test_scenario_drives_dry_run_traffic(self):
+        config = {**mock_traffic_generator.Config.get_config(), 'mock_scenario': 'steady', 'mock_seed': 3}
+        with patch.object(mock_traffic_generator.Config, 'get_config', return_value=config):
+            mock_traffic_generator.reseed()
+            first = mock_traffic_generator.generate_mock_traffic_data()
+            mock_traffic_generator.reseed()
+            self.assertEqual(mock_traffic_generator.generate_mock_traffic_data(), first)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import numpy as np
+from automation import tuner
+from automation.replay import TrafficSeries, replay
+
+REGIONS = ['iad', 'cdg', 'lhr', 'fra']
+
+BASE_CONFIG = {
+    'dry_run': True,
+    'cooldown_period': 300,
+    'traffic_threshold': 50,
+    'deployment_threshold': 10,
+    'short_term_window': 2,
+    'long_term_window': 3,
+    'alpha_long': 0.6,
+    'allowed_regions': [],
+    'excluded_regions': [],
+    'always_running_regions': ['fra'],
+}
+
+
+def choppy_series(ticks=600, seed=2):
+    rng = np.random.default_rng(seed)
+    levels = rng.choice([0, 5, 30, 200], size=(ticks // 5, len(REGIONS)))
+    traffic = np.repeat(levels, 5, axis=0) + rng.poisson(3, size=(ticks, len(REGIONS)))
+    return TrafficSeries(np.arange(ticks) * 60.0, REGIONS, traffic)
+
+
+class TestCandidates(unittest.TestCase):
+    def test_grid(self):
+        candidates = tuner.grid_candidates({'traffic_threshold': [20, 50], 'cooldown_period': [0, 60, 600]})
+        self.assertEqual(len(candidates), 6)
+        self.assertIn({'traffic_threshold': 50, 'cooldown_period': 600}, candidates)
+
+    def test_random_search_is_seeded_and_bounded(self):
+        space = {'alpha_long': (0.05, 0.5), 'long_term_window': (3, 30), 'cooldown_period': [0, 300]}
+        first = tuner.random_candidates(space, 50, seed=3)
+        self.assertEqual(first, tuner.random_candidates(space, 50, seed=3))
+        self.assertTrue(all(0.05 <= c['alpha_long'] <= 0.5 for c in first))
+        self.assertTrue(all(isinstance(c['long_term_window'], int) and 3 <= c['long_term_window'] <= 30
+                            for c in first))
+        self.assertEqual({c['cooldown_period'] for c in first}, {0, 300})
+
+    def test_parse_space(self):
+        space = tuner.parse_space(['traffic_threshold=20,50', 'alpha_long=0.1:0.4', 'long_term_window=5,10'])
+        self.assertEqual(space, {'traffic_threshold': [20.0, 50.0], 'alpha_long': (0.1, 0.4),
+                                 'long_term_window': [5, 10]})
+        with self.assertRaises(ValueError):
+            tuner.parse_space(['dry_run=1'])
+
+    def test_invalid_candidates(self):
+        self.assertFalse(tuner.is_valid({**BASE_CONFIG, 'deployment_threshold': 80}))
+        self.assertFalse(tuner.is_valid({**BASE_CONFIG, 'alpha_long': 0}))
+        self.assertFalse(tuner.is_valid({**BASE_CONFIG, 'forecast_gamma': 1.2}))
+        self.assertFalse(tuner.is_valid({**BASE_CONFIG, 'deploy_latency': -30}))
+        self.assertTrue(tuner.is_valid(BASE_CONFIG))
+
+    def test_pareto_front(self):
+        results = [
+            {'name': 'a', 'actions': 10, 'under_provisioned_minutes': 5},
+            {'name': 'b', 'actions': 4, 'under_provisioned_minutes': 20},
+            {'name': 'c', 'actions': 12, 'under_provisioned_minutes': 6},  # dominated by a
+            {'name': 'd', 'actions': 4, 'under_provisioned_minutes': 25},  # dominated by b
+            {'name': 'e', 'actions': 30, 'under_provisioned_minutes': 0},
+        ]
+        self.assertEqual([r['name'] for r in tuner.pareto_front(results)], ['b', 'a', 'e'])
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.series = choppy_series()
+        self.candidates = tuner.grid_candidates({
+            'traffic_threshold': [30, 100],
+            'deployment_threshold': [5, 40],
+            'alpha_long': [0.3, 0.8],
+            'cooldown_period': [0, 900],
+        })
+
+    def test_scores_match_single_replays(self):
+        results = tuner.sweep(self.series, BASE_CONFIG, self.candidates, workers=1, batch_size=3)
+        valid = [c for c in self.candidates if c['deployment_threshold'] <= c['traffic_threshold']]
+        self.assertEqual([r['params'] for r in results], valid)
+        for result in results:
+            report = replay(self.series, {**BASE_CONFIG, **result['params']})
+            self.assertEqual(result['actions'], len(report.actions))
+            self.assertEqual(result['flaps'], report.flaps)
+            self.assertAlmostEqual(result['under_provisioned_minutes'], report.under_provisioned_minutes, places=3)
+        self.assertGreater(len({r['actions'] for r in results}), 1)
+
+    def test_alpha_short_changes_scores(self):
+        # A spike while iad's removal is still in cooldown: once the cooldown ends only the lagging
+        # long-term average is still high, and a short average faster than it doesn't confirm it
+        traffic = np.array([5.0] * 6 + [20.0] * 4 + [1000.0] + [20.0] * 20)[:, None]
+        series = TrafficSeries(np.arange(len(traffic)) * 60.0, ['iad'], traffic)
+        base = {**BASE_CONFIG, 'alpha_long': 0.1, 'long_term_window': 20, 'cooldown_period': 700,
+                'always_running_regions': []}
+        candidates = tuner.grid_candidates({'alpha_short': [0.1, 0.9]})
+        results = tuner.sweep(series, base, candidates, workers=1, initial_regions=['iad'])
+        for result in results:
+            report = replay(series, {**base, **result['params']}, initial_regions=['iad'])
+            self.assertEqual(result['actions'], len(report.actions))
+        self.assertEqual([r['actions'] for r in results], [2, 1])
+
+    def test_forecast_settings(self):
+        base = {**BASE_CONFIG, 'forecast_enabled': True, 'season_period': 3600, 'tick_interval': 60}
+        candidates = tuner.grid_candidates({'deploy_latency': [0, 300], 'forecast_beta': [0.0, 0.3]})
+        results = tuner.sweep(self.series, base, candidates, workers=1, batch_size=3)
+        for result in results:
+            report = replay(self.series, {**base, **result['params']})
+            self.assertEqual(result['actions'], len(report.actions))
+        self.assertGreater(len({r['actions'] for r in results}), 1)
+
+    def test_process_pool_matches_in_process(self):
+        in_process = tuner.sweep(self.series, BASE_CONFIG, self.candidates, workers=1, batch_size=4)
+        pooled = tuner.sweep(self.series, BASE_CONFIG, self.candidates, workers=2, batch_size=4)
+        self.assertEqual(pooled, in_process)
+
+    def test_cli_outputs_front(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            export = os.path.join(tmp, 'export.npz')
+            self.series.save(export)
+            config_path = os.path.join(tmp, 'config.yml')
+            with open(config_path, 'w') as f:
+                json.dump(BASE_CONFIG, f)
+            output = os.path.join(tmp, 'front.json')
+            with redirect_stdout(io.StringIO()):
+                tuner.main([export, '--config', config_path, '--json', output, '--workers', '1', '--all',
+                            '--param', 'traffic_threshold=20:150', '--param', 'cooldown_period=0,600',
+                            '--samples', '12', '--seed', '1'])
+            with open(output) as f:
+                result = json.load(f)
+        self.assertEqual(result['evaluated'], 12)
+        self.assertEqual(result['front'], tuner.pareto_front(result['results']))
+        self.assertGreaterEqual(len(result['front']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
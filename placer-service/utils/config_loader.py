@@ -1,13 +1,179 @@
 import yaml
 import os
+import re
+import threading
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+
+class ConfigError(ValueError):
+    """Raised when config.yml is missing, unparsable or fails validation."""
+
+
+# Fallbacks for smoothing settings read by the predictor, replay and backfill
+DEFAULT_SHORT_TERM_WINDOW = 1  # samples a region needs before it is acted on
+DEFAULT_LONG_TERM_WINDOW = 10  # long-term averages in the volatility window
+DEFAULT_ALPHA_SHORT = 0.3
+DEFAULT_ALPHA_LONG = 0.1
+
+# Fly app names; also used as directory names for per-app state
+_APP_NAME = re.compile(r'^[a-z0-9][a-z0-9-]*$')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config(config):
+    """Check the settings the placer depends on; raises ConfigError listing every problem."""
+    if not isinstance(config, dict):
+        raise ConfigError("Config must be a mapping")
+
+    errors = []
+    if not isinstance(config.get('dry_run'), bool):
+        errors.append("dry_run must be true or false")
+    for key in ('cooldown_period', 'traffic_threshold', 'deployment_threshold'):
+        if not _is_number(config.get(key)) or config[key] < 0:
+            errors.append(f"{key} must be a non-negative number")
+    if not errors and config['deployment_threshold'] > config['traffic_threshold']:
+        errors.append("deployment_threshold must not exceed traffic_threshold")
+    for key in ('alpha_short', 'alpha_long'):
+        if key in config and (not _is_number(config[key]) or not 0 < config[key] <= 1):
+            errors.append(f"{key} must be in (0, 1]")
+    for key in ('short_term_window', 'long_term_window', 'history_window', 'placement_concurrency',
+                'backfill_samples', 'trace_history', 'ingest_max_regions', 'client_top_k'):
+        if key in config and (not isinstance(config[key], int) or isinstance(config[key], bool) or config[key] < 1):
+            errors.append(f"{key} must be a positive integer")
+    for key in ('tick_interval', 'placement_timeout', 'metrics_timeout', 'ingest_window', 'ingest_bucket'):
+        if key in config and (not _is_number(config[key]) or config[key] <= 0):
+            errors.append(f"{key} must be a positive number")
+    for key in ('forecast_alpha', 'forecast_beta', 'forecast_gamma'):
+        if key in config and (not _is_number(config[key]) or not 0 <= config[key] <= 1):
+            errors.append(f"{key} must be in [0, 1]")
+    for key in ('deploy_latency', 'inventory_ttl', 'ingest_wake_interval'):
+        if key in config and (not _is_number(config[key]) or config[key] < 0):
+            errors.append(f"{key} must be a non-negative number")
+    if config.get('client_request_cap') is not None and (
+            not _is_number(config['client_request_cap']) or config['client_request_cap'] <= 0):
+        errors.append("client_request_cap must be a positive number or null")
+    if 'min_unique_clients' in config and (not isinstance(config['min_unique_clients'], int)
+                                           or isinstance(config['min_unique_clients'], bool)
+                                           or config['min_unique_clients'] < 0):
+        errors.append("min_unique_clients must be a non-negative integer")
+    if 'client_sketch_precision' in config and (not isinstance(config['client_sketch_precision'], int)
+                                                or isinstance(config['client_sketch_precision'], bool)
+                                                or not 4 <= config['client_sketch_precision'] <= 16):
+        errors.append("client_sketch_precision must be an integer in [4, 16]")
+    if config.get('traffic_source', 'prometheus') not in ('prometheus', 'ingest'):
+        errors.append("traffic_source must be prometheus or ingest")
+    ingest_window, ingest_bucket = config.get('ingest_window', 300), config.get('ingest_bucket', 1)
+    if _is_number(ingest_window) and _is_number(ingest_bucket) and ingest_bucket > ingest_window:
+        errors.append("ingest_bucket must not exceed ingest_window")
+    tick_interval = config.get('tick_interval', 60)
+    if 'season_period' in config and (not _is_number(config['season_period']) or (
+            _is_number(tick_interval) and config['season_period'] < tick_interval)):
+        errors.append("season_period must be at least tick_interval")
+    if 'forecast_enabled' in config and not isinstance(config['forecast_enabled'], bool):
+        errors.append("forecast_enabled must be true or false")
+    for key in ('allowed_regions', 'excluded_regions', 'always_running_regions'):
+        if config.get(key) is not None and not isinstance(config[key], list):
+            errors.append(f"{key} must be a list of regions")
+
+    apps = config.get('apps')
+    if apps is not None:
+        if not isinstance(apps, list) or not all(isinstance(app, str) and _APP_NAME.match(app) for app in apps):
+            errors.append("apps must be a list of Fly app names")
+        elif len(set(apps)) != len(apps):
+            errors.append("apps must not contain duplicates")
+
+    if errors:
+        raise ConfigError("Invalid configuration: " + "; ".join(errors))
+    return config
+
+
+def load_config(path):
+    """Read and validate a config file outside the process-wide Config (e.g. for offline tools)."""
+    try:
+        with open(path, 'r') as file:
+            config = yaml.safe_load(file)
+    except (OSError, yaml.YAMLError) as e:
+        raise ConfigError(f"Could not load {path}: {e}") from e
+    return validate_config(config)
+
 
 class Config:
+    """
+    Process-wide configuration loaded from config/config.yml.
+
+    `get_config` returns the current snapshot; snapshots are never mutated, a
+    reload validates the new file and swaps the whole dict in one assignment,
+    so readers always see either the old or the new config. Listeners
+    registered with `subscribe` are called with each new snapshot.
+    """
+
     _config = None
+    _version = 0
+    _listeners = []
+    _lock = threading.Lock()
+    config_path = os.path.join('config', 'config.yml')
+
+    @classmethod
+    def _read(cls):
+        return load_config(cls.config_path)
 
     @classmethod
     def get_config(cls):
         if cls._config is None:
-            config_path = os.path.join('config', 'config.yml')
-            with open(config_path, 'r') as file:
-                cls._config = yaml.safe_load(file)
+            with cls._lock:
+                if cls._config is None:
+                    cls._config = cls._read()
+                    cls._version += 1
         return cls._config
+
+    @classmethod
+    def version(cls):
+        """Incremented every time a new config snapshot is swapped in."""
+        cls.get_config()
+        return cls._version
+
+    @classmethod
+    def reload(cls):
+        """
+        Re-read config.yml and swap it in if it is valid and changed.
+
+        Returns True when a new snapshot was installed; invalid files are logged
+        and the current config is kept.
+        """
+        with cls._lock:
+            try:
+                config = cls._read()
+            except ConfigError as e:
+                logger.error(f"Keeping current configuration: {e}")
+                return False
+            if config == cls._config:
+                return False
+            cls._config = config
+            cls._version += 1
+            listeners = list(cls._listeners)
+        logger.info(f"Configuration reloaded from {cls.config_path} (version {cls._version})")
+        for listener in listeners:
+            try:
+                listener(config)
+            except Exception as e:
+                logger.error(f"Config listener {listener!r} failed: {e}", exc_info=True)
+        return True
+
+    @classmethod
+    def subscribe(cls, listener):
+        """Call `listener(config)` after every successful reload."""
+        with cls._lock:
+            cls._listeners.append(listener)
+        return listener
+
+    @classmethod
+    def unsubscribe(cls, listener):
+        with cls._lock:
+            if listener in cls._listeners:
+                cls._listeners.remove(listener)
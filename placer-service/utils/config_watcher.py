@@ -0,0 +1,139 @@
+"""
+Module: config_watcher.py
+Description: Watches config.yml for changes using inotify, falling back to mtime polling.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0  # seconds, polling fallback only
+SETTLE_DELAY = 0.05  # seconds to let an editor finish a burst of writes
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _init_inotify(directory):
+    """Return an inotify file descriptor watching `directory`, or None if unavailable."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class ConfigWatcher:
+    """
+    Calls `on_change()` from a background thread whenever the watched file may
+    have changed.
+
+    The parent directory is watched rather than the file itself, so editors and
+    deploy tools that replace the file (write-and-rename, symlink swaps) are
+    picked up too. `on_change` should be idempotent; Config.reload only swaps in
+    content that actually differs.
+    """
+
+    def __init__(self, path, on_change, poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        self._fd = _init_inotify(directory) if self.use_inotify else None
+        self.mode = 'inotify' if self._fd is not None else 'polling'
+        target = self._watch_inotify if self._fd is not None else self._watch_polling
+        self._thread = threading.Thread(target=target, name='config-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for changes ({self.mode})")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Config change handler failed: {e}", exc_info=True)
+
+    def _drain(self):
+        """Read pending events; return True if any of them concern the watched file."""
+        filename = os.path.basename(self.path)
+        relevant = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return relevant
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_length].rstrip(b'\0').decode(errors='replace')
+                offset += name_length
+                # Symlink-swapped mounts (e.g. Kubernetes ConfigMaps) rename a sibling entry
+                if name == filename or name.startswith('..'):
+                    relevant = True
+
+    def _watch_inotify(self):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._fd], [], [], 0.5)
+            if not readable:
+                continue
+            relevant = self._drain()
+            if relevant:
+                self._stop.wait(SETTLE_DELAY)
+                self._drain()
+                self._notify()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _watch_polling(self):
+        last_mtime = self._mtime()
+        while not self._stop.wait(self.poll_interval):
+            current_mtime = self._mtime()
+            if current_mtime is None:
+                if last_mtime is not None:
+                    logger.warning(f"{self.path} not found. Continuing with the current configuration...")
+            elif current_mtime != last_mtime:
+                self._notify()
+            last_mtime = current_mtime
@@ -1,8 +1,4 @@
 import logging
-import os
-
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
 
 def log_action(action, region, dry_run):
     if dry_run:
@@ -1,34 +1,54 @@
-import json
 import os
 from datetime import datetime, timezone
+from utils.config_loader import Config
 from utils.fancy_logger import get_logger
+from utils.state_manager import get_data_dir
 
 # Set up logging
 logger = get_logger(__name__)
 
+# Open stores, keyed by directory, so each tick reuses the existing memory maps
+_stores = {}
+
 def get_traffic_history_file(dry_run):
-    return 'data/traffic_history_dry_run.json' if dry_run else 'data/traffic_history.json'
-
-def load_traffic_history(dry_run):
-    history_file = get_traffic_history_file(dry_run)
-    if os.path.exists(history_file):
-        with open(history_file, 'r') as f:
-            history = json.load(f)
-            return {datetime.fromisoformat(k).replace(tzinfo=timezone.utc): v for k, v in history.items()}
-    return {}
-
-def save_traffic_history(history, dry_run):
-    history_file = get_traffic_history_file(dry_run)
-    serializable_history = {k.astimezone(timezone.utc).isoformat(): v for k, v in history.items()}
-    with open(history_file, 'w') as f:
-        json.dump(serializable_history, f, indent=2)
-
-def update_traffic_history(current_traffic, dry_run):
-    history = load_traffic_history(dry_run)
-    now = datetime.now(timezone.utc)
-    history[now] = current_traffic
-    
-    # Keep the last 20 entries 
-    sorted_history = dict(sorted(history.items(), reverse=True)[:20])
-    
-    save_traffic_history(sorted_history, dry_run)
+    """Legacy JSON history file, only read to migrate it into the columnar store."""
+    filename = 'traffic_history_dry_run.json' if dry_run else 'traffic_history.json'
+    return os.path.join(get_data_dir(), filename)
+
+def get_traffic_history_dir(dry_run, app=None):
+    dirname = 'traffic_history_dry_run' if dry_run else 'traffic_history'
+    return os.path.join(get_data_dir(app), dirname)
+
+def get_history_store(dry_run, app=None):
+    history_dir = get_traffic_history_dir(dry_run, app)
+    store = _stores.get(history_dir)
+    if store is None:
+        # Deferred so importing this module doesn't pull in NumPy
+        from utils.history_store import HistoryStore, DEFAULT_WINDOW
+        window = int(Config.get_config().get('history_window', DEFAULT_WINDOW))
+        store = HistoryStore(history_dir, window=window)
+        legacy_file = get_traffic_history_file(dry_run)
+        if app is None and os.path.exists(legacy_file):
+            store.migrate_json(legacy_file)
+        _stores[history_dir] = store
+    return store
+
+def close_history_stores():
+    for store in _stores.values():
+        store.close()
+    _stores.clear()
+
+def load_traffic_history(dry_run, limit=None, app=None):
+    """Return history as {datetime: {region: value}}, newest first."""
+    return get_history_store(dry_run, app).to_snapshots(limit)
+
+def save_traffic_history(history, dry_run, app=None):
+    """Append the snapshots in `history` that are newer than the stored ones."""
+    store = get_history_store(dry_run, app)
+    store.append_snapshots(history)
+    store.flush()
+
+def update_traffic_history(current_traffic, dry_run, app=None):
+    store = get_history_store(dry_run, app)
+    store.append(current_traffic, datetime.now(timezone.utc))
+    store.flush()
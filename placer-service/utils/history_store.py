@@ -0,0 +1,279 @@
+"""
+Module: history_store.py
+Description: Columnar, memory-mapped ring buffer storage for per-region traffic history.
+
+Each region is stored in its own fixed-size binary file laid out as a small int64
+header followed by a float64 timestamp column and a float64 value column. Appends
+write a single slot and bump the header counter, so the cost of a tick does not
+depend on how much history is kept, and loads map the file instead of parsing it.
+"""
+
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_WINDOW = 2880  # 48 hours of samples at one tick per minute
+
+SERIES_SUFFIX = '.series'
+MAGIC = 0x53485046  # b'FPHS' little-endian
+FORMAT_VERSION = 1
+
+# Header slots (int64): magic, version, capacity, total samples ever appended
+HEADER_SLOTS = 4
+HEADER_BYTES = HEADER_SLOTS * 8
+_MAGIC, _VERSION, _CAPACITY, _COUNT = range(HEADER_SLOTS)
+
+_REGION_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def _to_epoch(timestamp):
+    """Convert a datetime (naive values are treated as UTC) or epoch number to epoch seconds."""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def _parse_legacy_timestamp(key):
+    timestamp = datetime.fromisoformat(key)
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+class RegionSeries:
+    """Fixed-capacity ring buffer of (timestamp, value) samples backed by one mmap'd file."""
+
+    def __init__(self, path, capacity=DEFAULT_WINDOW):
+        """Open (or create) a series; `capacity=None` keeps an existing file's capacity."""
+        self.path = path
+        if not os.path.exists(path):
+            self._create(path, DEFAULT_WINDOW if capacity is None else capacity)
+        self._open(path)
+        if capacity is not None and self.capacity != capacity:
+            self._resize(capacity)
+
+    @staticmethod
+    def _create(path, capacity):
+        if capacity < 1:
+            raise ValueError(f"History window must be at least 1, got {capacity}")
+        header = np.array([MAGIC, FORMAT_VERSION, capacity, 0], dtype='<i8')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header.tobytes())
+            f.truncate(HEADER_BYTES + 2 * capacity * 8)
+        os.replace(tmp_path, path)
+
+    def _open(self, path):
+        self._map = np.memmap(path, dtype=np.uint8, mode='r+')
+        self._header = self._map[:HEADER_BYTES].view('<i8')
+        if self._header[_MAGIC] != MAGIC or self._header[_VERSION] != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a traffic history series file")
+        capacity = int(self._header[_CAPACITY])
+        column_bytes = capacity * 8
+        self._timestamps = self._map[HEADER_BYTES:HEADER_BYTES + column_bytes].view('<f8')
+        self._values = self._map[HEADER_BYTES + column_bytes:HEADER_BYTES + 2 * column_bytes].view('<f8')
+
+    def _resize(self, capacity):
+        """Rewrite the file with a new capacity, keeping the most recent samples."""
+        timestamps, values = self.window(capacity)
+        self._map.flush()
+        del self._header, self._timestamps, self._values, self._map
+        tmp_path = f"{self.path}.resize"
+        self._create(tmp_path, capacity)
+        resized = RegionSeries(tmp_path, capacity)
+        resized.extend(timestamps, values)
+        resized.close()
+        os.replace(tmp_path, self.path)
+        self._open(self.path)
+        logger.info(f"Resized {self.path} to a window of {capacity} samples")
+
+    @property
+    def capacity(self):
+        return int(self._header[_CAPACITY])
+
+    @property
+    def total(self):
+        """Number of samples ever appended (including ones overwritten by the ring)."""
+        return int(self._header[_COUNT])
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, timestamp, value):
+        slot = self.total % self.capacity
+        self._timestamps[slot] = _to_epoch(timestamp)
+        self._values[slot] = value
+        self._header[_COUNT] += 1
+
+    def extend(self, timestamps, values):
+        """Append many samples at once; only the last `capacity` of them are retained."""
+        timestamps = np.asarray(timestamps, dtype='<f8')
+        values = np.asarray(values, dtype='<f8')
+        if timestamps.shape != values.shape:
+            raise ValueError("timestamps and values must have the same length")
+        total, capacity = self.total, self.capacity
+        skipped = max(0, len(values) - capacity)
+        slots = (total + skipped + np.arange(len(values) - skipped)) % capacity
+        self._timestamps[slots] = timestamps[skipped:]
+        self._values[slots] = values[skipped:]
+        self._header[_COUNT] = total + len(values)
+
+    def window(self, n=None):
+        """Return copies of the last `n` (default: all retained) samples in chronological order."""
+        size = len(self)
+        if n is not None:
+            size = min(size, n)
+        start = self.total - size
+        if size == 0:
+            return np.empty(0), np.empty(0)
+        first = start % self.capacity
+        if first + size <= self.capacity:
+            return (np.array(self._timestamps[first:first + size]),
+                    np.array(self._values[first:first + size]))
+        slots = (start + np.arange(size)) % self.capacity
+        return self._timestamps[slots], self._values[slots]
+
+    def latest(self):
+        """Return the most recent (timestamp, value) pair, or None when empty."""
+        if not self.total:
+            return None
+        slot = (self.total - 1) % self.capacity
+        return float(self._timestamps[slot]), float(self._values[slot])
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.flush()
+        del self._header, self._timestamps, self._values, self._map
+
+
+class HistoryStore:
+    """
+    Per-region columnar traffic history kept in a directory of RegionSeries files.
+
+    With `window=None` existing series keep whatever capacity they were written
+    with, which is how offline tools read a store without resizing it.
+    """
+
+    def __init__(self, path, window=DEFAULT_WINDOW):
+        self.path = path
+        self.window_size = None if window is None else int(window)
+        self._series = {}
+        os.makedirs(path, exist_ok=True)
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith(SERIES_SUFFIX):
+                region = filename[:-len(SERIES_SUFFIX)]
+                self._series[region] = RegionSeries(os.path.join(path, filename), self.window_size)
+
+    def regions(self):
+        return list(self._series)
+
+    def series(self, region, create=False):
+        series = self._series.get(region)
+        if series is None and create:
+            if not _REGION_NAME.match(region):
+                raise ValueError(f"Invalid region name for history store: {region!r}")
+            series = RegionSeries(os.path.join(self.path, f"{region}{SERIES_SUFFIX}"), self.window_size)
+            self._series[region] = series
+        return series
+
+    def __len__(self):
+        return max((len(series) for series in self._series.values()), default=0)
+
+    def append(self, snapshot, timestamp=None):
+        """Append one {region: value} snapshot, stamped with `timestamp` (default: now)."""
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc)
+        epoch = _to_epoch(timestamp)
+        for region, value in snapshot.items():
+            self.series(region, create=True).append(epoch, value)
+
+    def extend(self, region, timestamps, values):
+        """Bulk-append a column of samples for a single region."""
+        self.series(region, create=True).extend(timestamps, values)
+
+    def window(self, region, n=None):
+        series = self._series.get(region)
+        if series is None:
+            return np.empty(0), np.empty(0)
+        return series.window(n)
+
+    def matrix(self, regions, n, with_timestamps=False):
+        """
+        Return a len(regions) x n matrix of the latest values, left-padded with NaN.
+
+        With `with_timestamps`, return (timestamps, values) matrices of the same shape.
+        """
+        result = np.full((len(regions), n), np.nan)
+        stamps = np.full((len(regions), n), np.nan) if with_timestamps else None
+        for row, region in enumerate(regions):
+            timestamps, values = self.window(region, n)
+            if len(values):
+                result[row, n - len(values):] = values
+                if with_timestamps:
+                    stamps[row, n - len(values):] = timestamps
+        return (stamps, result) if with_timestamps else result
+
+    def latest_timestamp(self):
+        latest = [series.latest() for series in self._series.values()]
+        latest = [sample[0] for sample in latest if sample is not None]
+        return max(latest) if latest else None
+
+    def to_snapshots(self, n=None):
+        """Regroup the columns into the legacy {datetime: {region: value}} shape, newest first."""
+        snapshots = {}
+        for region, series in self._series.items():
+            timestamps, values = series.window(n)
+            for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+                snapshots.setdefault(timestamp, {})[region] = value
+        ordered = sorted(snapshots.items(), reverse=True)
+        if n is not None:
+            ordered = ordered[:n]
+        return {datetime.fromtimestamp(ts, tz=timezone.utc): snapshot for ts, snapshot in ordered}
+
+    def append_snapshots(self, history):
+        """Append the snapshots of a {datetime: {region: value}} dict newer than what is stored."""
+        latest = self.latest_timestamp()
+        appended = 0
+        for timestamp, snapshot in sorted(history.items(), key=lambda item: _to_epoch(item[0])):
+            if latest is not None and _to_epoch(timestamp) <= latest:
+                continue
+            self.append(snapshot, timestamp)
+            appended += 1
+        return appended
+
+    def migrate_json(self, json_path):
+        """
+        Import a legacy traffic_history*.json file and rename it to `<file>.migrated`.
+
+        Returns the number of snapshots imported.
+        """
+        with open(json_path, 'r') as f:
+            content = f.read().strip()
+        legacy = json.loads(content) if content else {}
+        history = {_parse_legacy_timestamp(k): v for k, v in legacy.items()}
+        imported = self.append_snapshots(history)
+        self.flush()
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"Migrated {imported} snapshots from {json_path} into {self.path}")
+        return imported
+
+    def flush(self):
+        for series in self._series.values():
+            series.flush()
+
+    def close(self):
+        for series in self._series.values():
+            series.close()
+        self._series = {}
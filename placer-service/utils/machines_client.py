@@ -0,0 +1,163 @@
+"""
+Module: machines_client.py
+Description: Client for the Fly Machines REST API with a pooled keep-alive HTTP session.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_API_URL = 'https://api.machines.dev/v1'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 30
+
+# Machine states that no longer count towards a region's placement
+INACTIVE_STATES = {'destroying', 'destroyed', 'replacing', 'replaced'}
+
+
+class MachinesApiError(Exception):
+    """Raised when the Machines API returns an error or cannot be reached."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MachinesClient:
+    """
+    Thin wrapper over the Machines API for one app.
+
+    A single requests.Session is shared by every call so connections stay
+    alive between requests, and the batch helpers fan out over a small thread
+    pool that reuses the same connection pool.
+    """
+
+    def __init__(self, app_name, api_token, base_url=DEFAULT_API_URL, pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT):
+        if not app_name:
+            raise ValueError("App name not found. Set FLY_APP_NAME environment variable.")
+        self.app_name = app_name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_token:
+            self.session.headers['Authorization'] = f'Bearer {api_token}'
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='machines-api')
+
+    @classmethod
+    def from_config(cls, config, app_name=None):
+        return cls(
+            app_name=app_name or os.environ.get('FLY_APP_NAME'),
+            api_token=os.environ.get('FLY_API_TOKEN'),
+            base_url=config.get('machines_api_url', DEFAULT_API_URL),
+            pool_size=int(config.get('placement_concurrency', DEFAULT_POOL_SIZE)),
+        )
+
+    def _request(self, method, path, **kwargs):
+        url = f'{self.base_url}/apps/{self.app_name}{path}'
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise MachinesApiError(f"{method} {path} failed: {e}") from e
+        if response.status_code >= 400:
+            raise MachinesApiError(
+                f"{method} {path} returned {response.status_code}: {response.text.strip()}",
+                status_code=response.status_code,
+            )
+        if not response.content:
+            return None
+        return response.json()
+
+    def list_machines(self, region=None):
+        params = {'region': region} if region else None
+        machines = self._request('GET', '/machines', params=params) or []
+        return [machine for machine in machines if machine.get('state') not in INACTIVE_STATES]
+
+    def create_machine(self, region, machine_config):
+        return self._request('POST', '/machines', json={'region': region, 'config': machine_config})
+
+    def stop_machine(self, machine_id):
+        return self._request('POST', f'/machines/{machine_id}/stop')
+
+    def destroy_machine(self, machine_id, force=True):
+        return self._request('DELETE', f'/machines/{machine_id}', params={'force': str(force).lower()})
+
+    def _batch(self, fn, items):
+        """Run `fn` over `items` concurrently; failures are returned in place of results."""
+        def call(item):
+            try:
+                return fn(*item) if isinstance(item, tuple) else fn(item)
+            except MachinesApiError as e:
+                return e
+        return list(self._pool.map(call, items))
+
+    def create_machines(self, regions, machine_config):
+        return self._batch(self.create_machine, [(region, machine_config) for region in regions])
+
+    def stop_machines(self, machine_ids):
+        return self._batch(self.stop_machine, machine_ids)
+
+    def destroy_machines(self, machine_ids, force=True):
+        return self._batch(self.destroy_machine, [(machine_id, force) for machine_id in machine_ids])
+
+    def plan_scale(self, targets, machines):
+        """
+        Work out the creates and destroys that bring each region in `targets`
+        ({region: count}) to its machine count, given the app's machine list.
+        """
+        by_region = {}
+        for machine in machines:
+            by_region.setdefault(machine.get('region'), []).append(machine)
+        creates, destroys = [], []
+        for region, count in targets.items():
+            existing = by_region.get(region, [])
+            if count > len(existing):
+                creates.extend([region] * (count - len(existing)))
+            elif count < len(existing):
+                destroys.extend(machine['id'] for machine in existing[count:])
+        return creates, destroys
+
+    def scale_regions(self, targets, machines=None):
+        """
+        Scale several regions in one batch; returns {region: error message or None}.
+
+        New machines clone the config of an existing machine of the app, the way
+        `fly scale count` does.
+        """
+        if machines is None:
+            machines = self.list_machines()
+        creates, destroys = self.plan_scale(targets, machines)
+        errors = {region: None for region in targets}
+
+        if creates:
+            if not machines:
+                message = "No existing machine to clone a config from"
+                for region in creates:
+                    errors[region] = message
+                creates = []
+            template = machines[0].get('config', {}) if machines else {}
+            for region, result in zip(creates, self.create_machines(creates, template)):
+                if isinstance(result, Exception):
+                    errors[region] = str(result)
+
+        if destroys:
+            regions_by_id = {machine['id']: machine.get('region') for machine in machines}
+            for machine_id, result in zip(destroys, self.destroy_machines(destroys)):
+                if isinstance(result, Exception):
+                    errors[regions_by_id.get(machine_id)] = str(result)
+
+        logger.info(f"Scaled {len(targets)} regions: {len(creates)} machines created, {len(destroys)} destroyed")
+        return errors
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.session.close()
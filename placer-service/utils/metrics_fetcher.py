@@ -1,37 +1,80 @@
-import requests
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import json
 from datetime import datetime, timedelta
 import random
+import time
 from utils.config_loader import Config
 from utils.state_manager import load_deployment_state
-from utils import mock_traffic_generator
+from metrics.metrics_client import PROMETHEUS_REQUEST_DURATION
 from utils.fancy_logger import get_logger
 
-# Load configuration
-config = Config.get_config()
-
 # Set up logging
 logger = get_logger(__name__)
 
-class MetricsFetcher:
+DEFAULT_TIMEOUT = 10  # seconds per Prometheus request
+DEFAULT_RETRIES = 2  # extra attempts after a failed request
+DEFAULT_BACKOFF = 0.5  # seconds, doubled after every retry
+DEFAULT_MAX_CONNECTIONS = 10
 
-    def __init__(self, dry_run=None):
+# Status codes worth retrying; anything else is returned or raised straight away
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_env_loaded = False
+
+def _traffic_query(app_name):
+    """PromQL for per-region edge traffic; shared by the instant and range queries."""
+    return f'sum(fly_edge_http_responses_count{{app="{app_name}"}}[5m]) by (region)'
+
+def _apps_traffic_query(apps):
+    """One query covering every app, grouped by (app, region); app names are validated config."""
+    selector = '|'.join(apps)
+    return f'sum(fly_edge_http_responses_count{{app=~"{selector}"}}[5m]) by (app, region)'
+
+def _load_env():
+    """Load .env once per process instead of on every fetcher construction."""
+    global _env_loaded
+    if not _env_loaded:
         load_dotenv()
+        _env_loaded = True
+
+class AsyncMetricsFetcher:
+    """
+    Fetches per-region traffic from Fly's Prometheus API without blocking the event loop.
+
+    Meant to live for the whole application lifespan: the underlying
+    httpx.AsyncClient keeps connections alive between calls, and each query is
+    retried a bounded number of times with exponential backoff.
+    """
+
+    def __init__(self, dry_run=None, timeout=None, retries=None, backoff=DEFAULT_BACKOFF,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, transport=None, apps=None):
+        _load_env()
+        config = Config.get_config()
         self.dry_run = dry_run if dry_run is not None else config['dry_run']
-        
+        # Apps managed by this placer; empty means the single FLY_APP_NAME app
+        self.apps = list(apps if apps is not None else config.get('apps') or [])
+        self.timeout = float(timeout if timeout is not None else config.get('metrics_timeout', DEFAULT_TIMEOUT))
+        self.retries = int(retries if retries is not None else config.get('metrics_retries', DEFAULT_RETRIES))
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self._transport = transport
+        self._client = None
+
         self.api_url = os.environ.get('FLY_PROMETHEUS_URL')
         self.api_token = os.environ.get('FLY_API_TOKEN')
         self.real_app_name = os.environ.get('FLY_APP_NAME')
+        self.headers = {}
 
         if not self.dry_run:
             if not self.api_token:
                 raise ValueError("API token not found. Set FLY_API_TOKEN environment variable.")
-            if not self.real_app_name:
+            if not self.real_app_name and not self.apps:
                 raise ValueError("App name not found. Set FLY_APP_NAME environment variable.")
             self.headers = {'Authorization': f'Bearer {self.api_token}'}
-    
+
     def get_app_name(self):
         if self.dry_run:
             return "mock-app"
@@ -40,32 +83,117 @@ class MetricsFetcher:
         else:
             raise ValueError("App name not found. Set FLY_APP_NAME environment variable.")
 
-    def fetch_region_traffic(self):
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            import httpx  # deferred: only needed once real metrics are queried
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url or '',
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def fetch_region_traffic(self):
         app_name = self.get_app_name()
         if self.dry_run:
             traffic_data = self._generate_mock_traffic_data(app_name)
         else:
-            traffic_data = self._fetch_real_traffic_data(app_name)
-        
+            traffic_data = await self._fetch_real_traffic_data(app_name)
+
         logger.info(f"Traffic data for {app_name}:")
         for region, count in traffic_data.items():
             logger.info(f"  {region}: {count}")
-        
+
         return traffic_data
 
-    def _fetch_real_traffic_data(self, app_name):
-        query = f'sum(fly_edge_http_responses_count{{app="{app_name}"}}[5m]) by (region)'
-
-        response = requests.get(
-            f'{self.api_url}/api/v1/query',
-            params={'query': query},
-            headers=self.headers,
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
+    async def fetch_apps_traffic(self, apps=None):
+        """
+        Fetch per-region traffic for many apps at once as {app: {region: value}}.
+
+        Real traffic comes from a single `by (app, region)` query, so the number
+        of Prometheus calls doesn't grow with the number of apps.
+        """
+        apps = list(apps or self.apps)
+        if self.dry_run:
+            traffic = {app: self._generate_mock_traffic_data(app) for app in apps}
+        else:
+            data = await self._query('/api/v1/query', {'query': _apps_traffic_query(apps)})
+            traffic = {app: {} for app in apps}
+            for app, region, value in self._parse_app_metrics(data):
+                if app in traffic:
+                    traffic[app][region] = value
+        logger.info(f"Traffic data for {len(apps)} apps: "
+                    f"{sum(len(regions) for regions in traffic.values())} app regions")
+        return traffic
+
+    async def fetch_apps_traffic_range(self, apps, start, end, step):
+        """Range variant of fetch_apps_traffic: {app: {region: [(timestamp, value), ...]}}."""
+        apps = list(apps)
+        traffic = {app: {} for app in apps}
+        if self.dry_run:
+            return traffic
+        params = {
+            'query': _apps_traffic_query(apps),
+            'start': f'{start:.3f}',
+            'end': f'{end:.3f}',
+            'step': f'{step}s',
+        }
+        data = await self._query('/api/v1/query_range', params)
+        for item in data.get('data', {}).get('result', []):
+            app = item['metric'].get('app')
+            if app in traffic:
+                region = item['metric'].get('region', 'unknown')
+                traffic[app][region] = self._parse_range_values(item)
+        return traffic
+
+    async def _query(self, path, params):
+        """GET a Prometheus API path, retrying transport errors and retryable statuses."""
+        import httpx
+        client = self._get_client()
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                PROMETHEUS_REQUEST_DURATION.labels(path, str(response.status_code)).observe(
+                    time.perf_counter() - start)
+                if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                    response.raise_for_status()
+                    return response.json()
+                logger.warning(f"Prometheus returned {response.status_code} for {path}, retrying")
+            except httpx.TransportError as e:
+                PROMETHEUS_REQUEST_DURATION.labels(path, 'error').observe(time.perf_counter() - start)
+                if last_attempt:
+                    raise
+                logger.warning(f"Prometheus request to {path} failed ({e!r}), retrying")
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def _fetch_real_traffic_data(self, app_name):
+        data = await self._query('/api/v1/query', {'query': _traffic_query(app_name)})
         return self._parse_metrics(data)
-    
+
+    async def fetch_region_traffic_range(self, start, end, step):
+        """
+        Fetch per-region traffic from `start` to `end` (epoch seconds) every `step`
+        seconds with a single query_range call.
+
+        Returns {region: [(timestamp, value), ...]} oldest first. Dry-run mode has
+        no Prometheus to backfill from and returns an empty dict.
+        """
+        if self.dry_run:
+            return {}
+        params = {
+            'query': _traffic_query(self.get_app_name()),
+            'start': f'{start:.3f}',
+            'end': f'{end:.3f}',
+            'step': f'{step}s',
+        }
+        data = await self._query('/api/v1/query_range', params)
+        return self._parse_range_metrics(data)
+
     def _parse_metrics(self, data):
         result = {}
         for item in data.get('data', {}).get('result', []):
@@ -74,6 +202,61 @@ class MetricsFetcher:
             result[region] = value
         return result
 
+    def _parse_app_metrics(self, data):
+        for item in data.get('data', {}).get('result', []):
+            metric = item['metric']
+            yield metric.get('app'), metric.get('region', 'unknown'), float(item['value'][1])
+
+    def _parse_range_values(self, item):
+        points = [(float(ts), float(value)) for ts, value in item.get('values', [])]
+        # Prometheus reports gaps as NaN; the history store has no use for them
+        return [(ts, value) for ts, value in points if value == value]
+
+    def _parse_range_metrics(self, data):
+        result = {}
+        for item in data.get('data', {}).get('result', []):
+            region = item['metric'].get('region', 'unknown')
+            result[region] = self._parse_range_values(item)
+        return result
+
     def _generate_mock_traffic_data(self, mock_app_name):
-        mock_logs = mock_traffic_generator.generate_mock_logs(self.dry_run)
-        return mock_traffic_generator.generate_mock_traffic_data(mock_logs)
+        from utils import mock_traffic_generator  # deferred: uses NumPy
+        return mock_traffic_generator.generate_mock_traffic_data()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class MetricsFetcher:
+    """Synchronous shim over AsyncMetricsFetcher for existing callers."""
+
+    def __init__(self, dry_run=None):
+        self._fetcher = AsyncMetricsFetcher(dry_run=dry_run)
+        self.dry_run = self._fetcher.dry_run
+
+    def get_app_name(self):
+        return self._fetcher.get_app_name()
+
+    def fetch_region_traffic(self):
+        return self._run(self._fetcher.fetch_region_traffic)
+
+    def _parse_metrics(self, data):
+        return self._fetcher._parse_metrics(data)
+
+    def _run(self, fn):
+        async def run_once():
+            try:
+                return await fn()
+            finally:
+                # The client is bound to this short-lived event loop
+                await self._fetcher.aclose()
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run_once())
+        # Called from inside an event loop: run on a helper thread with its own loop
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, run_once()).result()
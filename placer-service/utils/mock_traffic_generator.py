@@ -1,17 +1,13 @@
-import random
-from datetime import datetime, timedelta, timezone
+import time
+import numpy as np
 from utils.state_manager import load_deployment_state
-from utils.history_manager import update_traffic_history
 from utils.fancy_logger import get_logger
 from utils.config_loader import Config
+from utils.traffic_simulator import TrafficSimulator
 
 # Set up logging
 logger = get_logger(__name__)
 
-config = Config.get_config()
-TRAFFIC_THRESHOLD = config['traffic_threshold']
-DEPLOYMENT_THRESHOLD = config['deployment_threshold']
-
 MOCK_IP_REGION_MAP = {
     '203.0.113.5': 'cdg',
     '198.51.100.50': 'ams',
@@ -22,6 +18,9 @@ MOCK_IP_REGION_MAP = {
     '198.51.100.65': 'fra',
     '198.51.100.75': 'sfo',
 }
+MOCK_REGIONS = list(MOCK_IP_REGION_MAP.values())
+MOCK_IPS = np.array(list(MOCK_IP_REGION_MAP))
+MOCK_LOG_WINDOW = 300  # seconds of simulated request logs
 
 MOCK_TRAFFIC_LEVEL_RANGES = {
     'very_low': (0, 10),    # 0 to 10 requests
@@ -37,71 +36,96 @@ MOCK_TRAFFIC_LEVEL_RANGES = {
 MOCK_TRAFFIC_LEVEL_WEIGHTS_DEPLOYED = [0.4, 0.3, 0.2, 0.1]  # very_low, low, medium, high
 MOCK_TRAFFIC_LEVEL_WEIGHTS_NON_DEPLOYED = [0.1, 0.2, 0.3, 0.4]  # very_low, low, medium, high
 
+_LEVEL_BOUNDS = np.array(list(MOCK_TRAFFIC_LEVEL_RANGES.values()))
+
+# Seeded from mock_seed in config on first use; reseed() restarts the sequence
+_rng = None
+_simulator = None
+
+def reseed(seed=None):
+    """Restart the mock traffic from `seed` (default: mock_seed in config, or fresh entropy)."""
+    global _rng, _simulator
+    config = Config.get_config()
+    seed = config.get('mock_seed') if seed is None else seed
+    _rng = np.random.default_rng(seed)
+    _simulator = None
+    scenario = config.get('mock_scenario')
+    if scenario:
+        simulator = TrafficSimulator(
+            MOCK_REGIONS, scenario=scenario, seed=seed,
+            base_rate=float(config.get('traffic_threshold', 50)) * 0.6,
+            step=float(config.get('tick_interval', 60)), start=time.time(),
+            params=config.get('mock_scenario_params'),
+        )
+        _simulator = simulator.snapshots()
+
+def _get_rng():
+    if _rng is None:
+        reseed()
+    return _rng
+
 def generate_mock_logs(dry_run):
     """
-    Generate mock recent logs simulating traffic across different regions.
+    Generate mock recent request logs across the mock regions, as columns.
+
+    Returns {'ip': array of client IPs, 'timestamp': epoch seconds array}; a
+    region's traffic level is drawn from the deployed / non-deployed weights.
     """
-    mock_logs = []
-    now = datetime.now(timezone.utc)
-    
+    rng = _get_rng()
     mock_current_state = load_deployment_state(dry_run)
-    current_traffic = {}
-    
-    for region in MOCK_IP_REGION_MAP.values():
-        is_deployed = region in mock_current_state
-        
-        weights = MOCK_TRAFFIC_LEVEL_WEIGHTS_DEPLOYED if is_deployed else MOCK_TRAFFIC_LEVEL_WEIGHTS_NON_DEPLOYED
-        
-        mock_traffic_level = random.choices(
-            population=list(MOCK_TRAFFIC_LEVEL_RANGES.keys()),
-            weights=weights,
-            k=1
-        )[0]
-        
-        min_requests, max_requests = MOCK_TRAFFIC_LEVEL_RANGES[mock_traffic_level]
-        num_requests = random.randint(min_requests, max_requests)
-        
-        current_traffic[region] = num_requests
-        
-        mock_ip = next(ip for ip, r in MOCK_IP_REGION_MAP.items() if r == region)
-        
-        for _ in range(num_requests):
-            mock_timestamp = now - timedelta(seconds=random.randint(0, 300))
-            mock_logs.append({'ip': mock_ip, 'timestamp': mock_timestamp.isoformat()})
-    
-    update_traffic_history(current_traffic, dry_run)
-    
-    return mock_logs
-
-def generate_mock_traffic_data(mock_logs):
+    deployed = np.array([region in mock_current_state for region in MOCK_REGIONS])
+
+    weights = np.where(deployed[:, None], MOCK_TRAFFIC_LEVEL_WEIGHTS_DEPLOYED, MOCK_TRAFFIC_LEVEL_WEIGHTS_NON_DEPLOYED)
+    levels = (rng.random(len(MOCK_REGIONS))[:, None] > np.cumsum(weights, axis=1)).sum(axis=1)
+    low, high = _LEVEL_BOUNDS[levels].T
+    counts = rng.integers(low, high + 1)
+
+    now = time.time()
+    return {
+        'ip': np.repeat(MOCK_IPS, counts),
+        'timestamp': now - rng.integers(0, MOCK_LOG_WINDOW + 1, size=int(counts.sum())),
+    }
+
+def generate_mock_traffic_data(mock_logs=None):
+    """
+    Per-region mock traffic for a dry-run tick.
+
+    With mock_scenario set in config the next tick of that TrafficSimulator
+    scenario is returned; otherwise traffic is drawn around the thresholds so
+    the placer has something to scale up and down. `mock_logs` is unused and
+    only kept for older callers.
+    """
+    rng = _get_rng()
+    if _simulator is not None:
+        _, traffic_data = next(_simulator)
+        logger.info(f"Generated mock traffic data: {traffic_data}")
+        return traffic_data
+
+    # Read thresholds on every call so reloaded config applies to the mock data too
+    config = Config.get_config()
+    TRAFFIC_THRESHOLD = config['traffic_threshold']
+    DEPLOYMENT_THRESHOLD = config['deployment_threshold']
     current_deployments = load_deployment_state(dry_run=True)
-    traffic_data = {region: 0 for region in MOCK_IP_REGION_MAP.values()}
-    
-    # Generate base traffic
-    for region in traffic_data:
-        if region in current_deployments:
-            # Higher base traffic for deployed regions
-            traffic_data[region] = random.randint(DEPLOYMENT_THRESHOLD, TRAFFIC_THRESHOLD)
-        else:
-            # Lower base traffic for non-deployed regions
-            traffic_data[region] = random.randint(0, TRAFFIC_THRESHOLD - 1)
-    
+    deployed = np.array([region in current_deployments for region in MOCK_REGIONS])
+
+    # Generate base traffic: higher for deployed regions, lower for the rest
+    low = np.where(deployed, DEPLOYMENT_THRESHOLD, 0)
+    high = np.where(deployed, TRAFFIC_THRESHOLD, TRAFFIC_THRESHOLD - 1)
+    traffic = rng.integers(low, high + 1)
+
     # Add random spikes to some regions
-    for _ in range(random.randint(1, 3)):
-        region = random.choice(list(traffic_data.keys()))
-        traffic_data[region] += random.randint(TRAFFIC_THRESHOLD // 2, TRAFFIC_THRESHOLD * 2)
-    
+    spiked = rng.integers(len(MOCK_REGIONS), size=rng.integers(1, 4))
+    np.add.at(traffic, spiked, rng.integers(TRAFFIC_THRESHOLD // 2, TRAFFIC_THRESHOLD * 2 + 1, size=len(spiked)))
+
     # Ensure at least one region crosses the deployment threshold
-    if all(traffic < TRAFFIC_THRESHOLD for traffic in traffic_data.values()):
-        region_to_spike = random.choice(list(traffic_data.keys()))
-        traffic_data[region_to_spike] = TRAFFIC_THRESHOLD + random.randint(1, 20)
-    
+    if (traffic < TRAFFIC_THRESHOLD).all():
+        traffic[rng.integers(len(MOCK_REGIONS))] = TRAFFIC_THRESHOLD + rng.integers(1, 21)
+
     # Ensure at least one deployed region falls below the deployment threshold
-    deployed_regions = [region for region in current_deployments if region in traffic_data]
-    if deployed_regions:
-        region_to_drop = random.choice(deployed_regions)
-        traffic_data[region_to_drop] = max(0, DEPLOYMENT_THRESHOLD - random.randint(1, 10))
-    
+    if deployed.any():
+        traffic[rng.choice(np.flatnonzero(deployed))] = max(0, DEPLOYMENT_THRESHOLD - rng.integers(1, 11))
+
+    traffic_data = dict(zip(MOCK_REGIONS, traffic.tolist()))
     logger.info(f"Generated mock traffic data: {traffic_data}")
     return traffic_data
 
@@ -0,0 +1,84 @@
+"""
+Module: single_flight.py
+Description: Coalesces concurrent calls to an async operation into a single execution.
+"""
+
+import asyncio
+import time
+
+EXECUTED = 'executed'
+JOINED = 'joined'
+DEBOUNCED = 'debounced'
+
+
+class SingleFlight:
+    """
+    Wraps an async callable so at most one execution is in flight.
+
+    Callers arriving while an execution is running wait for it and receive its
+    result (or exception). A successful result is also handed out to callers
+    arriving within `debounce` seconds of its completion, unless they pass
+    `force` because they need a result computed now. The in-flight
+    execution is shielded, so a caller going away doesn't cancel it for the
+    others.
+    """
+
+    def __init__(self, fn, debounce=0.0, clock=time.monotonic):
+        self.fn = fn
+        self.debounce = float(debounce)
+        self.clock = clock
+        self.counts = {EXECUTED: 0, JOINED: 0, DEBOUNCED: 0}
+        self._inflight = None
+        self._last_result = None
+        self._last_finished = None
+
+    async def __call__(self, force=False):
+        result, _ = await self.run(force)
+        return result
+
+    async def run(self, force=False):
+        """Return (result, source) where source is 'executed', 'joined' or 'debounced'."""
+        if self._inflight is not None:
+            self.counts[JOINED] += 1
+            return await asyncio.shield(self._inflight), JOINED
+
+        if (not force and self._last_finished is not None and self.debounce > 0
+                and self.clock() - self._last_finished < self.debounce):
+            self.counts[DEBOUNCED] += 1
+            return self._last_result, DEBOUNCED
+
+        self.counts[EXECUTED] += 1
+        self._inflight = asyncio.ensure_future(self._execute())
+        return await asyncio.shield(self._inflight), EXECUTED
+
+    async def _execute(self):
+        try:
+            result = await self.fn()
+            self._last_result = result
+            self._last_finished = self.clock()
+            return result
+        finally:
+            self._inflight = None
+
+    async def cancel(self):
+        """Cancel the in-flight execution, if any, and wait for it to unwind."""
+        inflight = self._inflight
+        if inflight is None:
+            return
+        inflight.cancel()
+        try:
+            await inflight
+        except asyncio.CancelledError:
+            pass
+
+    def invalidate(self):
+        """Drop the cached result so the next call executes."""
+        self._last_finished = None
+        self._last_result = None
+
+    def stats(self):
+        return {
+            "in_flight": self._inflight is not None,
+            "debounce": self.debounce,
+            **self.counts,
+        }
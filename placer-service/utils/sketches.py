@@ -0,0 +1,189 @@
+"""
+Module: sketches.py
+Description: Fixed-size, mergeable streaming sketches: HyperLogLog distinct counts and Count-Min top-k.
+
+Items are hashed once to a stable 64-bit value, which every sketch shares.
+Python's hash() is salted per process, so sketches built from it couldn't
+be merged across processes. Updates take arrays of hashes and run
+vectorized. Two sketches with the same parameters merge into the sketch of
+both streams, so a window's sketch can be built from its sub-windows.
+"""
+
+import hashlib
+import math
+import numpy as np
+
+DEFAULT_PRECISION = 11  # 2048 registers, ~2.3% standard error
+DEFAULT_WIDTH = 512
+DEFAULT_DEPTH = 4
+DEFAULT_TOP_K = 10
+
+
+def hash64(item):
+    """Stable 64-bit hash of a string (or bytes) item."""
+    data = item if isinstance(item, bytes) else str(item).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def hash_array(items):
+    return np.fromiter((hash64(item) for item in items), dtype=np.uint64, count=len(items))
+
+
+def _bit_length(values):
+    """Exact bit lengths of a uint64 array."""
+    _, exponent = np.frexp(values.astype(np.float64))
+    # Rounding to float64 can carry a value just below a power of two up to it
+    shift = np.maximum(exponent - 1, 0).astype(np.uint64)
+    return exponent - ((exponent > 0) & ((np.uint64(1) << shift) > values))
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**precision one-byte registers."""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be in [4, 16], got {precision}")
+        self.precision = int(precision)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        tail_bits = 64 - self.precision
+        index = (hashes >> np.uint64(tail_bits)).astype(np.intp)
+        rank = tail_bits + 1 - _bit_length(hashes & np.uint64((1 << tail_bits) - 1))
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def add(self, item):
+        self.add_hashes(np.array([hash64(item)], dtype=np.uint64))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"Can't merge precision {other.precision} into {self.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum()
+        zeros = m - np.count_nonzero(registers)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / zeros)
+        return float(estimate)
+
+    def copy(self):
+        clone = HyperLogLog(self.precision)
+        clone.registers[:] = self.registers
+        return clone
+
+    def clear(self):
+        self.registers[:] = 0
+
+
+class CountMinSketch:
+    """Frequency estimates that never undercount, in a depth x width table."""
+
+    __slots__ = ('width', 'depth', 'table')
+
+    def __init__(self, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH):
+        if width < 1 or depth < 1:
+            raise ValueError(f"Count-Min width and depth must be positive, got {width} x {depth}")
+        self.width = int(width)
+        self.depth = int(depth)
+        self.table = np.zeros((self.depth, self.width))
+
+    def _columns(self, hashes):
+        # Double hashing: row i uses h1 + i * h2, with both halves taken from one 64-bit hash
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low + rows * high) % np.uint64(self.width)).astype(np.intp)
+
+    def add_hashes(self, hashes, counts=1.0):
+        columns = self._columns(hashes)
+        rows = np.broadcast_to(np.arange(self.depth)[:, None], columns.shape)
+        np.add.at(self.table, (rows, columns), np.broadcast_to(counts, columns.shape[1:]))
+
+    def estimate_hashes(self, hashes):
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    @property
+    def total(self):
+        return float(self.table[0].sum())
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError(f"Can't merge a {other.depth} x {other.width} sketch into {self.depth} x {self.width}")
+        self.table += other.table
+        return self
+
+    def copy(self):
+        clone = CountMinSketch(self.width, self.depth)
+        clone.table[:] = self.table
+        return clone
+
+    def clear(self):
+        self.table[:] = 0
+
+
+class HeavyHitters:
+    """
+    The k items with the highest counts, tracked with a Count-Min sketch.
+
+    Only k items are kept. Each batch's items compete with them on their
+    estimated totals so far, so an item that is frequent overall surfaces
+    even if it is spread thinly over many batches.
+    """
+
+    __slots__ = ('k', 'sketch', 'candidates')
+
+    def __init__(self, k=DEFAULT_TOP_K, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH):
+        self.k = int(k)
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}  # item -> hash64(item)
+
+    def add(self, items, hashes, counts):
+        """Count a batch of distinct `items` with their precomputed hashes."""
+        self.sketch.add_hashes(hashes, counts)
+        pool = dict(self.candidates)
+        pool.update(zip(items, np.asarray(hashes).tolist()))
+        self._keep_top(pool)
+
+    def _keep_top(self, pool):
+        if len(pool) <= self.k:
+            self.candidates = pool
+            return
+        items = list(pool)
+        estimates = self.sketch.estimate_hashes(np.fromiter(pool.values(), dtype=np.uint64, count=len(pool)))
+        top = np.argpartition(-estimates, self.k - 1)[:self.k]
+        self.candidates = {items[index]: pool[items[index]] for index in top.tolist()}
+
+    def top(self):
+        """[(item, estimated count)], highest first."""
+        if not self.candidates:
+            return []
+        items = list(self.candidates)
+        estimates = self.sketch.estimate_hashes(
+            np.fromiter(self.candidates.values(), dtype=np.uint64, count=len(items)))
+        return sorted(zip(items, estimates.tolist()), key=lambda pair: pair[1], reverse=True)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self._keep_top({**self.candidates, **other.candidates})
+        return self
+
+    def copy(self):
+        clone = HeavyHitters(self.k, self.sketch.width, self.sketch.depth)
+        clone.sketch = self.sketch.copy()
+        clone.candidates = dict(self.candidates)
+        return clone
+
+    def clear(self):
+        self.sketch.clear()
+        self.candidates = {}
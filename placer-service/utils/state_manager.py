@@ -1,47 +1,63 @@
 # utils/state_manager.py
 
 import os
-import json
+import threading
 from utils.fancy_logger import get_logger
+from utils.state_store import StateStore
 
 # Set up logging
 logger = get_logger(__name__)
 
-def get_deployment_state_file(dry_run=False):
-    return 'data/deployment_state_dry_run.json' if dry_run else 'data/deployment_state.json'
-
-def load_deployment_state(dry_run=False):
-    state_file = get_deployment_state_file(dry_run)
-    logger.info(f"Loading deployment state from {state_file} (dry_run: {dry_run})")
-    if os.path.exists(state_file):
-        try:
-            with open(state_file, 'r') as f:
-                content = f.read().strip()
-                if content:
-                    data = json.loads(content)
-                    logger.info(f"Loaded deployment state with {len(data)} entries")
-                    logger.debug(f"Deployment state: {data}")
-                    return data
-                else:
-                    logger.warning("Deployment state file is empty. Returning empty dict.")
-                    return {}
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in deployment state file: {e}")
-        except Exception as e:
-            logger.error(f"Error reading deployment state file: {e}")
-    else:
-        logger.info("Deployment state file does not exist. Returning empty dict.")
-    return {}
-
-def save_deployment_state(state, dry_run=False):
-    state_file = get_deployment_state_file(dry_run)
-    logger.info(f"Saving deployment state to {state_file} (dry_run: {dry_run})")
-    try:
-        os.makedirs(os.path.dirname(state_file), exist_ok=True)
-        with open(state_file, 'w') as f:
-            json.dump(state, f, indent=2)
-        logger.info(f"Deployment state saved with {len(state)} entries")
-        logger.debug(f"Saved deployment state: {state}")
-    except Exception as e:
-        logger.error(f"Error saving deployment state: {e}")
-        raise
+DATA_DIR = 'data'
+
+# Open state stores, keyed by database path
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_data_dir(app=None):
+    """Per-app data namespace; the single-app layout lives directly under data/."""
+    return DATA_DIR if app is None else os.path.join(DATA_DIR, 'apps', app)
+
+def get_deployment_state_file(dry_run=False, app=None):
+    """SQLite database holding the deployment state and action journal."""
+    filename = 'deployment_state_dry_run.db' if dry_run else 'deployment_state.db'
+    return os.path.join(get_data_dir(app), filename)
+
+def get_legacy_state_file(dry_run=False, app=None):
+    """Legacy JSON state file, only read to migrate it into the state database."""
+    filename = 'deployment_state_dry_run.json' if dry_run else 'deployment_state.json'
+    return os.path.join(get_data_dir(app), filename)
+
+def get_state_store(dry_run=False, app=None):
+    """The StateStore for this namespace, created (and migrated from JSON) on first use."""
+    path = get_deployment_state_file(dry_run, app)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = StateStore(path)
+                legacy_file = get_legacy_state_file(dry_run, app)
+                if os.path.exists(legacy_file) and store.is_empty():
+                    store.migrate_json(legacy_file)
+                _stores[path] = store
+    return store
+
+def close_state_stores():
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+def load_deployment_state(dry_run=False, app=None):
+    state = get_state_store(dry_run, app).load_state()
+    logger.debug(f"Loaded deployment state with {len(state)} entries (dry_run: {dry_run})")
+    return state
+
+def save_deployment_state(state, dry_run=False, app=None):
+    get_state_store(dry_run, app).save_state(state)
+    logger.debug(f"Saved deployment state with {len(state)} entries (dry_run: {dry_run})")
+
+def record_placement_results(action_results, dry_run=False, app=None, timestamp=None):
+    """Apply executed actions to the deployment state and journal them; returns the new state."""
+    return get_state_store(dry_run, app).record_results(action_results, timestamp)
@@ -0,0 +1,235 @@
+"""
+Module: state_store.py
+Description: SQLite (WAL) store for deployment state and an append-only journal of scale actions.
+
+The deployment state maps each deployed region to the ISO timestamp of its
+last scale action (or None). Every executed or failed action is appended to
+the `actions` journal. The journal is indexed by (region, timestamp), so the
+last action of a region is one index seek. WAL mode lets readers in other
+threads and processes run alongside a writer. Each write is one transaction,
+so a crash leaves the previous state rather than a half-written file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+BUSY_TIMEOUT = 5000  # milliseconds a writer waits for another process's write lock
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deployment_state (
+    region TEXT PRIMARY KEY,
+    last_action TEXT
+);
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    region TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    result TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS actions_region_time ON actions (region, timestamp);
+CREATE INDEX IF NOT EXISTS actions_time ON actions (timestamp);
+"""
+
+_ACTION_COLUMNS = ('region', 'action', 'timestamp', 'result', 'error')
+
+RESULT_SUCCESS = 'success'
+RESULT_ERROR = 'error'
+
+
+class StateStore:
+    """
+    Deployment state and action journal in one SQLite database.
+
+    Each thread gets its own connection. `load_state` keeps the last state it
+    read per connection and reuses it until the database's data_version
+    shows that another connection committed. Repeated reads in a tick then
+    cost one PRAGMA.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # WAL makes NORMAL durable against application crashes; only power loss can drop the last commit
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT}')
+            self._local.conn = conn
+            self._local.state = None
+            self._local.version = None
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _data_version(self, conn):
+        return conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def load_state(self):
+        """Return the deployment state as {region: last action timestamp or None}."""
+        conn = self._connection()
+        version = self._data_version(conn)
+        if self._local.state is None or version != self._local.version:
+            self._local.state = dict(conn.execute('SELECT region, last_action FROM deployment_state'))
+            self._local.version = version
+        return dict(self._local.state)
+
+    def _remember(self, conn, state):
+        # Our own commits don't move this connection's data_version, so the cache is updated directly
+        self._local.state = dict(state)
+        self._local.version = self._data_version(conn)
+
+    def save_state(self, state):
+        """Replace the whole deployment state in one transaction."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM deployment_state')
+            conn.executemany('INSERT INTO deployment_state (region, last_action) VALUES (?, ?)', state.items())
+        self._remember(conn, state)
+
+    def record_results(self, action_results, timestamp=None):
+        """
+        Apply one batch of executed actions, given in the `update_placements` result shape.
+
+        In one transaction, deployed regions are added to the state with the
+        batch's timestamp and removed regions are dropped. Every action,
+        including the failed ones, is appended to the journal. Returns the new
+        state.
+        """
+        moment = datetime.now(timezone.utc) if timestamp is None else timestamp
+        if not isinstance(moment, datetime):
+            moment = datetime.fromtimestamp(float(moment), timezone.utc)
+        epoch, iso = moment.timestamp(), moment.isoformat()
+        journal = [(region, 'deploy', epoch, RESULT_SUCCESS, None) for region in action_results.get('deployed', [])]
+        journal += [(region, 'remove', epoch, RESULT_SUCCESS, None) for region in action_results.get('removed', [])]
+        journal += [(error['region'], error['action'], epoch, RESULT_ERROR, error.get('error'))
+                    for error in action_results.get('errors', [])]
+        with self._transaction() as conn:
+            conn.executemany('INSERT OR REPLACE INTO deployment_state (region, last_action) VALUES (?, ?)',
+                             [(region, iso) for region in action_results.get('deployed', [])])
+            conn.executemany('DELETE FROM deployment_state WHERE region = ?',
+                             [(region,) for region in action_results.get('removed', [])])
+            conn.executemany('INSERT INTO actions (region, action, timestamp, result, error) VALUES (?, ?, ?, ?, ?)',
+                             journal)
+            state = dict(conn.execute('SELECT region, last_action FROM deployment_state'))
+        self._remember(conn, state)
+        return state
+
+    def record_action(self, region, action, result=RESULT_SUCCESS, timestamp=None, error=None):
+        """Append one action to the journal without touching the deployment state."""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        with self._transaction() as conn:
+            conn.execute('INSERT INTO actions (region, action, timestamp, result, error) VALUES (?, ?, ?, ?, ?)',
+                         (region, action, timestamp, result, error))
+
+    def last_action(self, region, result=None):
+        """The region's latest journal entry (optionally only with this result), or None."""
+        query = 'SELECT region, action, timestamp, result, error FROM actions WHERE region = ?'
+        params = [region]
+        if result is not None:
+            query += ' AND result = ?'
+            params.append(result)
+        row = self._connection().execute(query + ' ORDER BY timestamp DESC, id DESC LIMIT 1', params).fetchone()
+        return dict(zip(_ACTION_COLUMNS, row)) if row else None
+
+    def last_actions(self, regions=None, result=None):
+        """{region: latest journal entry} for `regions` (default: every journaled region)."""
+        if regions is None:
+            regions = [row[0] for row in self._connection().execute('SELECT DISTINCT region FROM actions')]
+        entries = {region: self.last_action(region, result) for region in regions}
+        return {region: entry for region, entry in entries.items() if entry is not None}
+
+    def actions(self, region=None, since=None, until=None, limit=None):
+        """Journal entries, newest first, filtered by region and [since, until) epoch seconds."""
+        clauses, params = [], []
+        for clause, value in (('region = ?', region), ('timestamp >= ?', since), ('timestamp < ?', until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        query = 'SELECT region, action, timestamp, result, error FROM actions'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY timestamp DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+        return [dict(zip(_ACTION_COLUMNS, row)) for row in self._connection().execute(query, params)]
+
+    def recent_actions(self, since):
+        """The latest entry per (region, action, result) at or after `since`, e.g. to rebuild cooldowns."""
+        rows = self._connection().execute(
+            'SELECT region, action, MAX(timestamp), result, NULL FROM actions WHERE timestamp >= ? '
+            'GROUP BY region, action, result', (float(since),))
+        return [dict(zip(_ACTION_COLUMNS, row)) for row in rows]
+
+    def is_empty(self):
+        conn = self._connection()
+        return (conn.execute('SELECT 1 FROM deployment_state LIMIT 1').fetchone() is None
+                and conn.execute('SELECT 1 FROM actions LIMIT 1').fetchone() is None)
+
+    def migrate_json(self, json_path):
+        """
+        Import a legacy deployment_state*.json file (a {region: timestamp}
+        dict or a list of regions) and rename it to `<file>.migrated`.
+
+        Unreadable files are left in place and nothing is imported. Returns the
+        number of regions imported.
+        """
+        try:
+            with open(json_path, 'r') as f:
+                content = f.read().strip()
+            legacy = json.loads(content) if content else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not migrate deployment state from {json_path}: {e}")
+            return 0
+        if isinstance(legacy, list):
+            legacy = {region: None for region in legacy}
+        self.save_state(legacy)
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"Migrated {len(legacy)} regions from {json_path} into {self.path}")
+        return len(legacy)
+
+    def close(self):
+        """Close every thread's connection; a later call on this store reconnects."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises."""
+
+    __slots__ = ('conn',)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
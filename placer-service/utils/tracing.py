@@ -0,0 +1,155 @@
+"""
+Module: tracing.py
+Description: Per-stage timing spans for placer ticks, with on-demand cProfile of a single tick.
+"""
+
+import asyncio
+import cProfile
+import io
+import pstats
+import time
+from collections import deque
+from datetime import datetime, timezone
+from metrics.metrics_client import REGISTRY
+from utils.fancy_logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_TRACE_HISTORY = 20  # ticks kept for /debug/ticks
+DEFAULT_PROFILE_SORT = 'cumulative'
+DEFAULT_PROFILE_LIMIT = 50  # functions listed in the pstats output
+
+STAGE_DURATION = REGISTRY.histogram(
+    'placer_tick_stage_duration_seconds', 'Duration of each stage of a placer tick', ('stage',))
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.spans.append((self.name, self.start - self.trace.start, time.perf_counter() - self.start))
+        return False
+
+
+class TickTrace:
+    """Timing spans of one tick, as (stage, offset from tick start, duration) in seconds."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.spans = []
+        self.duration = None
+        self.status = 'running'
+        self.profile = None
+
+    def span(self, name):
+        """Context manager timing one stage of the tick."""
+        return _Span(self, name)
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration": self.duration,
+            "status": self.status,
+            "profiled": self.profile is not None,
+            "spans": [{"stage": name, "start": start, "duration": duration}
+                      for name, start, duration in self.spans],
+        }
+
+
+class TickTracer:
+    """
+    Keeps the traces of the last `history` ticks and profiles ticks on request.
+
+    `profile_next` asks for the next tick to run under cProfile; it resolves
+    with that tick's trace and pstats report. The profiler sees everything the
+    event loop thread runs during the tick, including other requests served
+    meanwhile.
+    """
+
+    def __init__(self, history=DEFAULT_TRACE_HISTORY):
+        self.traces = deque(maxlen=history)
+        self._profile_request = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(history=int(config.get('trace_history', DEFAULT_TRACE_HISTORY)))
+
+    def resize(self, history):
+        if history != self.traces.maxlen:
+            self.traces = deque(self.traces, maxlen=history)
+
+    @property
+    def profile_pending(self):
+        return self._profile_request is not None
+
+    def start(self):
+        trace = TickTrace()
+        request = self._profile_request
+        if request is not None and not request['future'].done() and request['trace'] is None:
+            request['trace'] = trace
+            trace.profile = cProfile.Profile()
+            try:
+                trace.profile.enable()
+            except ValueError as e:
+                # Another profiler (e.g. a debugger) is active in this process
+                trace.profile = None
+                self._profile_request = None
+                request['future'].set_exception(RuntimeError(f"Could not start the profiler: {e}"))
+        return trace
+
+    def finish(self, trace, status):
+        """Close a tick's trace, record its stage metrics and keep it; returns the tick duration."""
+        trace.duration = time.perf_counter() - trace.start
+        trace.status = status
+        if trace.profile is not None:
+            trace.profile.disable()
+            self._deliver_profile(trace)
+        for name, _, duration in trace.spans:
+            STAGE_DURATION.labels(name).observe(duration)
+        self.traces.append(trace)
+        return trace.duration
+
+    def _deliver_profile(self, trace):
+        request, self._profile_request = self._profile_request, None
+        if request is None or request['future'].done():
+            return
+        output = io.StringIO()
+        stats = pstats.Stats(trace.profile, stream=output)
+        stats.sort_stats(request['sort']).print_stats(request['limit'])
+        request['future'].set_result({"tick": trace.to_dict(), "stats": output.getvalue()})
+        logger.info(f"Profiled placer tick ({trace.duration:.3f}s)")
+
+    def recent(self):
+        """The kept traces, oldest first."""
+        return [trace.to_dict() for trace in self.traces]
+
+    async def profile_next(self, timeout=None, sort=DEFAULT_PROFILE_SORT, limit=DEFAULT_PROFILE_LIMIT):
+        """
+        Profile the next tick; returns {'tick': trace, 'stats': pstats text}.
+
+        Raises RuntimeError if a profile is already pending and
+        asyncio.TimeoutError if no tick finishes within `timeout` seconds.
+        """
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise ValueError(f"Unknown sort key {sort!r}")
+        if self._profile_request is not None:
+            raise RuntimeError("A profile is already pending")
+        request = {'future': asyncio.get_running_loop().create_future(), 'trace': None, 'sort': sort,
+                   'limit': int(limit)}
+        self._profile_request = request
+        try:
+            return await asyncio.wait_for(asyncio.shield(request['future']), timeout)
+        finally:
+            if self._profile_request is request and request['trace'] is None:
+                # Timed out (or cancelled) before a tick picked the request up
+                self._profile_request = None
@@ -0,0 +1,110 @@
+"""
+Module: traffic_cache.py
+Description: Shared cache of the latest region traffic snapshot with TTL, stale-while-revalidate and ETags.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from utils.fancy_logger import get_logger
+from utils.single_flight import SingleFlight
+
+# Set up logging
+logger = get_logger(__name__)
+
+DEFAULT_TTL = 15  # seconds a snapshot is served as fresh
+DEFAULT_STALE_TTL = 60  # extra seconds a stale snapshot is served while refreshing
+
+
+class CachedTraffic:
+    """One traffic snapshot together with its response body and ETag."""
+
+    __slots__ = ('traffic_data', 'timestamp', 'etag', 'stored_at')
+
+    def __init__(self, traffic_data, stored_at):
+        self.traffic_data = traffic_data
+        self.timestamp = datetime.now(timezone.utc).isoformat()
+        self.stored_at = stored_at
+        digest = hashlib.sha256(json.dumps(self.body, sort_keys=True).encode()).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+
+    @property
+    def body(self):
+        return {"traffic_data": self.traffic_data, "timestamp": self.timestamp}
+
+
+def etag_matches(if_none_match, etag):
+    """Evaluate an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+class TrafficCache:
+    """
+    Caches the last region traffic snapshot fetched by `fetch` (an async callable).
+
+    Snapshots younger than `ttl` are served as-is. Until `ttl + stale_ttl`, the
+    stale snapshot is still served while a single background refresh runs;
+    after that callers wait for a fresh fetch. Anything else that fetches
+    traffic (the placer tick) can `put` its snapshot to warm the cache.
+    """
+
+    def __init__(self, fetch, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, clock=time.monotonic):
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self.clock = clock
+        self._fetch = fetch
+        self._entry = None
+        self._refresh = SingleFlight(self._fetch_and_store)
+        self._background = None
+
+    @classmethod
+    def from_config(cls, config, fetch):
+        return cls(
+            fetch,
+            ttl=float(config.get('metrics_cache_ttl', DEFAULT_TTL)),
+            stale_ttl=float(config.get('metrics_cache_stale', DEFAULT_STALE_TTL)),
+        )
+
+    @property
+    def entry(self):
+        return self._entry
+
+    def age(self):
+        return None if self._entry is None else self.clock() - self._entry.stored_at
+
+    def put(self, traffic_data):
+        self._entry = CachedTraffic(traffic_data, self.clock())
+        return self._entry
+
+    async def _fetch_and_store(self):
+        return self.put(await self._fetch())
+
+    async def get(self):
+        """Return a CachedTraffic, fetching or revalidating as the entry's age requires."""
+        age = self.age()
+        if age is not None and age < self.ttl:
+            return self._entry
+        if age is not None and age < self.ttl + self.stale_ttl:
+            self._revalidate()
+            return self._entry
+        return await self._refresh()
+
+    def _revalidate(self):
+        if self._background is None or self._background.done():
+            self._background = asyncio.ensure_future(self._revalidate_quietly())
+
+    async def _revalidate_quietly(self):
+        try:
+            await self._refresh()
+        except Exception as e:
+            logger.warning(f"Background traffic refresh failed, serving stale data: {e}")
+
+    def max_age(self):
+        """Seconds the current entry stays fresh, for Cache-Control."""
+        age = self.age()
+        return 0 if age is None else max(0, int(self.ttl - age))